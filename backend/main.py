@@ -1,5 +1,6 @@
 import os
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
@@ -8,11 +9,19 @@ from routes import chatbot
 # Load environment variables
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start background workers, and flush buffered writes on shutdown
+    await chatbot.startup()
+    yield
+    await chatbot.shutdown()
+
 # Create FastAPI app
 app = FastAPI(
     title="Personal Finance Chatbot API",
     description="API for Personal Finance Chatbot with Gemini and Granite integration",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -1,18 +1,47 @@
-from fastapi import APIRouter, HTTPException, Depends, Body
+from fastapi import APIRouter, HTTPException, Depends, Body, Request, Query, BackgroundTasks
+from fastapi.responses import StreamingResponse, Response
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field
 from typing import List, Dict, Optional, Any
 from services.gemini_handler import GeminiHandler
-from services.granite_handler import GraniteHandler
+from services.granite_handler import GraniteHandler, GRANITE_MAX_CONNECTIONS
+from services.llm_scheduler import LLMScheduler, PRIORITY_BACKGROUND, PRIORITY_SUMMARY
+from services.response_cache import ResponseCache
 from services.tax_utils import calculate_tax, compare_tax_regimes, calculate_hra_exemption
-import json
+from services.tax_rules import tax_rules
+from services.tax_engine import compare_regimes_batch, parse_incomes, columns_to_json, columns_to_ndjson, tax_curve
+from services.tax_optimizer import optimize_tax
+from services.projection import projection_grid, projection_curves
+from services.monte_carlo import run_simulation, MC_DEFAULT_PATHS
+from services.goal_planner import plan_goals
+from services.storage import create_storage
+from services.expense_ledger import EXPENSE_SUMMARY_MONTHS, period_range, recent_range
+from services.profile_cache import ProfileCache
+from services.async_io import run_io, shutdown_io, UserLockRegistry
+from services.write_behind import WriteBehindBuffer
+from services.singleflight import SingleFlight
+from services.admission import AdmissionController, AdmissionRejected
+from services.intent_router import IntentRouter
+from services.fingerprint import fingerprint, profile_fingerprint
 import os
-from datetime import datetime
+import json
+from datetime import datetime, timedelta
 
 router = APIRouter(tags=["chatbot"])
 
-# Initialize AI handlers
-gemini_handler = GeminiHandler()
-granite_handler = GraniteHandler()
+# One scheduler per upstream API; every call to that API, interactive or background, queues in it
+llm_schedulers = {
+    "gemini": LLMScheduler.from_env("gemini"),
+    "granite": LLMScheduler.from_env("granite", GRANITE_MAX_CONNECTIONS)
+}
+
+# Initialize AI handlers, sharing one response cache
+response_cache = ResponseCache()
+gemini_handler = GeminiHandler(response_cache, scheduler=llm_schedulers["gemini"])
+granite_handler = GraniteHandler(response_cache, scheduler=llm_schedulers["granite"])
+
+# Precompute a user's budget summary at background priority after each profile save
+SUMMARY_PREWARM = os.getenv("SUMMARY_PREWARM", "false").lower() == "true"
 
 # Models
 class UserProfile(BaseModel):
@@ -50,41 +79,157 @@ class FinancialGoal(BaseModel):
     current_amount: float = 0
     target_date: Optional[str] = None
     priority: int = 1  # 1 (highest) to 5 (lowest)
+    goal_id: Optional[str] = None  # assigned by the server
+    contribution_count: int = 0
+
+class GoalUpdate(BaseModel):
+    goal_name: Optional[str] = None
+    target_amount: Optional[float] = None
+    current_amount: Optional[float] = None  # recorded as an adjusting contribution
+    target_date: Optional[str] = None
+    priority: Optional[int] = None
+
+class GoalContribution(BaseModel):
+    amount: float  # negative for a withdrawal
+    note: Optional[str] = None
+    date: str = Field(default_factory=lambda: datetime.now().isoformat())
+
+class GoalPlanRequest(BaseModel):
+    user_id: str
+    monthly_surplus: Optional[float] = None  # defaults to the profile's income minus expenses
+    goals: Optional[List[Dict[str, Any]]] = None  # defaults to the profile's goals
 
 class TaxCalculationRequest(BaseModel):
     user_id: str
     income: float
     city_tier: int
     regime: str = "new"  # "old" or "new"
+    fy: Optional[str] = None  # e.g. "2024-25"; defaults to TAX_DEFAULT_FY
+    deductions: float = 0  # old-regime deductions (80C, 80D, ...)
+    # Annual salary components for the HRA exemption; when omitted HRA is assumed to be 40% of income
+    basic_salary: Optional[float] = None
+    hra_received: Optional[float] = None
+    rent_paid: Optional[float] = None
 
-# Helper function to load/save chat history
-def get_chat_history(user_id: str) -> List[Dict[str, str]]:
-    try:
-        with open("db/memory.json", "r") as f:
-            data = json.load(f)
-            return data.get(user_id, [])
-    except (FileNotFoundError, json.JSONDecodeError):
-        # Create directory if it doesn't exist
-        os.makedirs("db", exist_ok=True)
-        return []
-
-def save_chat_history(user_id: str, history: List[Dict[str, str]]):
+class TaxOptimizeRequest(BaseModel):
+    # Annual amounts
+    basic_salary: float
+    hra_received: float = 0
+    other_income: float = 0  # special allowance, bonus and other taxable income
+    rent_paid: float = 0
+    city_tier: int = 1
+    investment_capacity: float = 0  # money available for tax-saving investments
+    existing_80c: float = 0  # EPF, life insurance premiums, tuition fees already paid
+    senior_citizen: bool = False
+    cover_parents: bool = False  # paying parents' health insurance
+    parents_senior: bool = False
+    fy: Optional[str] = None
+
+class ProjectionRequest(BaseModel):
+    years: List[int]
+    annual_rates: List[float]  # percent
+    monthly_contributions: List[float]
+    initial_balance: float = 0
+    include_curves: bool = True  # month-by-month balances over the longest horizon
+
+class MonteCarloRequest(BaseModel):
+    user_id: str
+    years: int = 10
+    monthly_contribution: Optional[float] = None  # defaults to the profile's income minus expenses
+    initial_balance: float = 0
+    allocation: Optional[Dict[str, float]] = None  # asset class -> weight, e.g. {"equity": 0.6, "debt": 0.4}
+    assets: Optional[Dict[str, Dict[str, float]]] = None  # overrides or extra classes: annual_return, annual_volatility
+    goals: Optional[List[Dict[str, Any]]] = None  # defaults to the profile's goals
+    paths: int = MC_DEFAULT_PATHS
+    seed: int = 42
+    distribution: str = "normal"  # "normal" or "student_t"
+    df: float = 5.0  # degrees of freedom for student_t
+
+class TaxCurveRequest(BaseModel):
+    income: float
+    min_income: float = 0
+    max_income: Optional[float] = None  # defaults to twice the income, at least ₹30 lakh
+    points: int = 200
+    deductions: float = 0  # old-regime deductions (80C, 80D, HRA, ...)
+    fy: Optional[str] = None
+
+# Storage backend for profiles, chat history, expenses and goals (STORAGE_BACKEND=json|sqlite)
+storage = create_storage()
+
+# Validated UserProfile objects for hot users, revalidated by storage version
+profile_cache = ProfileCache()
+
+# Serializes writes per user; all storage calls run in the bounded I/O pool
+user_locks = UserLockRegistry()
+
+# Chat turns are group-committed by a write-behind buffer; set
+# CHAT_HISTORY_DURABLE_ACK=true to wait for the flush before responding
+history_writer = WriteBehindBuffer(storage.append_chat_history_batch)
+CHAT_HISTORY_DURABLE_ACK = os.getenv("CHAT_HISTORY_DURABLE_ACK", "false").lower() == "true"
+
+# Identical concurrent chat and summary requests share one upstream call
+inflight_calls = SingleFlight()
+
+# Largest number of incomes accepted by /tax/batch
+TAX_BATCH_MAX_ROWS = int(os.getenv("TAX_BATCH_MAX_ROWS", 200000))
+
+# Most points returned per regime by /tax/curve
+TAX_CURVE_MAX_POINTS = int(os.getenv("TAX_CURVE_MAX_POINTS", 2000))
+
+# Largest scenario grid and horizon accepted by /projection
+PROJECTION_MAX_SCENARIOS = int(os.getenv("PROJECTION_MAX_SCENARIOS", 500000))
+PROJECTION_MAX_CURVES = int(os.getenv("PROJECTION_MAX_CURVES", 50))
+PROJECTION_MAX_YEARS = int(os.getenv("PROJECTION_MAX_YEARS", 60))
+
+# Pure calculation questions are answered locally instead of by Gemini
+intent_router = IntentRouter()
+
+# Bounded admission for LLM-backed endpoints; overload is shed with 429 + Retry-After
+admission = {
+    "chat": AdmissionController.from_env("chat"),
+    "summary": AdmissionController.from_env("summary", max_concurrent=4, max_queue=16, deadline=60.0)
+}
+
+# Helper functions to load/append chat history
+async def get_chat_history(user_id: str) -> List[Dict[str, str]]:
+    return await history_writer.read(user_id, storage.get_chat_history)
+
+async def append_chat_history(user_id: str, turns: List[Dict[str, str]], durable: bool = CHAT_HISTORY_DURABLE_ACK):
+    flushed = history_writer.append(user_id, turns)
+    if durable:
+        await flushed
+    else:
+        # Flush failures are already reported by the writer; nobody else will look at this one
+        flushed.add_done_callback(lambda future: future.cancelled() or future.exception())
+
+async def admit(endpoint: str) -> float:
+    """Take an admission slot for ``endpoint`` or fail fast with 429"""
     try:
-        with open("db/memory.json", "r") as f:
-            data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        data = {}
-    
-    data[user_id] = history
-    
-    with open("db/memory.json", "w") as f:
-        json.dump(data, f, indent=2)
+        return await admission[endpoint].acquire()
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
 
-# Endpoints
-@router.post("/chat", response_model=ChatResponse)
-async def chat(message: ChatMessage):
-    # Get chat history from request if provided, otherwise load from file
-    history = message.chat_history if message.chat_history else get_chat_history(message.user_id)
+# Lifecycle hooks, called from the app lifespan in main.py
+async def startup():
+    history_writer.start()
+    await granite_handler.startup()
+
+async def shutdown():
+    await history_writer.stop()
+    gemini_handler.executor.shutdown()
+    await granite_handler.shutdown()
+    storage.close()
+    shutdown_io()
+
+def load_profile(user_id: str) -> Optional[UserProfile]:
+    profile_data = storage.get_profile(user_id)
+    return UserProfile(**profile_data) if profile_data is not None else None
+
+async def load_chat_context(message: ChatMessage):
+    """Chat history and profile (if any) for a chat request"""
+    # Get chat history from request if provided (an empty list starts a fresh
+    # conversation), otherwise load from storage
+    history = message.chat_history if message.chat_history is not None else await get_chat_history(message.user_id)
     
     # Get user profile if available
     user_profile = None
@@ -94,17 +239,22 @@ async def chat(message: ChatMessage):
         # Profile not found, continue without it
         pass
     
-    # Process message with Gemini
-    response = await gemini_handler.generate_response(message.message, history, user_profile)
-    
-    # Update chat history
-    history.append({"role": "user", "content": message.message})
-    history.append({"role": "assistant", "content": response})
-    save_chat_history(message.user_id, history)
-    
+    return history, user_profile
+
+def build_chat_response(message: ChatMessage, response: str, routed: Optional[Dict[str, Any]] = None) -> ChatResponse:
     # Determine if this is a request that needs summary
     summary_available = "summary" in message.message.lower() or "budget" in message.message.lower()
     
+    # Locally answered questions carry their exact figures
+    if routed is not None:
+        return ChatResponse(
+            response=response,
+            audio_available=True,
+            summary_available=summary_available,
+            tax_info=routed["tax_info"],
+            visualization_data=routed["visualization_data"]
+        )
+    
     # Determine if this is a tax-related query
     tax_info = None
     if any(keyword in message.message.lower() for keyword in ["tax", "hra", "exemption", "regime"]):
@@ -121,76 +271,419 @@ async def chat(message: ChatMessage):
         tax_info=tax_info
     )
 
-@router.post("/profile", response_model=UserProfile)
-async def create_or_update_profile(profile: UserProfile):
-    # Define the profiles directory
-    PROFILES_DIR = "db/profiles"
-    os.makedirs(PROFILES_DIR, exist_ok=True)
+def sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Format one server-sent event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def answer_locally(message: ChatMessage, routed: Dict[str, Any]) -> ChatResponse:
+    """Log and return an answer computed by the intent router"""
+    await append_chat_history(message.user_id, [
+        {"role": "user", "content": message.message},
+        {"role": "assistant", "content": routed["response"]}
+    ])
+    return build_chat_response(message, routed["response"], routed)
+
+# Endpoints
+@router.post("/chat", response_model=ChatResponse)
+async def chat(message: ChatMessage):
+    history, user_profile = await load_chat_context(message)
+    
+    # Calculation questions never need an LLM round-trip
+    routed = intent_router.route(message.message, user_profile)
+    if routed is not None:
+        return await answer_locally(message, routed)
     
-    # Save profile to file
-    profile_path = os.path.join(PROFILES_DIR, f"{profile.user_id}.json")
+    async def respond():
+        # Process message with Gemini
+        response = await gemini_handler.generate_response(message.message, history, user_profile, user_id=message.user_id)
+        
+        # Append only the new turns to the chat log
+        await append_chat_history(message.user_id, [
+            {"role": "user", "content": message.message},
+            {"role": "assistant", "content": response}
+        ])
+        return response
+    
+    # Duplicate submissions of the same turn (reruns, double clicks) are answered once
+    call_key = fingerprint(message.user_id, "chat", profile_fingerprint(user_profile), message.message, history)
+    started_at = await admit("chat")
     try:
-        with open(profile_path, 'w') as f:
-            json.dump(profile.dict(), f, indent=2)
-        return profile
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error saving profile: {str(e)}")
+        response = await inflight_calls.do(call_key, respond)
+    finally:
+        admission["chat"].release(started_at)
+    
+    return build_chat_response(message, response)
+
+@router.post("/chat/stream")
+async def chat_stream(message: ChatMessage):
+    """Stream the reply as server-sent events: ``data`` chunks, then a ``done`` event"""
+    history, user_profile = await load_chat_context(message)
+    
+    # Calculation questions are answered locally as a single chunk
+    routed = intent_router.route(message.message, user_profile)
+    if routed is not None:
+        async def local_events():
+            chat_response = await answer_locally(message, routed)
+            yield sse_event({"delta": chat_response.response})
+            yield sse_event(chat_response.dict(), event="done")
+        return StreamingResponse(local_events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+    
+    async def events():
+        parts = []
+        try:
+            async for chunk in gemini_handler.stream_response(message.message, history, user_profile, user_id=message.user_id):
+                parts.append(chunk)
+                yield sse_event({"delta": chunk})
+        except Exception as e:
+            print(f"Error streaming response from Gemini: {str(e)}")
+            yield sse_event({"detail": f"I'm having trouble processing your request. Please try again later. Error: {str(e)}"}, event="error")
+            return
+        
+        # Persist the completed turn once the full reply is known
+        response = "".join(parts)
+        await append_chat_history(message.user_id, [
+            {"role": "user", "content": message.message},
+            {"role": "assistant", "content": response}
+        ])
+        yield sse_event(build_chat_response(message, response).dict(), event="done")
+    
+    # The slot is held until the stream has been sent (or the client went away)
+    started_at = await admit("chat")
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"},
+                             background=BackgroundTask(admission["chat"].release, started_at))
+
+@router.post("/profile", response_model=UserProfile)
+async def create_or_update_profile(profile: UserProfile, background_tasks: BackgroundTasks):
+    # Save profile to storage and refresh the cached copy
+    async with user_locks.lock(profile.user_id):
+        try:
+            await run_io(storage.save_profile, profile.dict())
+            version = await run_io(storage.profile_version, profile.user_id)
+            profile_cache.put(profile.user_id, profile, version)
+        except Exception as e:
+            profile_cache.invalidate(profile.user_id)
+            raise HTTPException(status_code=500, detail=f"Error saving profile: {str(e)}")
+    
+    if SUMMARY_PREWARM:
+        background_tasks.add_task(budget_summary, profile, PRIORITY_BACKGROUND)
+    return profile
 
 @router.get("/profile/{user_id}", response_model=UserProfile)
 async def get_profile(user_id: str):
-    # Define the profiles directory
-    PROFILES_DIR = "db/profiles"
-    os.makedirs(PROFILES_DIR, exist_ok=True)
-    
-    # Check if profile exists
-    profile_path = os.path.join(PROFILES_DIR, f"{user_id}.json")
-    if not os.path.exists(profile_path):
-        raise HTTPException(status_code=404, detail="Profile not found")
+    # Serve hot profiles straight from memory
+    profile = profile_cache.get_fresh(user_id)
+    if profile is not None:
+        return profile
     
-    # Load profile from file
+    # Otherwise revalidate or load from storage off the event loop
     try:
-        with open(profile_path, 'r') as f:
-            profile_data = json.load(f)
-            return UserProfile(**profile_data)
+        profile = await run_io(profile_cache.get, user_id, storage.profile_version, load_profile)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading profile: {str(e)}")
+    
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    return profile
 
 @router.post("/expense", response_model=ExpenseEntry)
 async def add_expense(expense: ExpenseEntry):
-    # In a real implementation, this would save to a database
+    async with user_locks.lock(expense.user_id):
+        try:
+            await run_io(storage.add_expense, expense.dict())
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     return expense
 
+@router.get("/expense/{user_id}", response_model=List[ExpenseEntry])
+async def list_expenses(user_id: str):
+    expenses = await run_io(storage.list_expenses, user_id)
+    return [ExpenseEntry(**expense) for expense in expenses]
+
+@router.get("/expense/{user_id}/summary", response_model=Dict[str, Any])
+async def summarize_expenses(user_id: str, period: Optional[str] = None, months: Optional[int] = Query(None, ge=1),
+                             start_month: Optional[str] = None, end_month: Optional[str] = None):
+    """Spend per month and category from the ledger rollups.
+    
+    Pick the range with ``period`` (``2024-05`` or ``2024-Q2``), ``months``
+    (the last n months including this one) or ``start_month``/``end_month``;
+    with none of them the whole history is summarised.
+    """
+    try:
+        if period:
+            start_month, end_month = period_range(period)
+        elif months:
+            start_month, end_month = recent_range(months)
+        else:
+            start_month = start_month and period_range(start_month)[0]
+            end_month = end_month and period_range(end_month)[1]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return await run_io(storage.expense_summary, user_id, start_month, end_month)
+
 @router.post("/goal", response_model=FinancialGoal)
 async def add_goal(goal: FinancialGoal):
-    # In a real implementation, this would save to a database
-    return goal
+    async with user_locks.lock(goal.user_id):
+        try:
+            stored = await run_io(storage.add_goal, goal.dict(exclude={"goal_id", "contribution_count"}))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return FinancialGoal(**stored)
+
+@router.get("/goal/{user_id}", response_model=List[FinancialGoal])
+async def list_goals(user_id: str):
+    goals = await run_io(storage.list_goals, user_id)
+    return [FinancialGoal(**goal) for goal in goals]
+
+@router.put("/goal/{user_id}/{goal_id}", response_model=FinancialGoal)
+async def update_goal(user_id: str, goal_id: str, update: GoalUpdate):
+    """Change a goal's details; a new saved amount is logged as an adjustment so the contribution history still adds up"""
+    changes = {field: value for field, value in update.dict().items() if value is not None}
+    current_amount = changes.pop("current_amount", None)
+    async with user_locks.lock(user_id):
+        try:
+            if current_amount is not None:
+                goal = await run_io(storage.get_goal, user_id, goal_id)
+                if goal is not None and current_amount != goal["current_amount"]:
+                    await run_io(storage.add_goal_contribution, user_id, goal_id,
+                                 {"amount": current_amount - goal["current_amount"], "note": "Adjustment"})
+            goal = await run_io(storage.update_goal, user_id, goal_id, changes)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if goal is None:
+        raise HTTPException(status_code=404, detail="Goal not found")
+    return FinancialGoal(**goal)
+
+@router.delete("/goal/{user_id}/{goal_id}")
+async def delete_goal(user_id: str, goal_id: str):
+    async with user_locks.lock(user_id):
+        deleted = await run_io(storage.delete_goal, user_id, goal_id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Goal not found")
+    return {"deleted": goal_id}
+
+@router.post("/goal/{user_id}/{goal_id}/contributions", response_model=Dict[str, Any])
+async def add_goal_contribution(user_id: str, goal_id: str, contribution: GoalContribution):
+    """Record money put into (or taken out of) a goal; the goal's saved amount is updated in the same write"""
+    if contribution.amount == 0:
+        raise HTTPException(status_code=400, detail="Contribution amount must not be zero")
+    async with user_locks.lock(user_id):
+        try:
+            result = await run_io(storage.add_goal_contribution, user_id, goal_id, contribution.dict())
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Goal not found")
+    return result
+
+@router.get("/goal/{user_id}/{goal_id}/contributions", response_model=List[Dict[str, Any]])
+async def list_goal_contributions(user_id: str, goal_id: str):
+    if await run_io(storage.get_goal, user_id, goal_id) is None:
+        raise HTTPException(status_code=404, detail="Goal not found")
+    return await run_io(storage.list_goal_contributions, user_id, goal_id)
+
+@router.get("/goals/due", response_model=List[FinancialGoal])
+async def list_goals_due(days: int = Query(90, ge=0), include_achieved: bool = False):
+    """Goals of every user whose target date falls within the next ``days`` days"""
+    today = datetime.now().date()
+    goals = await run_io(storage.list_goals_due, today.isoformat(), (today + timedelta(days=days)).isoformat())
+    if not include_achieved:
+        goals = [goal for goal in goals if goal["current_amount"] < goal["target_amount"]]
+    return [FinancialGoal(**goal) for goal in goals]
+
+@router.post("/goal/plan", response_model=Dict[str, Any])
+async def plan_goal_savings(request: GoalPlanRequest):
+    """Monthly allocation of the surplus across goals by priority and deadline, with a verdict per goal"""
+    monthly_surplus, goals = request.monthly_surplus, request.goals
+    if monthly_surplus is None or goals is None:
+        profile = await get_profile(request.user_id)
+        if monthly_surplus is None:
+            monthly_surplus = profile.income - sum(profile.expenses.values())
+        if goals is None:
+            goals = await run_io(storage.list_goals, request.user_id) or profile.goals
+    
+    return await run_io(plan_goals, monthly_surplus, goals)
+
+async def budget_summary(profile: UserProfile, priority: int = PRIORITY_SUMMARY) -> str:
+    """Granite budget summary of a profile and its recent recorded spending.
+    
+    Identical concurrent requests share one call; a background call (the
+    prewarm) only fills the response cache for the next request.
+    """
+    # Recent spending from the expense ledger, read from its monthly rollups
+    spend_history = await run_io(storage.expense_summary, profile.user_id, *recent_range(EXPENSE_SUMMARY_MONTHS))
+    profile_data = profile.dict()
+    call_key = fingerprint(profile.user_id, "summary", profile_fingerprint(profile_data), spend_history, priority)
+    return await inflight_calls.do(call_key, lambda: granite_handler.generate_budget_summary(profile_data, spend_history, priority))
 
 @router.post("/summary")
 async def generate_summary(user_id: str = Body(..., embed=True)):
     # Get user profile (placeholder)
     profile = await get_profile(user_id)
     
-    # Generate summary with Granite
-    summary = await granite_handler.generate_budget_summary(profile)
+    started_at = await admit("summary")
+    try:
+        summary = await budget_summary(profile)
+    finally:
+        admission["summary"].release(started_at)
     
     return {"summary": summary}
 
 @router.post("/tax", response_model=Dict[str, Any])
 async def calculate_tax_info(request: TaxCalculationRequest):
-    # Calculate tax based on income and regime
-    tax_amount = calculate_tax(request.income, request.regime)
+    # Calculate tax based on income, regime and financial year; deductions only reduce old-regime income
+    if request.deductions < 0:
+        raise HTTPException(status_code=400, detail="deductions must not be negative")
+    deductions = 0 if request.regime.lower() == "new" else request.deductions
+    try:
+        tax_amount = calculate_tax(request.income - deductions, request.regime, request.fy)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # If comparing regimes is requested
     comparison = None
     if request.regime == "compare":
-        comparison = compare_tax_regimes(request.income)
+        comparison = compare_tax_regimes(request.income, request.fy, request.deductions)
     
     # Calculate HRA exemption if applicable
-    hra_exemption = calculate_hra_exemption(request.income * 0.4, request.city_tier)  # Assuming HRA is 40% of income
+    if request.hra_received is not None:
+        hra_exemption = calculate_hra_exemption(request.hra_received, request.city_tier,
+                                                request.rent_paid or 0, request.basic_salary or 0)
+    else:
+        hra_exemption = calculate_hra_exemption(request.income * 0.4, request.city_tier)  # Assuming HRA is 40% of income
     
     return {
         "tax_amount": tax_amount,
         "regime": request.regime,
+        "fy": request.fy or tax_rules.default_fy,
+        "deductions": deductions,
         "hra_exemption": hra_exemption,
         "regime_comparison": comparison
-    }
\ No newline at end of file
+    }
+
+@router.get("/tax/years", response_model=Dict[str, Any])
+async def get_tax_years():
+    """Financial years with tax rules, and the one used when none is given"""
+    return {"years": tax_rules.years(), "default": tax_rules.default_fy}
+
+@router.post("/tax/batch")
+async def calculate_tax_batch(request: Request, output_format: str = Query("columnar", alias="format"), fy: Optional[str] = None):
+    """Old and new regime tax for many incomes at once.
+    
+    Accepts ``{"income": [...]}`` or, with an NDJSON content type, one
+    ``{"income": x}`` per line. Returns columns by default, or one row per
+    line with ``format=ndjson``. ``fy`` selects the financial year.
+    """
+    body = await request.body()
+    ndjson_in = "ndjson" in request.headers.get("content-type", "")
+    try:
+        incomes = await run_io(parse_incomes, body, ndjson_in)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(incomes) > TAX_BATCH_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {TAX_BATCH_MAX_ROWS} incomes per request")
+    
+    try:
+        columns = await run_io(compare_regimes_batch, incomes, fy)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if output_format == "ndjson":
+        return StreamingResponse(columns_to_ndjson(columns), media_type="application/x-ndjson")
+    return Response(content=await run_io(columns_to_json, columns), media_type="application/json")
+
+@router.post("/tax/curve", response_model=Dict[str, Any])
+async def calculate_tax_curve(request: TaxCurveRequest):
+    """Tax-vs-income curves for both regimes, the slab breakdown at the income and the break-even incomes"""
+    max_income = request.max_income if request.max_income is not None else max(2 * request.income, 3000000)
+    if request.min_income < 0 or max_income <= request.min_income:
+        raise HTTPException(status_code=400, detail="max_income must be greater than a non-negative min_income")
+    if not 2 <= request.points <= TAX_CURVE_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"points must be between 2 and {TAX_CURVE_MAX_POINTS}")
+    
+    try:
+        return await run_io(tax_curve, request.income, request.min_income, max_income, request.points, request.fy,
+                            request.deductions)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/tax/optimize", response_model=Dict[str, Any])
+async def optimize_tax_plan(request: TaxOptimizeRequest):
+    """Regime and 80C/80D/80CCD(1B)/HRA allocation with the lowest tax, with the benefit per rupee invested"""
+    amounts = (request.basic_salary, request.hra_received, request.other_income, request.rent_paid,
+               request.investment_capacity, request.existing_80c)
+    if any(amount < 0 for amount in amounts):
+        raise HTTPException(status_code=400, detail="Amounts must not be negative")
+    
+    try:
+        return await run_io(optimize_tax, **request.dict())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/projection", response_model=Dict[str, Any])
+async def project_savings(request: ProjectionRequest):
+    """Savings growth for a grid of (years x rate x monthly contribution) scenarios.
+    
+    ``grid`` holds one column per field with a row per scenario; ``curves``
+    holds the monthly balance of each (rate, contribution) pair over the
+    longest horizon.
+    """
+    if not request.years or not request.annual_rates or not request.monthly_contributions:
+        raise HTTPException(status_code=400, detail="years, annual_rates and monthly_contributions must not be empty")
+    if any(years < 0 or years > PROJECTION_MAX_YEARS for years in request.years):
+        raise HTTPException(status_code=400, detail=f"years must be between 0 and {PROJECTION_MAX_YEARS}")
+    if any(rate <= -1200 for rate in request.annual_rates):
+        raise HTTPException(status_code=400, detail="annual_rates must be above -1200%")
+    scenarios = len(request.years) * len(request.annual_rates) * len(request.monthly_contributions)
+    if scenarios > PROJECTION_MAX_SCENARIOS:
+        raise HTTPException(status_code=413, detail=f"At most {PROJECTION_MAX_SCENARIOS} scenarios per request")
+    pairs = len(request.annual_rates) * len(request.monthly_contributions)
+    if request.include_curves and pairs > PROJECTION_MAX_CURVES:
+        raise HTTPException(status_code=413, detail=f"At most {PROJECTION_MAX_CURVES} rate and contribution pairs with curves")
+    
+    grid = await run_io(projection_grid, request.years, request.annual_rates,
+                        request.monthly_contributions, request.initial_balance)
+    result = {"grid": {name: values.tolist() for name, values in grid.items()}}
+    if request.include_curves:
+        result["curves"] = await run_io(projection_curves, max(request.years), request.annual_rates,
+                                        request.monthly_contributions, request.initial_balance)
+    return result
+
+@router.post("/projection/monte-carlo", response_model=Dict[str, Any])
+async def simulate_savings(request: MonteCarloRequest):
+    """Seeded Monte Carlo savings bands (P10/P50/P90) and the probability of reaching each goal"""
+    monthly_contribution, goals = request.monthly_contribution, request.goals
+    if monthly_contribution is None or goals is None:
+        profile = await get_profile(request.user_id)
+        if monthly_contribution is None:
+            monthly_contribution = profile.income - sum(profile.expenses.values())
+        if goals is None:
+            goals = await run_io(storage.list_goals, request.user_id) or profile.goals
+    
+    try:
+        return await run_io(run_simulation, request.years, monthly_contribution, request.initial_balance,
+                            request.allocation, request.assets, goals, request.paths, request.seed,
+                            request.distribution, request.df)
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/metrics", response_model=Dict[str, Any])
+async def get_metrics():
+    return {
+        "profile_cache": profile_cache.stats(),
+        "history_writer": history_writer.stats(),
+        "gemini_context": gemini_handler.context_builder.stats(),
+        "gemini_sessions": gemini_handler.session_pool.stats(),
+        "gemini_calls": gemini_handler.executor.stats(),
+        "granite": {
+            "retries": granite_handler.retries,
+            "fallbacks": granite_handler.fallbacks,
+            "breaker": granite_handler.breaker.stats(),
+            "scheduler": granite_handler.scheduler.stats()
+        },
+        "response_cache": response_cache.stats(),
+        "coalescing": inflight_calls.stats(),
+        "intent_router": intent_router.stats(),
+        "admission": {endpoint: controller.stats() for endpoint, controller in admission.items()}
+    }
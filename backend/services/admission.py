@@ -0,0 +1,106 @@
+import os
+import math
+import time
+import asyncio
+from typing import Any, Dict
+
+# Starting guess for how long one admitted request takes, before any are measured
+ADMISSION_INITIAL_SERVICE_SECONDS = float(os.getenv("ADMISSION_INITIAL_SERVICE_SECONDS", 2.0))
+# Weight of the newest sample in the service time average
+ADMISSION_EWMA_ALPHA = 0.2
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be served within its deadline"""
+
+    def __init__(self, endpoint: str, retry_after: int):
+        super().__init__(f"{endpoint} is at capacity; retry in {retry_after}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """Bounded admission queue for one endpoint.
+
+    At most ``max_concurrent`` requests run at once and at most ``max_queue``
+    wait behind them. A request is shed up front when the queue is full or
+    when the expected wait, estimated from an EWMA of recent service times,
+    would push it past ``deadline`` seconds; a queued request that is still
+    waiting when its deadline arrives is shed too.
+    """
+
+    def __init__(self, endpoint: str, max_concurrent: int, max_queue: int, deadline: float):
+        self.endpoint = endpoint
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.service_time = ADMISSION_INITIAL_SERVICE_SECONDS
+        self.running = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @classmethod
+    def from_env(cls, endpoint: str, max_concurrent: int = 16, max_queue: int = 64, deadline: float = 30.0) -> "AdmissionController":
+        """Controller configured by ``ADMISSION_<ENDPOINT>_CONCURRENCY``, ``_MAX_QUEUE`` and ``_DEADLINE_SECONDS``"""
+        prefix = f"ADMISSION_{endpoint.upper()}"
+        return cls(
+            endpoint,
+            int(os.getenv(f"{prefix}_CONCURRENCY", max_concurrent)),
+            int(os.getenv(f"{prefix}_MAX_QUEUE", max_queue)),
+            float(os.getenv(f"{prefix}_DEADLINE_SECONDS", deadline))
+        )
+
+    def estimated_wait(self) -> float:
+        """Expected time before a newly arriving request starts"""
+        if self.running < self.max_concurrent:
+            return 0.0
+        # Each slot frees up about once per service time, in parallel across slots
+        return (self.queued + 1) * self.service_time / self.max_concurrent
+
+    def _reject(self, wait: float) -> AdmissionRejected:
+        self.rejected += 1
+        return AdmissionRejected(self.endpoint, max(1, math.ceil(wait)))
+
+    async def acquire(self) -> float:
+        """Wait for a slot; returns the start time to pass to ``release``"""
+        wait = self.estimated_wait()
+        if self.queued >= self.max_queue or wait + self.service_time > self.deadline:
+            raise self._reject(wait + self.service_time)
+
+        self.queued += 1
+        try:
+            if self._semaphore.locked():
+                # Give up once starting later could no longer finish by the deadline
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.deadline - self.service_time)
+            else:
+                await self._semaphore.acquire()
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise self._reject(self.estimated_wait() + self.service_time)
+        finally:
+            self.queued -= 1
+
+        self.running += 1
+        self.admitted += 1
+        return time.monotonic()
+
+    def release(self, started_at: float) -> None:
+        self.running -= 1
+        elapsed = time.monotonic() - started_at
+        self.service_time += ADMISSION_EWMA_ALPHA * (elapsed - self.service_time)
+        self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "deadline_seconds": self.deadline,
+            "running": self.running,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "service_time_ms": self.service_time * 1000,
+            "estimated_wait_ms": self.estimated_wait() * 1000
+        }
@@ -0,0 +1,41 @@
+import os
+import asyncio
+import weakref
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+# Size of the thread pool that runs blocking storage I/O off the event loop
+STORAGE_IO_WORKERS = int(os.getenv("STORAGE_IO_WORKERS", 8))
+
+_storage_executor = ThreadPoolExecutor(max_workers=STORAGE_IO_WORKERS, thread_name_prefix="storage-io")
+
+async def run_io(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking storage call in the bounded I/O pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_storage_executor, functools.partial(func, *args, **kwargs))
+
+def shutdown_io() -> None:
+    """Wait for queued storage work to finish"""
+    _storage_executor.shutdown(wait=True)
+
+class UserLockRegistry:
+    """Hands out one asyncio.Lock per user id.
+
+    Locks are held in a weak dictionary, so a user's lock disappears once no
+    request is holding or waiting on it and the registry does not grow with
+    the number of users ever seen.
+    """
+
+    def __init__(self):
+        self._locks = weakref.WeakValueDictionary()
+
+    def lock(self, user_id: str) -> asyncio.Lock:
+        lock = self._locks.get(user_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[user_id] = lock
+        return lock
+
+    def __len__(self) -> int:
+        return len(self._locks)
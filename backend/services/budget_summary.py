@@ -0,0 +1,105 @@
+from typing import Any, Dict, List, Optional
+
+# Expense categories counted as needs under the 50/30/20 rule; everything else is a want
+NEEDS_CATEGORIES = {"housing", "rent", "food", "groceries", "transportation", "utilities", "healthcare",
+                    "insurance", "education", "emi", "loan"}
+
+# Target shares of income under the 50/30/20 rule
+RULE_SHARES = {"Needs": 0.50, "Wants": 0.30, "Savings": 0.20}
+
+def budget_breakdown(user_profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Savings rate, category shares, goal progress and 50/30/20 deltas for a profile"""
+    income = user_profile.get("income", 0) or 0
+    expenses = {category: amount for category, amount in user_profile.get("expenses", {}).items() if amount > 0}
+    total_expenses = sum(expenses.values())
+    savings = income - total_expenses
+
+    needs = sum(amount for category, amount in expenses.items() if category.lower() in NEEDS_CATEGORIES)
+    actual = {"Needs": needs, "Wants": total_expenses - needs, "Savings": savings}
+
+    goals = []
+    for goal in user_profile.get("goals", []):
+        target = goal.get("target_amount", 0) or 0
+        current = goal.get("current_amount", 0) or 0
+        goals.append({
+            "goal_name": goal.get("goal_name", "Goal"),
+            "target_amount": target,
+            "current_amount": current,
+            "progress": current / target if target > 0 else 0.0,
+            "remaining": max(0.0, target - current)
+        })
+
+    return {
+        "income": income,
+        "total_expenses": total_expenses,
+        "savings": savings,
+        "savings_rate": savings / income if income > 0 else 0.0,
+        "category_shares": {
+            category: amount / income if income > 0 else 0.0
+            for category, amount in sorted(expenses.items(), key=lambda item: item[1], reverse=True)
+        },
+        "rule_deltas": {
+            bucket: {"actual": amount, "target": income * RULE_SHARES[bucket], "delta": amount - income * RULE_SHARES[bucket]}
+            for bucket, amount in actual.items()
+        },
+        "goals": goals
+    }
+
+def local_budget_summary(user_profile: Dict[str, Any], spend_history: Optional[Dict[str, Any]] = None) -> str:
+    """Deterministic budget summary, served when the Granite model is unavailable.
+
+    With ``spend_history`` (an expense ledger summary), the profile's
+    expenses are expected to already be its monthly averages.
+    """
+    breakdown = budget_breakdown(user_profile)
+    income = breakdown["income"]
+    lines: List[str] = [
+        "*Quick summary computed from your profile while the AI summary service is unavailable.*",
+        "",
+        f"**Monthly Income:** ₹{income:,.2f}",
+        f"**Total Expenses:** ₹{breakdown['total_expenses']:,.2f}",
+        f"**Monthly Savings:** ₹{breakdown['savings']:,.2f} ({breakdown['savings_rate'] * 100:.1f}% of income)",
+        ""
+    ]
+
+    if spend_history:
+        lines.append(f"**Recorded spending ({spend_history['start_month']} to {spend_history['end_month']}):**")
+        for month in spend_history["months"]:
+            lines.append(f"- {month['month']}: ₹{month['total']:,.2f} across {month['count']} expenses")
+        lines.append("")
+
+    if breakdown["category_shares"]:
+        lines.append("**Where your money goes:**")
+        for category, share in breakdown["category_shares"].items():
+            lines.append(f"- {category}: {share * 100:.1f}% of income")
+        lines.append("")
+
+    lines.append("**50/30/20 check:**")
+    for bucket, values in breakdown["rule_deltas"].items():
+        direction = "over" if values["delta"] > 0 else "under"
+        lines.append(f"- {bucket}: ₹{values['actual']:,.2f} vs target ₹{values['target']:,.2f} "
+                     f"(₹{abs(values['delta']):,.2f} {direction})")
+    lines.append("")
+
+    if breakdown["goals"]:
+        lines.append("**Goal progress:**")
+        for goal in breakdown["goals"]:
+            lines.append(f"- {goal['goal_name']}: {goal['progress'] * 100:.1f}% complete, "
+                         f"₹{goal['remaining']:,.2f} to go")
+        lines.append("")
+
+    # Recommendations from the largest gaps against the rule
+    deltas = breakdown["rule_deltas"]
+    recommendations = []
+    if deltas["Savings"]["delta"] < 0:
+        recommendations.append(f"Raise monthly savings by ₹{-deltas['Savings']['delta']:,.2f} to reach 20% of income.")
+    if deltas["Wants"]["delta"] > 0:
+        recommendations.append(f"Trim discretionary spending by ₹{deltas['Wants']['delta']:,.2f}.")
+    if deltas["Needs"]["delta"] > 0:
+        recommendations.append(f"Essential costs exceed 50% of income by ₹{deltas['Needs']['delta']:,.2f}; review housing and fixed bills.")
+    if not recommendations:
+        recommendations.append("Your budget is within the 50/30/20 guidelines; keep directing surplus savings to your goals.")
+
+    lines.append("**Recommendations:**")
+    lines.extend(f"- {text}" for text in recommendations)
+    return "\n".join(lines)
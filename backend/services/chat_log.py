@@ -0,0 +1,278 @@
+import os
+import re
+import copy
+import json
+import hashlib
+import threading
+from typing import Iterable, List, Dict, Optional
+
+# Default location and segment size for the per-user chat logs
+CHAT_LOG_DIR = os.getenv("CHAT_LOG_DIR", "db/chat_logs")
+SEGMENT_MAX_BYTES = int(os.getenv("CHAT_LOG_SEGMENT_BYTES", 1024 * 1024))
+
+INDEX_FILE = "index.json"
+MIGRATION_MARKER = ".migrated"
+
+_SAFE_USER_ID = re.compile(r"^[A-Za-z0-9_\-]{1,64}$")
+_HASHED_DIR = re.compile(r"^h_[0-9a-f]{40}$")
+
+class ChatLogStore:
+    """Append-only chat history stored as JSONL segments, one directory per user.
+
+    A small ``index.json`` per user records the first turn, turn count and byte
+    size of every segment, so appends only write the new turns.
+    """
+
+    def __init__(self, root_dir: str = CHAT_LOG_DIR, segment_max_bytes: int = SEGMENT_MAX_BYTES, fsync: bool = False):
+        self.root_dir = root_dir
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _user_dir(self, user_id: str) -> str:
+        """Map a user id to its log directory without allowing path traversal"""
+        if _SAFE_USER_ID.match(user_id):
+            name = user_id
+        else:
+            name = "h_" + hashlib.sha1(user_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.root_dir, name)
+
+    def dir_owners(self, known_user_ids: Iterable[str] = ()) -> Dict[str, Optional[str]]:
+        """User id for every log directory present.
+
+        Directories named after a hashed id map back only through
+        ``known_user_ids``; those that match none map to None.
+        """
+        hashed = {os.path.basename(self._user_dir(user_id)): user_id for user_id in known_user_ids}
+        owners = {}
+        for name in sorted(os.listdir(self.root_dir)):
+            if os.path.isdir(os.path.join(self.root_dir, name)):
+                owners[name] = hashed.get(name) if _HASHED_DIR.match(name) else name
+        return owners
+
+    def read_dir(self, name: str) -> List[Dict[str, str]]:
+        """Read the log in directory ``name`` without knowing whose it is"""
+        return self._read(os.path.join(self.root_dir, os.path.basename(name)))
+
+    @staticmethod
+    def _segment_name(number: int) -> str:
+        return f"{number:06d}.jsonl"
+
+    def _write_index(self, user_dir: str, index: Dict) -> None:
+        """Atomically replace the index file.
+
+        The index is not fsynced: it can always be rebuilt from the segments,
+        which is what ``_load_index`` does when it lags behind them.
+        """
+        index_path = os.path.join(user_dir, INDEX_FILE)
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, index_path)
+
+    def _load_index(self, user_dir: str) -> Dict:
+        """Load the index and reconcile it with the segments on disk.
+
+        A crash between writing a segment and writing the index leaves the index
+        behind the data; the tail segment is recounted in that case.
+        """
+        try:
+            with open(os.path.join(user_dir, INDEX_FILE), "r") as f:
+                index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            index = {"segments": []}
+            if os.path.isdir(user_dir):
+                for file_name in sorted(os.listdir(user_dir)):
+                    if file_name.endswith(".jsonl"):
+                        index["segments"].append({"file": file_name, "first_turn": 0, "turns": 0, "bytes": 0})
+                first_turn = 0
+                for segment in index["segments"]:
+                    self._recount_segment(user_dir, segment)
+                    segment["first_turn"] = first_turn
+                    first_turn += segment["turns"]
+            return index
+
+        segments = index["segments"]
+        if segments:
+            tail = segments[-1]
+            try:
+                size = os.path.getsize(os.path.join(user_dir, tail["file"]))
+            except FileNotFoundError:
+                size = 0
+            if size != tail["bytes"]:
+                self._recount_segment(user_dir, tail)
+
+            # Pick up segments created after the index was last written
+            while os.path.exists(os.path.join(user_dir, self._segment_name(len(segments) + 1))):
+                tail = segments[-1]
+                segment = {
+                    "file": self._segment_name(len(segments) + 1),
+                    "first_turn": tail["first_turn"] + tail["turns"],
+                    "turns": 0,
+                    "bytes": 0
+                }
+                self._recount_segment(user_dir, segment)
+                segments.append(segment)
+        return index
+
+    @staticmethod
+    def _recount_segment(user_dir: str, segment: Dict) -> None:
+        """Recount the complete turns in a segment, dropping a torn final line"""
+        path = os.path.join(user_dir, segment["file"])
+        turns = 0
+        valid_bytes = 0
+        try:
+            with open(path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    turns += 1
+                    valid_bytes += len(line)
+            if valid_bytes != os.path.getsize(path):
+                with open(path, "r+b") as f:
+                    f.truncate(valid_bytes)
+        except FileNotFoundError:
+            pass
+        segment["turns"] = turns
+        segment["bytes"] = valid_bytes
+
+    def append(self, user_id: str, turns: List[Dict[str, str]]) -> None:
+        """Append new turns to a user's log"""
+        if turns:
+            with self._lock:
+                self._append_locked(user_id, turns)
+
+    def append_batch(self, batch: Dict[str, List[Dict[str, str]]]) -> None:
+        """Append turns for several users under a single lock acquisition.
+
+        All or nothing: if any user's write fails, the logs already written
+        are cut back to where they were, so retrying the batch stores each
+        turn once.
+        """
+        with self._lock:
+            undo = []
+            try:
+                for user_id, turns in batch.items():
+                    if turns:
+                        self._append_locked(user_id, turns, undo)
+            except Exception:
+                for user_dir, index in reversed(undo):
+                    self._restore(user_dir, index)
+                raise
+
+    def _restore(self, user_dir: str, index: Dict) -> None:
+        """Put a user's log back to the state recorded in ``index``"""
+        segments = index["segments"]
+        try:
+            for file_name in os.listdir(user_dir):
+                if file_name.endswith(".jsonl") and file_name not in {segment["file"] for segment in segments}:
+                    os.remove(os.path.join(user_dir, file_name))
+            if segments and os.path.exists(os.path.join(user_dir, segments[-1]["file"])):
+                with open(os.path.join(user_dir, segments[-1]["file"]), "r+b") as f:
+                    f.truncate(segments[-1]["bytes"])
+            self._write_index(user_dir, index)
+        except OSError as e:
+            print(f"Error rolling back chat log in {user_dir}: {str(e)}")
+
+    def _append_locked(self, user_id: str, turns: List[Dict[str, str]], undo: Optional[List] = None) -> None:
+        lines = [(json.dumps(turn, ensure_ascii=False) + "\n").encode("utf-8") for turn in turns]
+
+        user_dir = self._user_dir(user_id)
+        os.makedirs(user_dir, exist_ok=True)
+        index = self._load_index(user_dir)
+        if undo is not None:
+            undo.append((user_dir, copy.deepcopy(index)))
+
+        segments = index["segments"]
+        if not segments or segments[-1]["bytes"] >= self.segment_max_bytes:
+            first_turn = segments[-1]["first_turn"] + segments[-1]["turns"] if segments else 0
+            segments.append({
+                "file": self._segment_name(len(segments) + 1),
+                "first_turn": first_turn,
+                "turns": 0,
+                "bytes": 0
+            })
+
+        tail = segments[-1]
+        with open(os.path.join(user_dir, tail["file"]), "ab") as f:
+            f.write(b"".join(lines))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+        tail["turns"] += len(lines)
+        tail["bytes"] += sum(len(line) for line in lines)
+        self._write_index(user_dir, index)
+
+    def read(self, user_id: str, last_n: Optional[int] = None) -> List[Dict[str, str]]:
+        """Read a user's history, optionally only the most recent ``last_n`` turns"""
+        return self._read(self._user_dir(user_id), last_n)
+
+    def _read(self, user_dir: str, last_n: Optional[int] = None) -> List[Dict[str, str]]:
+        if not os.path.isdir(user_dir):
+            return []
+
+        with self._lock:
+            index = self._load_index(user_dir)
+
+        segments = index["segments"]
+        if last_n is not None:
+            # Use the index to skip segments that hold only older turns
+            total = sum(segment["turns"] for segment in segments)
+            start_turn = max(0, total - last_n)
+            segments = [s for s in segments if s["first_turn"] + s["turns"] > start_turn]
+        else:
+            start_turn = 0
+
+        history = []
+        for segment in segments:
+            path = os.path.join(user_dir, segment["file"])
+            try:
+                with open(path, "rb") as f:
+                    data = f.read(segment["bytes"])
+            except FileNotFoundError:
+                continue
+            for offset, line in enumerate(data.splitlines()):
+                if segment["first_turn"] + offset >= start_turn:
+                    history.append(json.loads(line))
+        return history
+
+    def count(self, user_id: str) -> int:
+        """Number of turns stored for a user"""
+        user_dir = self._user_dir(user_id)
+        if not os.path.isdir(user_dir):
+            return 0
+        with self._lock:
+            index = self._load_index(user_dir)
+        return sum(segment["turns"] for segment in index["segments"])
+
+    def migrate_memory_json(self, memory_path: str = "db/memory.json") -> int:
+        """One-time import of the legacy ``memory.json`` blob.
+
+        Users that already have a log are left untouched, and a marker file keeps
+        the migration from running again. Returns the number of users imported.
+        """
+        marker_path = os.path.join(self.root_dir, MIGRATION_MARKER)
+        if os.path.exists(marker_path):
+            return 0
+
+        try:
+            with open(memory_path, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = {}
+
+        migrated = 0
+        for user_id, history in data.items():
+            if not isinstance(history, list) or self.count(user_id) > 0:
+                continue
+            self.append(user_id, history)
+            migrated += 1
+
+        with open(marker_path, "w") as f:
+            f.write(memory_path)
+
+        if migrated:
+            print(f"Migrated chat history for {migrated} users from {memory_path}")
+        return migrated
@@ -0,0 +1,84 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from services.fingerprint import turn_key
+from services.context_builder import GEMINI_CONTEXT_TOKEN_BUDGET, estimate_tokens
+
+# Number of live Gemini chat sessions kept across requests
+CHAT_SESSION_POOL_SIZE = int(os.getenv("CHAT_SESSION_POOL_SIZE", 256))
+
+class PooledSession:
+    """A live chat session plus what it has seen, to detect divergence"""
+
+    def __init__(self, session: Any, profile_version: Optional[str], history: List[Dict[str, str]], tokens: int):
+        self.session = session
+        self.profile_version = profile_version
+        self.turn_count = len(history)
+        self.last_key = turn_key(history[-1]) if history else None
+        self.tokens = tokens
+
+    def record_exchange(self, user_message: str, response_text: str) -> None:
+        """Account for a user/assistant exchange sent through this session"""
+        self.turn_count += 2
+        self.last_key = turn_key({"role": "assistant", "content": response_text})
+        self.tokens += estimate_tokens(user_message) + estimate_tokens(response_text)
+
+    def continues(self, history: List[Dict[str, str]]) -> bool:
+        """True if ``history`` is exactly what this session has already seen"""
+        if len(history) != self.turn_count:
+            return False
+        return (turn_key(history[-1]) if history else None) == self.last_key
+
+class ChatSessionPool:
+    """LRU pool of Gemini chat sessions keyed by user id and profile version.
+
+    A session is checked out for the duration of a request, so concurrent
+    requests for one user never share it; a session is rebuilt on eviction,
+    profile change, history divergence or once it outgrows the token budget.
+    """
+
+    def __init__(self, max_sessions: int = CHAT_SESSION_POOL_SIZE, token_budget: int = GEMINI_CONTEXT_TOKEN_BUDGET):
+        self.max_sessions = max_sessions
+        self.token_budget = token_budget
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.rebuilds = {"miss": 0, "profile_changed": 0, "diverged": 0, "over_budget": 0}
+        self.evictions = 0
+
+    def checkout(self, user_id: str, profile_version: Optional[str], history: List[Dict[str, str]]) -> Optional[PooledSession]:
+        """Take the user's session out of the pool if it can continue ``history``"""
+        with self._lock:
+            pooled = self._sessions.pop(user_id, None)
+            if pooled is None:
+                reason = "miss"
+            elif pooled.profile_version != profile_version:
+                reason = "profile_changed"
+            elif not pooled.continues(history):
+                reason = "diverged"
+            elif pooled.tokens > self.token_budget:
+                reason = "over_budget"
+            else:
+                self.reused += 1
+                return pooled
+            self.rebuilds[reason] += 1
+            return None
+
+    def checkin(self, user_id: str, pooled: PooledSession) -> None:
+        """Return a session to the pool, evicting the least recently used"""
+        with self._lock:
+            self._sessions[user_id] = pooled
+            self._sessions.move_to_end(user_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "reused": self.reused,
+                "rebuilds": dict(self.rebuilds),
+                "evictions": self.evictions
+            }
@@ -0,0 +1,137 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
+from services.fingerprint import turn_key
+
+# Token budget for conversation history sent to Gemini, and the share of it
+# that may be spent on the summary of turns that fell out of the window
+GEMINI_CONTEXT_TOKEN_BUDGET = int(os.getenv("GEMINI_CONTEXT_TOKEN_BUDGET", 3000))
+GEMINI_SUMMARY_TOKEN_BUDGET = int(os.getenv("GEMINI_SUMMARY_TOKEN_BUDGET", 400))
+CONTEXT_CACHE_SIZE = int(os.getenv("CONTEXT_CACHE_SIZE", 1024))
+
+# Length of the excerpt kept per summarized turn
+SUMMARY_EXCERPT_CHARS = 160
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)"""
+    return max(1, (len(text) + 3) // 4)
+
+def summarize_turn(role: str, content: str) -> str:
+    """Compact one-line digest of a turn: its first sentence, truncated"""
+    text = " ".join(content.split())
+    first_sentence = _SENTENCE_END.split(text, maxsplit=1)[0]
+    if len(first_sentence) > SUMMARY_EXCERPT_CHARS:
+        first_sentence = first_sentence[:SUMMARY_EXCERPT_CHARS].rstrip() + "..."
+    speaker = "User" if role == "user" else "Assistant"
+    return f"- {speaker}: {first_sentence}"
+
+class ConversationContext:
+    """Rolling window of recent turns plus a compact summary of older ones.
+
+    Token counts are computed once per turn. Appending turns only touches the
+    new turns and whatever falls out of the window, never the whole history.
+    """
+
+    def __init__(self, token_budget: int, summary_budget: int):
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.turn_count = 0
+        self.last_key = None
+        self.window: List[Tuple[Dict[str, str], int]] = []  # (turn, tokens)
+        self.window_tokens = 0
+        self.summary: List[Tuple[str, int]] = []  # (line, tokens)
+        self.summary_tokens = 0
+        self.summarized_turns = 0
+
+    def matches(self, history: List[Dict[str, str]]) -> bool:
+        """True if ``history`` extends the turns already folded into this context"""
+        if len(history) < self.turn_count:
+            return False
+        if self.turn_count == 0:
+            return True
+        return turn_key(history[self.turn_count - 1]) == self.last_key
+
+    def extend(self, turns: List[Dict[str, str]]) -> None:
+        for turn in turns:
+            tokens = estimate_tokens(turn["content"])
+            self.window.append((turn, tokens))
+            self.window_tokens += tokens
+        if turns:
+            self.turn_count += len(turns)
+            self.last_key = turn_key(turns[-1])
+        self._trim(self.token_budget)
+
+    def _trim(self, budget: int) -> None:
+        # Keep at least the latest exchange even if it alone exceeds the budget
+        while len(self.window) > 2 and self.window_tokens + self.summary_tokens > budget:
+            turn, tokens = self.window.pop(0)
+            self.window_tokens -= tokens
+            line = summarize_turn(turn["role"], turn["content"])
+            line_tokens = estimate_tokens(line)
+            self.summary.append((line, line_tokens))
+            self.summary_tokens += line_tokens
+            self.summarized_turns += 1
+            while self.summary and self.summary_tokens > self.summary_budget:
+                _, dropped = self.summary.pop(0)
+                self.summary_tokens -= dropped
+
+    def render(self, budget: Optional[int] = None) -> Tuple[Optional[str], List[Dict[str, str]]]:
+        """Return ``(summary_text, recent_turns)`` fitting within ``budget`` tokens"""
+        if budget is not None and budget < self.token_budget:
+            self._trim(budget)
+        summary_text = None
+        if self.summary:
+            summary_text = (
+                f"Summary of the earlier conversation ({self.summarized_turns} turns):\n"
+                + "\n".join(line for line, _ in self.summary)
+            )
+        return summary_text, [turn for turn, _ in self.window]
+
+class ContextBuilder:
+    """Per-user cache of ConversationContext objects, bounded by LRU eviction"""
+
+    def __init__(self, token_budget: int = GEMINI_CONTEXT_TOKEN_BUDGET, summary_budget: int = GEMINI_SUMMARY_TOKEN_BUDGET,
+                 max_users: int = CONTEXT_CACHE_SIZE):
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.max_users = max_users
+        self._contexts = OrderedDict()
+        self._lock = threading.Lock()
+        self.incremental_updates = 0
+        self.rebuilds = 0
+
+    def build(self, history: List[Dict[str, str]], user_id: Optional[str] = None,
+              reserved_tokens: int = 0) -> Tuple[Optional[str], List[Dict[str, str]]]:
+        """Fit ``history`` into the budget, reusing the user's cached context when it still applies"""
+        budget = max(0, self.token_budget - reserved_tokens)
+        if user_id is None:
+            context = ConversationContext(self.token_budget, self.summary_budget)
+            context.extend(history)
+            return context.render(budget)
+
+        with self._lock:
+            context = self._contexts.get(user_id)
+            if context is not None and context.matches(history):
+                self._contexts.move_to_end(user_id)
+                self.incremental_updates += 1
+            else:
+                context = ConversationContext(self.token_budget, self.summary_budget)
+                self._contexts[user_id] = context
+                self.rebuilds += 1
+                while len(self._contexts) > self.max_users:
+                    self._contexts.popitem(last=False)
+
+            context.extend(history[context.turn_count:])
+            return context.render(budget)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "users": len(self._contexts),
+                "incremental_updates": self.incremental_updates,
+                "rebuilds": self.rebuilds
+            }
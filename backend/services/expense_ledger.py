@@ -0,0 +1,91 @@
+import os
+import re
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Months of recorded spending (including the current one) fed to the budget summary
+EXPENSE_SUMMARY_MONTHS = int(os.getenv("EXPENSE_SUMMARY_MONTHS", 3))
+
+_MONTH = re.compile(r"^(\d{4})-(\d{2})$")
+_QUARTER = re.compile(r"^(\d{4})-Q([1-4])$", re.IGNORECASE)
+
+def expense_month(value: str) -> str:
+    """Ledger month (YYYY-MM) of an expense date"""
+    try:
+        return datetime.fromisoformat(str(value)).strftime("%Y-%m")
+    except ValueError:
+        raise ValueError(f"Invalid expense date: {value}")
+
+def _shift(month: str, months: int) -> str:
+    year, number = int(month[:4]), int(month[5:7]) - 1 + months
+    return f"{year + number // 12:04d}-{number % 12 + 1:02d}"
+
+def period_range(period: str) -> Tuple[str, str]:
+    """First and last month of a period written as YYYY-MM or YYYY-Qn"""
+    match = _MONTH.match(period)
+    if match and 1 <= int(match.group(2)) <= 12:
+        return period, period
+    match = _QUARTER.match(period)
+    if match:
+        first = f"{match.group(1)}-{(int(match.group(2)) - 1) * 3 + 1:02d}"
+        return first, _shift(first, 2)
+    raise ValueError(f"Invalid period: {period} (expected YYYY-MM or YYYY-Qn)")
+
+def recent_range(months: int, today: Optional[date] = None) -> Tuple[str, str]:
+    """The last ``months`` months, ending with the current one"""
+    current = (today or date.today()).strftime("%Y-%m")
+    return _shift(current, 1 - max(1, months)), current
+
+def months_between(start_month: str, end_month: str) -> int:
+    return (int(end_month[:4]) - int(start_month[:4])) * 12 + int(end_month[5:7]) - int(start_month[5:7]) + 1
+
+def empty_rollup() -> Dict[str, Any]:
+    return {"total": 0.0, "count": 0, "categories": {}}
+
+def apply_expense(rollup: Dict[str, Any], category: str, amount: float, count: int = 1) -> None:
+    """Fold an expense (or an aggregate of ``count`` expenses) into a rollup in place"""
+    rollup["total"] += amount
+    rollup["count"] += count
+    rollup["categories"][category] = rollup["categories"].get(category, 0.0) + amount
+
+def summarize(months: Dict[str, Dict[str, Any]], start_month: Optional[str] = None,
+              end_month: Optional[str] = None, totals: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Spend per month and per category over a range of monthly rollups.
+
+    ``months`` maps YYYY-MM to a rollup and may hold months outside the
+    range. Without a range every month is covered and ``totals`` (the
+    running totals kept on write) is used as is instead of being re-added.
+    """
+    selected = sorted(month for month in months
+                      if (start_month is None or month >= start_month) and (end_month is None or month <= end_month))
+    if totals is None or start_month is not None or end_month is not None:
+        totals = empty_rollup()
+        for month in selected:
+            for category, amount in months[month]["categories"].items():
+                apply_expense(totals, category, amount, 0)
+            totals["count"] += months[month]["count"]
+
+    start_month = start_month or (selected[0] if selected else None)
+    end_month = end_month or (selected[-1] if selected else None)
+    span = months_between(start_month, end_month) if start_month and end_month else 0
+    return {
+        "start_month": start_month,
+        "end_month": end_month,
+        "months": [{"month": month, "total": round(months[month]["total"], 2), "count": months[month]["count"],
+                    "categories": {category: round(amount, 2) for category, amount in months[month]["categories"].items()}}
+                   for month in selected],
+        "categories": {category: round(amount, 2)
+                       for category, amount in sorted(totals["categories"].items(), key=lambda item: item[1], reverse=True)},
+        "total": round(totals["total"], 2),
+        "count": totals["count"],
+        # Calendar months in the range, including months with no spending
+        "month_count": span,
+        "monthly_average": {category: round(amount / span, 2) for category, amount in totals["categories"].items()} if span else {}
+    }
+
+def rollups_from_rows(rows: Iterable[Tuple[str, str, float, int]]) -> Dict[str, Dict[str, Any]]:
+    """Monthly rollups from (month, category, total, count) rows"""
+    months: Dict[str, Dict[str, Any]] = {}
+    for month, category, total, count in rows:
+        apply_expense(months.setdefault(month, empty_rollup()), category, total, count)
+    return months
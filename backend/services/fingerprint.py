@@ -0,0 +1,19 @@
+import json
+import hashlib
+from typing import Any, Dict, Optional
+
+def fingerprint(*parts: Any) -> str:
+    """Stable hash of JSON-serializable parts"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def profile_fingerprint(user_profile: Any) -> Optional[str]:
+    """Version token for a profile (a UserProfile model or a plain dict)"""
+    if user_profile is None:
+        return None
+    data = user_profile.dict() if hasattr(user_profile, "dict") else user_profile
+    return fingerprint(data)[:16]
+
+def turn_key(turn: Dict[str, str]) -> str:
+    """Identity of a single chat turn, used to detect history divergence"""
+    return hashlib.sha1(f"{turn['role']}\x00{turn['content']}".encode("utf-8")).hexdigest()
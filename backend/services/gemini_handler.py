@@ -1,20 +1,31 @@
 import os
+import asyncio
+import threading
 import google.generativeai as genai
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional
 from dotenv import load_dotenv
+from services.context_builder import ContextBuilder, estimate_tokens
+from services.chat_sessions import ChatSessionPool, PooledSession
+from services.fingerprint import fingerprint, profile_fingerprint, turn_key
+from services.llm_executor import LLMExecutor
+from services.llm_scheduler import LLMScheduler, PRIORITY_INTERACTIVE, PRIORITY_SUMMARY
+from services.response_cache import ResponseCache
 
 # Load environment variables
 load_dotenv()
 
+GEMINI_MODEL_NAME = 'gemini-1.5-flash'
+
 class GeminiHandler:
-    def __init__(self):
+    def __init__(self, response_cache: Optional[ResponseCache] = None, scheduler: Optional[LLMScheduler] = None):
         # Initialize Gemini API
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             raise ValueError("GEMINI_API_KEY environment variable not set")
         
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+        self.model_name = GEMINI_MODEL_NAME
+        self.model = genai.GenerativeModel(self.model_name)
         
         # Define system prompt
         self.system_prompt = """
@@ -37,31 +48,28 @@ class GeminiHandler:
         
         Always maintain a helpful, encouraging tone while being realistic about financial situations.
         """
+        
+        # Token-budgeted conversation context, maintained incrementally per user
+        self.context_builder = ContextBuilder()
+        
+        # Live chat sessions reused across turns of the same conversation
+        self.session_pool = ChatSessionPool()
+        
+        # Blocking SDK calls run here so they never stall the event loop, queued on
+        # the app's shared Gemini scheduler when one is passed in
+        self.executor = LLMExecutor("gemini", scheduler=scheduler)
+        
+        # Identical prompts against an unchanged profile are answered from here
+        self.response_cache = response_cache or ResponseCache()
     
-    async def generate_response(self, user_message: str, chat_history: List[Dict[str, str]] = None, user_profile: Dict = None) -> str:
-        """Generate a response using Gemini model with user profile context"""
-        try:
-            # Format chat history for Gemini
-            formatted_history = []
-            
-            if chat_history:
-                for message in chat_history:
-                    role = "user" if message["role"] == "user" else "model"
-                    formatted_history.append({"role": role, "parts": [message["content"]]})
-            
-            # Add system prompt if this is a new conversation
-            if not formatted_history:
-                formatted_history.append({"role": "model", "parts": [self.system_prompt]})
-            
-            # Add user profile context if available
-            profile_context = ""
-            if user_profile:
-                # Calculate total expenses and savings
-                total_expenses = sum(user_profile.expenses.values())
-                savings = user_profile.income - total_expenses
-                savings_rate = (savings / user_profile.income) * 100 if user_profile.income > 0 else 0
-                
-                profile_context = f"""
+    def _format_profile_context(self, user_profile) -> str:
+        """Describe the user's profile for the model"""
+        # Calculate total expenses and savings
+        total_expenses = sum(user_profile.expenses.values())
+        savings = user_profile.income - total_expenses
+        savings_rate = (savings / user_profile.income) * 100 if user_profile.income > 0 else 0
+        
+        return f"""
                 User Profile Information:
                 Name: {user_profile.name}
                 Monthly Income: ₹{user_profile.income:,.2f}
@@ -75,23 +83,176 @@ class GeminiHandler:
                 
                 Based on this profile, provide personalized advice that addresses their specific financial situation.
                 """
-                
-                # Add profile context as a system message
-                formatted_history.append({"role": "model", "parts": [profile_context]})
+    
+    def _start_session(self, user_message: str, chat_history: List[Dict[str, str]], user_profile, user_id: str,
+                       profile_version: str) -> PooledSession:
+        """Start a chat session from the budgeted history and profile context"""
+        profile_context = self._format_profile_context(user_profile) if user_profile else ""
+        
+        # Fit the chat history into the token budget: recent turns verbatim,
+        # older turns as a compact summary
+        reserved_tokens = estimate_tokens(user_message) + (estimate_tokens(profile_context) if profile_context else 0)
+        summary_text, recent_turns = self.context_builder.build(chat_history, user_id, reserved_tokens)
+        
+        # Format chat history for Gemini
+        formatted_history = []
+        
+        if summary_text:
+            formatted_history.append({"role": "model", "parts": [summary_text]})
+        
+        for message in recent_turns:
+            role = "user" if message["role"] == "user" else "model"
+            formatted_history.append({"role": role, "parts": [message["content"]]})
+        
+        # Add system prompt if this is a new conversation
+        if not formatted_history:
+            formatted_history.append({"role": "model", "parts": [self.system_prompt]})
+        
+        # Add profile context as a system message
+        if profile_context:
+            formatted_history.append({"role": "model", "parts": [profile_context]})
+        
+        tokens = sum(estimate_tokens(entry["parts"][0]) for entry in formatted_history)
+        session = self.model.start_chat(history=formatted_history)
+        return PooledSession(session, profile_version, chat_history, tokens)
+    
+    @staticmethod
+    def _prior_history(user_message: str, chat_history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """History before the current message"""
+        # The client may include the current message as the last history entry
+        history = list(chat_history or [])
+        if history and history[-1]["role"] == "user" and history[-1]["content"] == user_message:
+            history.pop()
+        return history
+    
+    def _chat_cache_key(self, user_message: str, history: List[Dict[str, str]], profile_version: str) -> str:
+        """Cache key for a chat turn; the history digest keeps different conversations apart"""
+        history_digest = fingerprint(*[turn_key(turn) for turn in history])
+        return self.response_cache.make_key("chat", user_message, self.model_name, {"history": history_digest}, profile_version)
+    
+    def _checkout_session(self, user_message: str, history: List[Dict[str, str]], user_profile, user_id: str,
+                          profile_version: str) -> PooledSession:
+        """Continue the user's live session, or start one, for this message"""
+        # Continue the user's live session when it has seen exactly this history
+        pooled = self.session_pool.checkout(user_id, profile_version, history) if user_id else None
+        if pooled is None:
+            pooled = self._start_session(user_message, history, user_profile, user_id, profile_version)
+        return pooled
+    
+    async def _generate_content(self, endpoint: str, prompt: str, priority: int = PRIORITY_SUMMARY) -> str:
+        """One-shot generation, served from the response cache when possible"""
+        use_cache = self.response_cache.enabled(endpoint)
+        cache_key = self.response_cache.make_key(endpoint, prompt, self.model_name) if use_cache else None
+        if use_cache:
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        response = await self.executor.run(self.model.generate_content, prompt, priority=priority)
+        
+        if use_cache:
+            await self.response_cache.put(cache_key, response.text)
+        return response.text
+    
+    async def generate_response(self, user_message: str, chat_history: List[Dict[str, str]] = None, user_profile: Dict = None,
+                                user_id: str = None) -> str:
+        """Generate a response using Gemini model with user profile context"""
+        try:
+            history = self._prior_history(user_message, chat_history)
+            profile_version = profile_fingerprint(user_profile)
+            
+            # Serve a repeated question from the cache
+            use_cache = self.response_cache.enabled("chat")
+            cache_key = self._chat_cache_key(user_message, history, profile_version) if use_cache else None
+            if use_cache:
+                cached = await self.response_cache.get(cache_key)
+                if cached is not None:
+                    return cached
             
-            # Add current user message
-            formatted_history.append({"role": "user", "parts": [user_message]})
+            pooled = self._checkout_session(user_message, history, user_profile, user_id, profile_version)
             
             # Generate response
-            chat = self.model.start_chat(history=formatted_history)
-            response = chat.send_message(user_message)
+            response = await self.executor.run(pooled.session.send_message, user_message,
+                                               priority=PRIORITY_INTERACTIVE, user_id=user_id)
             
+            pooled.record_exchange(user_message, response.text)
+            if user_id:
+                self.session_pool.checkin(user_id, pooled)
+            
+            if use_cache:
+                await self.response_cache.put(cache_key, response.text)
             return response.text
         
         except Exception as e:
             print(f"Error generating response from Gemini: {str(e)}")
             return f"I'm having trouble processing your request. Please try again later. Error: {str(e)}"
     
+    async def stream_response(self, user_message: str, chat_history: List[Dict[str, str]] = None, user_profile: Dict = None,
+                              user_id: str = None) -> AsyncIterator[str]:
+        """Yield response text chunks from Gemini as they arrive"""
+        history = self._prior_history(user_message, chat_history)
+        profile_version = profile_fingerprint(user_profile)
+        
+        # A cached answer is sent as a single chunk
+        use_cache = self.response_cache.enabled("chat")
+        cache_key = self._chat_cache_key(user_message, history, profile_version) if use_cache else None
+        if use_cache:
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+        
+        pooled = self._checkout_session(user_message, history, user_profile, user_id, profile_version)
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        stop = threading.Event()
+        
+        def pump():
+            # Runs in the executor; hands each chunk to the event loop until told to stop
+            for chunk in pooled.session.send_message(user_message, stream=True):
+                if stop.is_set():
+                    break
+                if chunk.text:
+                    loop.call_soon_threadsafe(chunks.put_nowait, chunk.text)
+        
+        call = asyncio.ensure_future(self.executor.run(pump, priority=PRIORITY_INTERACTIVE, user_id=user_id))
+        call.add_done_callback(lambda _: chunks.put_nowait(None))
+        
+        parts = []
+        finished = False
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                parts.append(chunk)
+                yield chunk
+            finished = True
+        finally:
+            if not finished:
+                # The consumer went away (client disconnect): stop reading the upstream
+                # stream, and collect the call's outcome so no error goes unretrieved
+                stop.set()
+                call.cancel()
+                try:
+                    await call
+                except asyncio.CancelledError:
+                    if not call.cancelled():
+                        raise
+                except Exception as e:
+                    print(f"Error in abandoned Gemini stream: {str(e)}")
+        
+        # Surface upstream errors to the caller
+        await call
+        
+        response_text = "".join(parts)
+        pooled.record_exchange(user_message, response_text)
+        if user_id:
+            self.session_pool.checkin(user_id, pooled)
+        
+        if use_cache:
+            await self.response_cache.put(cache_key, response_text)
+    
     async def generate_spending_insights(self, expenses: Dict[str, float], income: float) -> str:
         """Generate insights about spending patterns"""
         try:
@@ -112,9 +273,7 @@ class GeminiHandler:
             """
             
             # Generate insights
-            response = self.model.generate_content(prompt)
-            
-            return response.text
+            return await self._generate_content("insights", prompt)
         
         except Exception as e:
             print(f"Error generating spending insights: {str(e)}")
@@ -156,9 +315,7 @@ class GeminiHandler:
             """
             
             # Generate advice
-            response = self.model.generate_content(prompt)
-            
-            return response.text
+            return await self._generate_content("investment", prompt)
         
         except Exception as e:
             print(f"Error generating investment advice: {str(e)}")
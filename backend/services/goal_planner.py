@@ -0,0 +1,131 @@
+import os
+import numpy as np
+from datetime import date
+from typing import Any, Dict, List, Optional
+from services.monte_carlo import months_until
+
+# Longest schedule produced, in months
+PLANNER_MAX_MONTHS = int(os.getenv("PLANNER_MAX_MONTHS", 600))
+
+# Amounts below half a paisa count as fully funded
+_FUNDED = 0.005
+
+def _fill(wanted: np.ndarray, budget: float) -> np.ndarray:
+    """Give each entry what it wants, in order, until ``budget`` runs out"""
+    before = np.cumsum(wanted) - wanted
+    return np.clip(budget - before, 0, wanted)
+
+def _period(today: date, months_ahead: int) -> str:
+    month = today.month - 1 + months_ahead
+    return f"{today.year + month // 12:04d}-{month % 12 + 1:02d}"
+
+def plan_goals(monthly_surplus: float, goals: List[Dict[str, Any]], today: Optional[date] = None,
+               max_months: int = PLANNER_MAX_MONTHS) -> Dict[str, Any]:
+    """Month-by-month split of the monthly surplus across goals, with a verdict per goal.
+
+    Goals are ranked by priority (1 first), then deadline. Walking that
+    ranking, a dated goal is *protected* if it and the goals already
+    protected can all still meet their deadlines: for every deadline, the
+    amount due by then fits in the surplus of the months until then. Each
+    month protected goals receive only what can no longer be postponed,
+    earliest deadline first, so their deadlines are met while the rest of
+    the surplus tops up goals in rank order. Goals left unprotected (the
+    surplus cannot cover them after higher priorities) are funded from that
+    top-up and may finish late. Each month is a few cumulative sums over
+    the goals, so a month costs O(goals).
+    """
+    today = today or date.today()
+    count = len(goals)
+    remaining = np.array([max(0.0, (goal.get("target_amount", 0) or 0) - (goal.get("current_amount", 0) or 0))
+                          for goal in goals], dtype=np.float64)
+    deadlines = np.array([months_until(goal.get("target_date"), today) for goal in goals], dtype=np.float64)
+    dated = ~np.isnan(deadlines)
+    deadlines = np.where(dated, deadlines, np.inf)
+    surplus = max(0.0, monthly_surplus)
+
+    # Work in rank order; ``rank`` maps back to the caller's order
+    order = sorted(range(count), key=lambda i: (goals[i].get("priority", 1) or 1, deadlines[i], i))
+    rank = np.array(order, dtype=np.int64)
+    remaining_ranked, deadlines_ranked, dated_ranked = remaining[rank], deadlines[rank], dated[rank]
+
+    # Protect dated goals in rank order while every protected deadline stays reachable
+    protected = []
+    for position in range(count):
+        if not dated_ranked[position] or remaining_ranked[position] <= _FUNDED:
+            continue
+        candidate = sorted(protected + [position], key=lambda k: (deadlines_ranked[k], k))
+        due = np.cumsum(remaining_ranked[candidate])
+        if np.all(due <= surplus * deadlines_ranked[candidate] + _FUNDED):
+            protected = candidate
+    protected = np.array(protected, dtype=np.int64)
+
+    funded_month = np.where(remaining_ranked <= _FUNDED, 0, -1)
+    at_deadline = np.where(dated_ranked & (deadlines_ranked == 0), remaining_ranked, np.nan)
+    rows = []
+    month = 0
+    while surplus > 0 and month < max_months and (remaining_ranked > _FUNDED).any():
+        month += 1
+        active = remaining_ranked > _FUNDED
+
+        # What protected goals need now: the most that is due by any deadline
+        # beyond what the months after this one can still supply
+        required = np.zeros(count)
+        if len(protected):
+            due = remaining_ranked[protected]
+            shortfall = np.cumsum(due) - surplus * (deadlines_ranked[protected] - month)
+            required[protected] = _fill(due, min(surplus, max(0.0, shortfall.max())))
+
+        allocation = required + _fill(np.where(active, remaining_ranked - required, 0.0), surplus - required.sum())
+        remaining_ranked = np.maximum(0.0, remaining_ranked - allocation)
+        funded_month[(funded_month < 0) & (remaining_ranked <= _FUNDED)] = month
+        due_now = dated_ranked & (deadlines_ranked == month)
+        at_deadline[due_now] = remaining_ranked[due_now]
+        rows.append(allocation)
+
+    schedule = np.array(rows).reshape(month, count)
+    allocations = np.empty_like(schedule)
+    allocations[:, rank] = schedule
+    funded = np.empty(count, dtype=np.int64)
+    funded[rank] = funded_month
+    shortfall = np.empty(count)
+    # Deadlines the schedule never reached fall back to what is still unfunded
+    shortfall[rank] = np.where(np.isnan(at_deadline), remaining_ranked, at_deadline)
+
+    results = []
+    for i, goal in enumerate(goals):
+        deadline = int(deadlines[i]) if dated[i] else None
+        if remaining[i] <= _FUNDED:
+            status = "achieved"
+        elif funded[i] < 0:
+            status = "not_funded"
+        elif deadline is not None and funded[i] > deadline:
+            status = "late"
+        else:
+            status = "on_track"
+        results.append({
+            "goal_id": goal.get("goal_id"),
+            "goal_name": goal.get("goal_name", "Goal"),
+            "priority": goal.get("priority", 1),
+            "target_date": goal.get("target_date"),
+            "remaining_amount": float(remaining[i]),
+            "deadline_month": deadline,
+            # Monthly saving this goal needs on its own to meet its deadline
+            "required_monthly": round(float(remaining[i]) / max(deadline, 1), 2) if deadline is not None else None,
+            "status": status,
+            "funded_month": int(funded[i]) if funded[i] > 0 else None,
+            "funded_period": _period(today, int(funded[i])) if funded[i] > 0 else None,
+            "shortfall_at_deadline": round(max(0.0, float(shortfall[i])), 2) if deadline is not None else None,
+            "allocations": allocations[:, i].round(2).tolist()
+        })
+
+    return {
+        "monthly_surplus": monthly_surplus,
+        "feasible": all(result["status"] in ("achieved", "on_track") for result in results),
+        "required_monthly_total": round(sum(result["required_monthly"] or 0 for result in results), 2),
+        "schedule": {
+            "month": list(range(1, month + 1)),
+            "period": [_period(today, m) for m in range(1, month + 1)],
+            "unallocated": (surplus - schedule.sum(axis=1)).round(2).tolist()
+        },
+        "goals": results
+    }
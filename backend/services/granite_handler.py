@@ -1,24 +1,128 @@
 import os
-import requests
-from typing import Dict, Any
+import time
+import random
+import asyncio
+import httpx
+from typing import Dict, Any, Optional
 from dotenv import load_dotenv
+from services.fingerprint import profile_fingerprint
+from services.response_cache import ResponseCache
+from services.llm_scheduler import LLMScheduler, PRIORITY_SUMMARY
+from services.circuit_breaker import CircuitBreaker
+from services.budget_summary import local_budget_summary
 
 # Load environment variables
 load_dotenv()
 
+# HTTP client settings for the Hugging Face inference API
+GRANITE_API_URL = os.getenv("GRANITE_API_URL", "https://api-inference.huggingface.co/models/ibm/granite-2.5b-instruct-v1")
+GRANITE_CONNECT_TIMEOUT = float(os.getenv("GRANITE_CONNECT_TIMEOUT", 5))
+GRANITE_READ_TIMEOUT = float(os.getenv("GRANITE_READ_TIMEOUT", 60))
+GRANITE_MAX_CONNECTIONS = int(os.getenv("GRANITE_MAX_CONNECTIONS", 10))
+GRANITE_MAX_RETRIES = int(os.getenv("GRANITE_MAX_RETRIES", 3))
+GRANITE_BACKOFF_BASE = float(os.getenv("GRANITE_BACKOFF_BASE", 0.5))
+GRANITE_BACKOFF_MAX = float(os.getenv("GRANITE_BACKOFF_MAX", 20))
+
+# 429 (rate limited) and 503 (model loading) are worth retrying; so are gateway errors
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+
 class GraniteHandler:
-    def __init__(self):
+    def __init__(self, response_cache: Optional[ResponseCache] = None, scheduler: Optional[LLMScheduler] = None):
         # Initialize Hugging Face API
         self.api_key = os.getenv("HF_API_KEY")
         if not self.api_key:
             raise ValueError("HF_API_KEY environment variable not set")
         
-        self.api_url = "https://api-inference.huggingface.co/models/ibm/granite-2.5b-instruct-v1"
+        self.api_url = GRANITE_API_URL
         self.headers = {"Authorization": f"Bearer {self.api_key}"}
+        
+        # Shared keep-alive client, opened and closed by the app lifespan
+        self.client: Optional[httpx.AsyncClient] = None
+        self.retries = 0
+        
+        # Every attempt waits for a slot and a token from the quota (GRANITE_RATE_PER_MINUTE);
+        # pass the app's shared Granite scheduler so all callers queue together
+        self.scheduler = scheduler or LLMScheduler.from_env("granite", GRANITE_MAX_CONNECTIONS)
+        
+        # While the endpoint is failing or too slow, summaries are computed locally
+        self.breaker = CircuitBreaker("granite")
+        self.fallbacks = 0
+        
+        # Identical summaries for an unchanged profile are answered from here
+        self.response_cache = response_cache or ResponseCache()
+    
+    async def startup(self):
+        """Open the pooled HTTP client"""
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=httpx.Timeout(GRANITE_READ_TIMEOUT, connect=GRANITE_CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=GRANITE_MAX_CONNECTIONS, max_keepalive_connections=GRANITE_MAX_CONNECTIONS)
+            )
+    
+    async def shutdown(self):
+        """Close the pooled HTTP client"""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+    
+    @staticmethod
+    def _retry_delay(attempt: int, response: Optional[httpx.Response]) -> float:
+        """Delay before the next attempt: server hint if given, else jittered exponential backoff"""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), GRANITE_BACKOFF_MAX)
+            if response.status_code == 503:
+                # The inference API reports how long the model needs to load
+                try:
+                    estimated_time = float(response.json().get("estimated_time", 0))
+                except Exception:
+                    estimated_time = 0
+                if estimated_time > 0:
+                    return min(estimated_time, GRANITE_BACKOFF_MAX)
+        # Full jitter keeps retrying clients from synchronizing
+        return random.uniform(0, min(GRANITE_BACKOFF_MAX, GRANITE_BACKOFF_BASE * (2 ** attempt)))
+    
+    async def _post(self, payload: Dict[str, Any], priority: int = PRIORITY_SUMMARY, user_id: Optional[str] = None) -> Any:
+        """POST to the inference API, retrying transient failures"""
+        if self.client is None:
+            await self.startup()
+        
+        for attempt in range(GRANITE_MAX_RETRIES + 1):
+            response = None
+            try:
+                async with self.scheduler.slot(priority, user_id):
+                    response = await self.client.post(self.api_url, json=payload)
+                if response.status_code == 429:
+                    # Upstream quota is exhausted; hold back every queued call, not just this one
+                    self.scheduler.bucket.drain()
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    response.raise_for_status()
+                    return response.json()
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.ReadTimeout, httpx.RemoteProtocolError):
+                if attempt == GRANITE_MAX_RETRIES:
+                    raise
+            
+            if attempt == GRANITE_MAX_RETRIES:
+                response.raise_for_status()
+            self.retries += 1
+            await asyncio.sleep(self._retry_delay(attempt, response))
     
-    async def generate_budget_summary(self, user_profile: Dict[str, Any]) -> str:
-        """Generate a comprehensive budget summary using IBM Granite"""
+    async def generate_budget_summary(self, user_profile: Dict[str, Any], spend_history: Optional[Dict[str, Any]] = None,
+                                      priority: int = PRIORITY_SUMMARY) -> str:
+        """Generate a comprehensive budget summary using IBM Granite.
+        
+        ``spend_history`` is an expense ledger summary; when it holds entries,
+        its average monthly spend per category replaces the profile's estimates.
+        ``priority`` is the scheduler class the upstream call queues in.
+        """
         try:
+            if spend_history and spend_history.get("count"):
+                user_profile = {**user_profile, "expenses": spend_history["monthly_average"]}
+            else:
+                spend_history = None
+            
             # Extract relevant information from user profile
             income = user_profile.get("income", 0)
             expenses = user_profile.get("expenses", {})
@@ -43,6 +147,13 @@ class GraniteHandler:
                                     f"{(goal.get('current_amount', 0)/goal['target_amount'])*100:.1f}% complete)" 
                                     for goal in goals])
             
+            # Format recorded spending for the prompt
+            history_text = "No expenses recorded; the figures above are the user's own estimates."
+            if spend_history:
+                history_text = f"Expenses above are monthly averages from {spend_history['start_month']} to {spend_history['end_month']}.\n" + \
+                    "\n".join([f"- {month['month']}: ₹{month['total']} across {month['count']} expenses"
+                               for month in spend_history["months"]])
+            
             # Create prompt for budget summary
             prompt = f"""
             <instruction>Generate a comprehensive budget summary based on the following financial information. 
@@ -56,6 +167,9 @@ class GraniteHandler:
             
             Monthly Savings: ₹{savings} ({savings_rate:.1f}% of income)
             
+            Recorded Spending by Month:
+            {history_text}
+            
             Financial Goals:
             {goals_text}
             
@@ -73,16 +187,41 @@ class GraniteHandler:
                 }
             }
             
-            response = requests.post(self.api_url, headers=self.headers, json=payload)
-            response.raise_for_status()
+            use_cache = self.response_cache.enabled("summary")
+            cache_key = None
+            if use_cache:
+                cache_key = self.response_cache.make_key("summary", prompt, self.api_url, payload["parameters"],
+                                                         profile_fingerprint(user_profile))
+                cached = await self.response_cache.get(cache_key)
+                if cached is not None:
+                    return cached
+            
+            # Skip a sick endpoint entirely while the circuit is open
+            if not self.breaker.allow():
+                return self._fallback_summary(user_profile, spend_history)
+            
+            started_at = time.monotonic()
+            succeeded = False
+            try:
+                result = await self._post(payload, priority, user_profile.get("user_id"))
+                succeeded = isinstance(result, list) and len(result) > 0
+            finally:
+                self.breaker.record(succeeded, time.monotonic() - started_at)
             
             # Extract and return the generated text
-            result = response.json()
-            if isinstance(result, list) and len(result) > 0:
-                return result[0].get("generated_text", "").replace(prompt, "").strip()
+            if succeeded:
+                summary = result[0].get("generated_text", "").replace(prompt, "").strip()
+                if use_cache:
+                    await self.response_cache.put(cache_key, summary)
+                return summary
             else:
-                return "Unable to generate budget summary. Please try again later."
+                return self._fallback_summary(user_profile, spend_history)
         
         except Exception as e:
             print(f"Error generating budget summary: {str(e)}")
-            return f"I'm having trouble generating your budget summary. Please try again later. Error: {str(e)}"
\ No newline at end of file
+            return self._fallback_summary(user_profile, spend_history)
+    
+    def _fallback_summary(self, user_profile: Dict[str, Any], spend_history: Optional[Dict[str, Any]] = None) -> str:
+        """Budget summary computed locally from the profile"""
+        self.fallbacks += 1
+        return local_budget_summary(user_profile, spend_history)
\ No newline at end of file
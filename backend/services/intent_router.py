@@ -0,0 +1,397 @@
+import os
+import re
+import json
+import time
+from typing import Any, Dict, List, Optional
+from services.tax_utils import calculate_tax, compare_tax_regimes, calculate_hra_exemption, rules_for
+from services.tax_rules import tax_rules
+
+# Labelled queries used to measure routing accuracy (python -m services.intent_router)
+INTENT_QUERIES_PATH = os.path.join(os.path.dirname(__file__), "data", "intent_queries.jsonl")
+
+# Amount with optional currency marker and Indian/short-scale unit
+_AMOUNT = re.compile(
+    r"(?P<currency>₹|\brs\.?|\binr)?\s*(?P<number>\d+(?:,\d+)*(?:\.\d+)?)\s*"
+    r"(?P<unit>lakhs?\b|lacs?\b|lpa\b|l\b|crores?\b|cr\b|k\b|thousand\b)?",
+    re.IGNORECASE
+)
+_UNIT_MULTIPLIERS = {"lakh": 1e5, "lac": 1e5, "lpa": 1e5, "l": 1e5, "crore": 1e7, "cr": 1e7, "k": 1e3, "thousand": 1e3}
+# Numbers followed by these are durations, rates or ordinals, not rupee amounts
+_NOT_AMOUNT_SUFFIX = re.compile(r"\s*(?:%|percent|years?\b|yrs?\b|months?\b|-\d|st\b|nd\b|rd\b|th\b)", re.IGNORECASE)
+_MONTHLY_SUFFIX = re.compile(r"\s*(?:per month|a month|/\s*month|monthly|pm\b|p\.m\.|every month)", re.IGNORECASE)
+_ANNUAL_SUFFIX = re.compile(r"\s*(?:per annum|per year|a year|/\s*year|annually|yearly|p\.a\.|pa\b)", re.IGNORECASE)
+# A period word just before an amount's label ("monthly rent of 20000")
+_PERIOD_PREFIX = re.compile(r"\b(?P<period>monthly|annual|yearly)(?:\s+\w+){1,2}\s*$", re.IGNORECASE)
+
+# Keywords that label the amount that follows them
+_AMOUNT_ROLES = [
+    ("hra", re.compile(r"\bhra\b|house rent allowance", re.IGNORECASE)),
+    ("rent", re.compile(r"\brent\b", re.IGNORECASE)),
+    ("basic", re.compile(r"\bbasic\b", re.IGNORECASE)),
+    ("expense", re.compile(r"\bspend\w*|\bexpenses?\b|\bexpenditure\b", re.IGNORECASE)),
+    ("income", re.compile(r"\bincome\b|\bsalary\b|\bearn\w*|\bctc\b|\bpackage\b|\bmake\b|\bpaid\b", re.IGNORECASE)),
+    ("principal", re.compile(r"\binvest\w*|\bsave\b|\bsaving\b|\bput\b|\bdeposit\b|\bsip\b", re.IGNORECASE))
+]
+# Labels that may directly follow an amount ("15 lakh income", "12 lakh gross salary")
+_QUALIFIER = r"\s+(?:(?:annual|yearly|monthly|gross|net|taxable|total|fixed)\s+)?"
+_TRAILING_ROLES = [
+    ("hra", re.compile(_QUALIFIER + r"(?:hra\b|house rent allowance)", re.IGNORECASE)),
+    ("rent", re.compile(_QUALIFIER + r"rent\b", re.IGNORECASE)),
+    ("basic", re.compile(_QUALIFIER + r"basic\b", re.IGNORECASE)),
+    ("expense", re.compile(_QUALIFIER + r"(?:expenses?|expenditure)\b", re.IGNORECASE)),
+    ("income", re.compile(_QUALIFIER + r"(?:income|salary|ctc|package)\b", re.IGNORECASE))
+]
+
+_REGIME_OLD = re.compile(r"\bold\b(?:\s+tax)?\s+regime|\bold\s+slabs?\b", re.IGNORECASE)
+_REGIME_NEW = re.compile(r"\bnew\b(?:\s+tax)?\s+regime|\bnew\s+slabs?\b", re.IGNORECASE)
+_REGIME_COMPARE = re.compile(r"\bcompare\b|\bcomparison\b|\bwhich regime\b|\bbetter regime\b|\bvs\.?\b|\bversus\b|\bboth regimes\b|old or new|new or old", re.IGNORECASE)
+_CITY_TIER = re.compile(r"\btier[\s-]*(?P<tier>[123]|one|two|three)\b", re.IGNORECASE)
+_METRO = re.compile(r"\b(?P<non>non[\s-]?)?metro\b", re.IGNORECASE)
+_TIER_WORDS = {"one": 1, "two": 2, "three": 3}
+_RATE = re.compile(r"(?P<rate>\d+(?:\.\d+)?)\s*(?:%|percent)", re.IGNORECASE)
+_YEARS = re.compile(r"(?P<years>\d+(?:\.\d+)?)\s*(?:years?|yrs?)\b", re.IGNORECASE)
+
+_TAX = re.compile(r"\btax(?:es)?\b|\bregimes?\b|\btaxable\b", re.IGNORECASE)
+# Deductions and other tax heads the local answers do not model; these questions escalate
+_DEDUCTIONS = re.compile(
+    r"\b80\s?(?:c{1,2}d?|d|dd|e{1,2}a?|g|tta|ttb|u)\b|\bsection\b|\bdeduct\w*|\b(?:ppf|elss|nps|lic|ulip)\b|"
+    r"\b(?:home|housing) loan\b|\binsurance\b|\bmediclaim\b|\bdonat\w*|\bcapital gains?\b|\bbonus\b|\binterest\b",
+    re.IGNORECASE
+)
+# Financial (or assessment) year, e.g. "FY 2024-25", "FY24-25", "AY 2025-26"
+_FY = re.compile(r"\b(?P<kind>fy|financial year|ay|assessment year)\s*'?(?P<start>(?:20)?\d{2})\s*[-–/]\s*(?P<end>\d{2}(?:\d{2})?)\b",
+                 re.IGNORECASE)
+_HRA = re.compile(r"\bhra\b|house rent allowance", re.IGNORECASE)
+_SAVINGS_RATE = re.compile(r"savings? (?:rate|ratio|percentage)|how much (?:do|can|will) i save|what do i save", re.IGNORECASE)
+_GROWTH = re.compile(r"\bgrow\b|\bwill i have\b|\bfuture value\b|\bmaturity\b|\bcorpus\b|\bbecome\b|\bworth\b|\bhow much will\b", re.IGNORECASE)
+_MONTHLY_CONTRIBUTION = re.compile(r"\bsip\b|per month|every month|monthly|a month", re.IGNORECASE)
+# Open-ended requests always go to the LLM, even if they mention numbers
+_OPEN_ENDED = re.compile(r"\badvi[cs]e\b|\brecommend\w*|\bsuggest\w*|\bexplain\w*|\bwhy\b|\btips?\b|\bhelp me\b|\bideas?\b|\bstrateg\w*", re.IGNORECASE)
+
+def extract_amounts(text: str) -> List[Dict[str, Any]]:
+    """Rupee amounts in ``text``, each with the role and period suggested by the words next to it.
+
+    A label directly after the amount ("15 lakh income") is used when no
+    label precedes it since the previous amount. A period applies only to
+    the amount it is next to; ``period`` is None when none is stated.
+    """
+    amounts = []
+    previous_end = 0
+    for match in _AMOUNT.finditer(text):
+        number, unit, currency = match.group("number"), match.group("unit"), match.group("currency")
+        if not unit and _NOT_AMOUNT_SUFFIX.match(text[match.end():]):
+            continue
+        value = float(number.replace(",", ""))
+        if unit:
+            key = unit.lower().rstrip("s")
+            value *= _UNIT_MULTIPLIERS.get(key, 1)
+        elif not currency and value < 1000:
+            # Bare small numbers are ages, counts or section numbers, not amounts
+            continue
+
+        # The nearest role keyword since the previous amount labels this one
+        context = text[previous_end:match.start()]
+        role, role_position = None, -1
+        for name, pattern in _AMOUNT_ROLES:
+            for keyword in pattern.finditer(context):
+                if keyword.end() > role_position:
+                    role, role_position = name, keyword.end()
+
+        # Otherwise a label right after it. A label taken (or repeated) here cannot also
+        # claim the next amount; a different one is left for it ("rent 20000 hra 15000")
+        end = match.end()
+        for name, pattern in _TRAILING_ROLES:
+            trailing = pattern.match(text, end)
+            if trailing:
+                if role in (None, name):
+                    role, end = name, trailing.end()
+                break
+
+        period = None
+        prefix = _PERIOD_PREFIX.search(context)
+        if _MONTHLY_SUFFIX.match(text[match.end():]) or _MONTHLY_SUFFIX.match(text[end:]):
+            period = "monthly"
+        elif (unit and unit.lower() == "lpa") or _ANNUAL_SUFFIX.match(text[match.end():]) or _ANNUAL_SUFFIX.match(text[end:]):
+            period = "annual"
+        elif prefix:
+            period = "monthly" if prefix.group("period").lower() == "monthly" else "annual"
+
+        amounts.append({"value": value, "role": role, "period": period})
+        previous_end = end
+    return amounts
+
+def extract_fy(text: str) -> Optional[str]:
+    """Financial year ("2024-25") named in ``text``; an assessment year maps to the year before it"""
+    match = _FY.search(text)
+    if not match:
+        return None
+    start = int(match.group("start")) % 100
+    end = int(match.group("end")) % 100
+    if end != (start + 1) % 100:
+        return None
+    if match.group("kind").lower().startswith(("ay", "assessment")):
+        start, end = start - 1, start
+    return f"20{start:02d}-{end:02d}"
+
+def extract_entities(text: str) -> Dict[str, Any]:
+    """Amounts, regime, city tier, rate and duration mentioned in a message"""
+    entities: Dict[str, Any] = {"amounts": extract_amounts(text)}
+    fy = extract_fy(text)
+    if fy:
+        entities["fy"] = fy
+
+    if _REGIME_COMPARE.search(text) or (_REGIME_OLD.search(text) and _REGIME_NEW.search(text)):
+        entities["regime"] = "compare"
+    elif _REGIME_OLD.search(text):
+        entities["regime"] = "old"
+    elif _REGIME_NEW.search(text):
+        entities["regime"] = "new"
+
+    tier = _CITY_TIER.search(text)
+    if tier:
+        value = tier.group("tier").lower()
+        entities["city_tier"] = _TIER_WORDS.get(value) or int(value)
+    else:
+        metro = _METRO.search(text)
+        if metro:
+            entities["city_tier"] = 2 if metro.group("non") else 1
+
+    rate = _RATE.search(text)
+    if rate:
+        entities["rate"] = float(rate.group("rate"))
+    years = _YEARS.search(text)
+    if years:
+        entities["years"] = float(years.group("years"))
+    return entities
+
+def _pick(amounts: List[Dict[str, Any]], role: str, allow_unlabelled: bool = False) -> Optional[Dict[str, Any]]:
+    """The amount labelled ``role``, else the only unlabelled amount; with several unlabelled ones, None"""
+    for amount in amounts:
+        if amount["role"] == role:
+            return amount
+    if allow_unlabelled:
+        unlabelled = [amount for amount in amounts if amount["role"] is None]
+        if len(unlabelled) == 1:
+            return unlabelled[0]
+    return None
+
+def _unambiguous(amounts: List[Dict[str, Any]], used: List[Optional[Dict[str, Any]]], default_period: str) -> bool:
+    """Whether ``used`` accounts for every amount and their periods can be read consistently.
+
+    An amount left over means the question has a part the local answer
+    would ignore. Amounts without a stated period are read as
+    ``default_period``, which is only safe when no other amount states the
+    opposite period.
+    """
+    used = [amount for amount in used if amount is not None]
+    if len(used) != len(amounts):
+        return False
+    stated = {amount["period"] for amount in used if amount["period"]}
+    return not (stated - {default_period} and any(amount["period"] is None for amount in used))
+
+def _annual(amount: Dict[str, Any]) -> float:
+    return amount["value"] * 12 if amount["period"] == "monthly" else amount["value"]
+
+def _monthly(amount: Dict[str, Any]) -> float:
+    return amount["value"] / 12 if amount["period"] == "annual" else amount["value"]
+
+class IntentRouter:
+    """Answers calculation questions locally; everything else escalates to the LLM.
+
+    ``route`` returns None for open-ended messages and for calculation
+    questions that lack a required figure, so nothing is ever guessed.
+    """
+
+    def __init__(self):
+        self.routed: Dict[str, int] = {}
+        self.escalated = 0
+
+    def classify(self, text: str, user_profile: Any = None) -> Dict[str, Any]:
+        """Intent and entities for a message; the intent is "llm" when it should escalate"""
+        entities = extract_entities(text)
+        amounts = entities["amounts"]
+        profile_income = getattr(user_profile, "income", None)
+
+        if _OPEN_ENDED.search(text):
+            return {"intent": "llm", "entities": entities}
+
+        if _TAX.search(text) or _HRA.search(text):
+            # Deductions change the answer, and a year without rules cannot be computed
+            if _DEDUCTIONS.search(text) or entities.get("fy", tax_rules.default_fy) not in tax_rules.years():
+                return {"intent": "llm", "entities": entities}
+
+        if _HRA.search(text):
+            hra = _pick(amounts, "hra", allow_unlabelled=True)
+            rent = _pick(amounts, "rent")
+            basic = _pick(amounts, "basic")
+            tier = entities.get("city_tier", getattr(user_profile, "city_tier", None))
+            if hra and rent and tier and _unambiguous(amounts, [hra, rent, basic], "annual"):
+                entities.update({"hra_received": _annual(hra), "rent_paid": _annual(rent), "city_tier": tier})
+                if basic:
+                    entities["basic_salary"] = _annual(basic)
+                return {"intent": "hra_exemption", "entities": entities}
+            return {"intent": "llm", "entities": entities}
+
+        if _TAX.search(text):
+            income = _pick(amounts, "income", allow_unlabelled=True)
+            if income and _unambiguous(amounts, [income], "annual"):
+                entities["income"] = _annual(income)
+            elif not amounts and profile_income and re.search(r"\bmy\b|\bi\b", text, re.IGNORECASE):
+                # Profile income is monthly
+                entities["income"] = profile_income * 12
+            if "income" not in entities:
+                return {"intent": "llm", "entities": entities}
+            regime = entities.get("regime")
+            if regime in ("old", "new"):
+                return {"intent": "tax_calculation", "entities": entities}
+            return {"intent": "regime_comparison", "entities": entities}
+
+        if _SAVINGS_RATE.search(text):
+            income = _pick(amounts, "income")
+            expense = _pick(amounts, "expense")
+            if income and expense and _unambiguous(amounts, [income, expense], "monthly"):
+                entities.update({"income": _monthly(income), "expenses": _monthly(expense)})
+                return {"intent": "savings_rate", "entities": entities}
+            if not amounts and user_profile is not None and profile_income:
+                entities.update({"income": profile_income, "expenses": sum(user_profile.expenses.values())})
+                return {"intent": "savings_rate", "entities": entities}
+            return {"intent": "llm", "entities": entities}
+
+        if _GROWTH.search(text) and "rate" in entities and "years" in entities:
+            principal = _pick(amounts, "principal", allow_unlabelled=True)
+            if principal and _unambiguous(amounts, [principal], principal["period"] or "annual"):
+                monthly = principal["period"] == "monthly" or bool(_MONTHLY_CONTRIBUTION.search(text))
+                entities.update({"principal": principal["value"], "monthly": monthly})
+                return {"intent": "savings_growth", "entities": entities}
+
+        return {"intent": "llm", "entities": entities}
+
+    def route(self, text: str, user_profile: Any = None) -> Optional[Dict[str, Any]]:
+        """Local answer ``{"intent", "response", "tax_info", "visualization_data"}``, or None to use the LLM"""
+        classified = self.classify(text, user_profile)
+        intent, entities = classified["intent"], classified["entities"]
+        if intent == "llm":
+            self.escalated += 1
+            return None
+
+        answer = getattr(self, f"_answer_{intent}")(entities)
+        answer["intent"] = intent
+        self.routed[intent] = self.routed.get(intent, 0) + 1
+        return answer
+
+    def _answer_tax_calculation(self, entities: Dict[str, Any]) -> Dict[str, Any]:
+        income, regime = entities["income"], entities["regime"]
+        rules = rules_for(regime, entities.get("fy"))
+        tax = calculate_tax(income, regime, rules.fy)
+        return {
+            "response": (
+                f"Estimated income tax for FY {rules.fy} on an annual income of ₹{income:,.2f} under the {regime} regime "
+                f"is **₹{tax:,.2f}**, after the ₹{rules.standard_deduction:,} standard deduction and including 4% cess."
+            ),
+            "tax_info": {"income": income, "regime": regime, "fy": rules.fy, "tax_amount": tax},
+            "visualization_data": None
+        }
+
+    def _answer_regime_comparison(self, entities: Dict[str, Any]) -> Dict[str, Any]:
+        income, fy = entities["income"], entities.get("fy") or tax_rules.default_fy
+        comparison = compare_tax_regimes(income, fy)
+        better = comparison["better_regime"]
+        return {
+            "response": (
+                f"For an annual income of ₹{income:,.2f} in FY {fy}:\n"
+                f"- Old regime: ₹{comparison['old_regime_tax']:,.2f}\n"
+                f"- New regime: ₹{comparison['new_regime_tax']:,.2f}\n\n"
+                f"The **{better} regime** saves you ₹{comparison['savings']:,.2f} "
+                f"(standard deduction and 4% cess included; other deductions not considered)."
+            ),
+            "tax_info": {"income": income, "regime": "compare", "fy": fy, "regime_comparison": comparison},
+            "visualization_data": comparison["visualization_data"]
+        }
+
+    def _answer_hra_exemption(self, entities: Dict[str, Any]) -> Dict[str, Any]:
+        hra = calculate_hra_exemption(entities["hra_received"], entities["city_tier"], entities["rent_paid"],
+                                      entities.get("basic_salary", 0))
+        return {
+            "response": (
+                f"Your annual HRA exemption is **₹{hra['exemption_amount']:,.2f}** "
+                f"(HRA received ₹{hra['hra_received']:,.2f}, rent paid ₹{hra['rent_paid']:,.2f}, "
+                f"basic salary ₹{hra['basic_salary']:,.2f}, tier {hra['city_tier']} city). "
+                f"The taxable part of your HRA is ₹{max(0, hra['hra_received'] - hra['exemption_amount']):,.2f}."
+            ),
+            "tax_info": {"hra_exemption": hra},
+            "visualization_data": None
+        }
+
+    def _answer_savings_rate(self, entities: Dict[str, Any]) -> Dict[str, Any]:
+        income, expenses = entities["income"], entities["expenses"]
+        savings = income - expenses
+        rate = (savings / income) * 100 if income > 0 else 0
+        verdict = "on track with" if rate >= 20 else "below"
+        return {
+            "response": (
+                f"With a monthly income of ₹{income:,.2f} and expenses of ₹{expenses:,.2f}, you save "
+                f"₹{savings:,.2f} a month, a savings rate of **{rate:.1f}%** — {verdict} the 20% target of the 50/30/20 rule."
+            ),
+            "tax_info": None,
+            "visualization_data": {"labels": ["Expenses", "Savings"], "values": [expenses, max(0, savings)]}
+        }
+
+    def _answer_savings_growth(self, entities: Dict[str, Any]) -> Dict[str, Any]:
+        principal, rate, years, monthly = entities["principal"], entities["rate"], entities["years"], entities["monthly"]
+        if monthly:
+            # Future value of a monthly contribution made at the start of each month
+            r, n = rate / 100 / 12, round(years * 12)
+            future_value = principal * n if r == 0 else principal * (((1 + r) ** n - 1) / r) * (1 + r)
+            invested = principal * n
+            description = f"₹{principal:,.2f} a month"
+        else:
+            future_value = principal * (1 + rate / 100) ** years
+            invested = principal
+            description = f"₹{principal:,.2f} invested once"
+        return {
+            "response": (
+                f"{description} for {years:g} years at {rate:g}% a year grows to about **₹{future_value:,.2f}** "
+                f"(₹{invested:,.2f} invested, ₹{future_value - invested:,.2f} in returns). Returns are assumed constant."
+            ),
+            "tax_info": None,
+            "visualization_data": {"labels": ["Invested", "Returns"], "values": [round(invested, 2), round(future_value - invested, 2)]}
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {"routed": dict(self.routed), "escalated": self.escalated}
+
+def evaluate(path: str = INTENT_QUERIES_PATH) -> Dict[str, Any]:
+    """Intent and entity accuracy of the router on a labelled JSONL query set"""
+    router = IntentRouter()
+    total = intent_hits = entity_hits = 0
+    misses = []
+    started_at = time.perf_counter()
+    with open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            case = json.loads(line)
+            classified = router.classify(case["query"])
+            total += 1
+            intent_ok = classified["intent"] == case["intent"]
+            entities_ok = all(
+                classified["entities"].get(key) is not None and abs(classified["entities"][key] - expected) < 0.01
+                if isinstance(expected, (int, float)) and not isinstance(expected, bool)
+                else classified["entities"].get(key) == expected
+                for key, expected in case.get("entities", {}).items()
+            )
+            intent_hits += intent_ok
+            entity_hits += intent_ok and entities_ok
+            if not (intent_ok and entities_ok):
+                misses.append({"query": case["query"], "expected": case["intent"], "got": classified["intent"]})
+    elapsed = time.perf_counter() - started_at
+    return {
+        "queries": total,
+        "intent_accuracy": intent_hits / total if total else 0.0,
+        "entity_accuracy": entity_hits / total if total else 0.0,
+        "mean_latency_ms": elapsed / total * 1000 if total else 0.0,
+        "misses": misses
+    }
+
+if __name__ == "__main__":
+    print(json.dumps(evaluate(), indent=2, ensure_ascii=False))
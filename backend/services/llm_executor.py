@@ -0,0 +1,70 @@
+import os
+import time
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from services.llm_scheduler import LatencyStats, LLMScheduler, PRIORITY_INTERACTIVE
+
+# Threads available for blocking SDK calls
+LLM_EXECUTOR_WORKERS = int(os.getenv("LLM_EXECUTOR_WORKERS", 16))
+
+class LLMExecutor:
+    """Runs blocking LLM SDK calls off the event loop with bounded concurrency.
+
+    Calls run in a dedicated thread pool, separate from storage I/O, once the
+    scheduler grants them an upstream slot. Time spent waiting for a slot and
+    time spent in the call are recorded separately.
+    """
+
+    def __init__(self, name: str, workers: int = LLM_EXECUTOR_WORKERS, scheduler: Optional[LLMScheduler] = None):
+        self.name = name
+        self.scheduler = scheduler or LLMScheduler.from_env(name)
+        self.max_in_flight = self.scheduler.max_in_flight
+        self._executor = ThreadPoolExecutor(max_workers=max(workers, self.max_in_flight), thread_name_prefix=f"llm-{name}")
+        self.in_flight = 0
+        self.waiting = 0
+        self.errors = 0
+        self.queue_wait = LatencyStats()
+        self.call_latency = LatencyStats()
+
+    async def run(self, func: Callable[..., Any], *args, priority: int = PRIORITY_INTERACTIVE,
+                  user_id: Optional[str] = None) -> Any:
+        """Run ``func(*args)`` in the executor once the scheduler grants an upstream slot"""
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self.scheduler.acquire(priority, user_id)
+        finally:
+            self.waiting -= 1
+
+        started_at = time.perf_counter()
+        self.queue_wait.record(started_at - queued_at)
+        self.in_flight += 1
+        future = asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(func, *args))
+
+        def finished(future: asyncio.Future) -> None:
+            # The slot is held until the thread is done, even if the caller stopped waiting
+            self.in_flight -= 1
+            self.call_latency.record(time.perf_counter() - started_at)
+            if future.cancelled() or future.exception() is not None:
+                self.errors += 1
+            self.scheduler.release()
+
+        future.add_done_callback(finished)
+        # Shielded so a cancelled caller does not mark the still-running call as finished
+        return await asyncio.shield(future)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "errors": self.errors,
+            "queue_wait": self.queue_wait.snapshot(),
+            "call_latency": self.call_latency.snapshot(),
+            "scheduler": self.scheduler.stats()
+        }
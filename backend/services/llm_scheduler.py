@@ -0,0 +1,211 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+# Concurrent upstream calls allowed per model API
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", 8))
+
+# Priority classes, highest first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_SUMMARY = 1
+PRIORITY_BACKGROUND = 2
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_SUMMARY: "summary", PRIORITY_BACKGROUND: "background"}
+
+class LatencyStats:
+    """Running count/mean/max plus percentiles over a window of recent samples"""
+
+    def __init__(self, window: int = 512):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self._recent.append(seconds)
+
+    def _percentile(self, fraction: float) -> float:
+        if not self._recent:
+            return 0.0
+        ordered = sorted(self._recent)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_ms": (self.total / self.count) * 1000 if self.count else 0.0,
+            "p50_ms": self._percentile(0.50) * 1000,
+            "p95_ms": self._percentile(0.95) * 1000,
+            "max_ms": self.max * 1000
+        }
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``rate_per_minute``; a rate of 0 disables limiting"""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def try_take(self) -> bool:
+        if self.rate <= 0:
+            return True
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def refund(self) -> None:
+        if self.rate > 0:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+    def drain(self) -> None:
+        """Empty the bucket, e.g. after upstream reported the quota exhausted"""
+        self._refill()
+        self.tokens = 0.0
+
+    def time_until_token(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+class LLMScheduler:
+    """Orders upstream model calls by priority, user fairness and API quota.
+
+    Callers wait in one queue per priority class; within a class each user
+    has their own FIFO and users are served round robin, so one user's burst
+    cannot starve the others. A call is granted a slot only when fewer than
+    ``max_in_flight`` calls are running and the token bucket has a token.
+    """
+
+    def __init__(self, name: str, max_in_flight: int, rate_per_minute: float, burst: int):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.bucket = TokenBucket(rate_per_minute, burst)
+        self.rate_per_minute = rate_per_minute
+        # priority -> OrderedDict(user_id -> deque of waiting futures)
+        self._queues: Dict[int, OrderedDict] = {priority: OrderedDict() for priority in PRIORITY_NAMES}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.in_flight = 0
+        self.granted = 0
+        self.throttled = 0
+        self.wait_times = {priority: LatencyStats() for priority in PRIORITY_NAMES}
+
+    @classmethod
+    def from_env(cls, name: str, max_in_flight: int = LLM_MAX_IN_FLIGHT) -> "LLMScheduler":
+        """Scheduler configured by ``<NAME>_RATE_PER_MINUTE`` and ``<NAME>_RATE_BURST``"""
+        prefix = name.upper()
+        return cls(
+            name,
+            max_in_flight,
+            float(os.getenv(f"{prefix}_RATE_PER_MINUTE", 60)),
+            int(os.getenv(f"{prefix}_RATE_BURST", 10))
+        )
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_INTERACTIVE, user_id: Optional[str] = None):
+        """Hold an upstream slot for the duration of the block"""
+        await self.acquire(priority, user_id)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE, user_id: Optional[str] = None) -> None:
+        queued_at = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        users = self._queues[priority]
+        users.setdefault(user_id or "", deque()).append(waiter)
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as the caller went away; hand the slot on
+                self.release()
+            else:
+                self._discard(priority, user_id or "", waiter)
+            raise
+        self.wait_times[priority].record(time.perf_counter() - queued_at)
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _discard(self, priority: int, user_key: str, waiter: asyncio.Future) -> None:
+        users = self._queues[priority]
+        waiters = users.get(user_key)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del users[user_key]
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        """Oldest waiter of the next user in round-robin order of the highest non-empty class"""
+        for priority in sorted(self._queues):
+            users = self._queues[priority]
+            while users:
+                user_key, waiters = next(iter(users.items()))
+                waiter = waiters.popleft()
+                if waiters:
+                    users.move_to_end(user_key)
+                else:
+                    del users[user_key]
+                if not waiter.done():
+                    return waiter
+        return None
+
+    def _has_waiters(self) -> bool:
+        return any(self._queues.values())
+
+    def _dispatch(self) -> None:
+        """Grant slots while capacity and quota allow"""
+        while self.in_flight < self.max_in_flight and self._has_waiters():
+            if not self.bucket.try_take():
+                self._schedule_retry()
+                return
+            waiter = self._next_waiter()
+            if waiter is None:
+                # Only cancelled waiters were left; give the token back
+                self.bucket.refund()
+                return
+            self.in_flight += 1
+            self.granted += 1
+            waiter.set_result(None)
+
+    def _schedule_retry(self) -> None:
+        if self._timer is not None:
+            return
+        self.throttled += 1
+        def fire():
+            self._timer = None
+            self._dispatch()
+        delay = self.bucket.time_until_token()
+        self._timer = asyncio.get_running_loop().call_later(delay, fire)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "rate_per_minute": self.rate_per_minute,
+            "in_flight": self.in_flight,
+            "granted": self.granted,
+            "throttled": self.throttled,
+            "queue_depth": {
+                PRIORITY_NAMES[priority]: sum(len(waiters) for waiters in users.values())
+                for priority, users in self._queues.items()
+            },
+            "wait": {PRIORITY_NAMES[priority]: stats.snapshot() for priority, stats in self.wait_times.items()}
+        }
@@ -0,0 +1,193 @@
+import os
+import math
+import numpy as np
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+# Path count used when none is given, the most allowed, and paths simulated per chunk
+MC_DEFAULT_PATHS = int(os.getenv("MC_DEFAULT_PATHS", 10000))
+MC_MAX_PATHS = int(os.getenv("MC_MAX_PATHS", 100000))
+MC_CHUNK_PATHS = int(os.getenv("MC_CHUNK_PATHS", 4096))
+# Longest horizon simulated, including goals dated further out
+MC_MAX_YEARS = int(os.getenv("MC_MAX_YEARS", 50))
+# Compute budget per simulation in path-months (100k paths x 30 years, about half a second on one core);
+# Student-t draws cost about three times as much as normal ones
+MC_MAX_PATH_MONTHS = int(os.getenv("MC_MAX_PATH_MONTHS", 100000 * 360))
+DRAW_COST = {"normal": 1, "student_t": 3}
+
+# Long-run annual return and volatility assumptions per asset class
+ASSET_CLASSES = {
+    "equity": {"annual_return": 0.12, "annual_volatility": 0.18},
+    "debt": {"annual_return": 0.07, "annual_volatility": 0.04},
+    "gold": {"annual_return": 0.08, "annual_volatility": 0.15},
+    "cash": {"annual_return": 0.04, "annual_volatility": 0.01}
+}
+
+# Correlations between asset classes; unlisted pairs are uncorrelated
+CORRELATIONS = {
+    ("equity", "debt"): 0.2,
+    ("equity", "gold"): -0.1,
+    ("debt", "gold"): 0.1
+}
+
+DISTRIBUTIONS = ("normal", "student_t")
+PERCENTILES = (10, 50, 90)
+
+def portfolio_moments(allocation: Dict[str, float], assets: Optional[Dict[str, Dict[str, float]]] = None):
+    """Monthly mean and standard deviation of a monthly-rebalanced mix of asset classes.
+
+    Weights are normalised to sum to 1. The mix's return is a linear
+    combination of the asset returns, so under a joint normal (or joint
+    Student-t with one shared df) it has the same family of distribution,
+    and one draw per path and month covers every asset.
+    """
+    assets = {**ASSET_CLASSES, **(assets or {})}
+    unknown = [name for name in allocation if name not in assets]
+    if unknown:
+        raise ValueError(f"Unknown asset classes: {', '.join(unknown)}; known: {', '.join(sorted(assets))}")
+    total = sum(allocation.values())
+    if total <= 0 or any(weight < 0 for weight in allocation.values()):
+        raise ValueError("Allocation weights must be non-negative and not all zero")
+
+    names = list(allocation)
+    weights = np.array([allocation[name] / total for name in names])
+    means = np.array([assets[name]["annual_return"] for name in names]) / 12
+    vols = np.array([assets[name]["annual_volatility"] for name in names]) / math.sqrt(12)
+    correlation = np.eye(len(names))
+    for i, first in enumerate(names):
+        for j, second in enumerate(names):
+            if i != j:
+                correlation[i, j] = CORRELATIONS.get((first, second), CORRELATIONS.get((second, first), 0.0))
+    covariance = correlation * np.outer(vols, vols)
+    return float(weights @ means), float(math.sqrt(max(0.0, weights @ covariance @ weights)))
+
+def months_until(target_date: Optional[str], today: Optional[date] = None) -> Optional[int]:
+    """Whole months from today to an ISO date, or None if there is no usable date"""
+    if not target_date:
+        return None
+    try:
+        target = datetime.fromisoformat(str(target_date)).date()
+    except ValueError:
+        return None
+    today = today or date.today()
+    return max(0, (target.year - today.year) * 12 + target.month - today.month)
+
+def _draw(rng: np.random.Generator, shape, distribution: str, df: float) -> np.ndarray:
+    """Standardised shocks (mean 0, variance 1) as float32"""
+    if distribution == "student_t":
+        # Scaled so the variance matches the normal case; fatter tails at the same volatility
+        return (rng.standard_t(df, size=shape) * math.sqrt((df - 2) / df)).astype(np.float32)
+    return rng.standard_normal(size=shape, dtype=np.float32)
+
+def _antithetic(rng: np.random.Generator, months: int, size: int, distribution: str, df: float) -> np.ndarray:
+    """Shocks for ``size`` paths drawn as mirrored pairs (z, -z), halving the draws needed"""
+    shocks = _draw(rng, (months, (size + 1) // 2), distribution, df)
+    return np.concatenate((shocks, -shocks), axis=1)[:, :size]
+
+def simulate(months: int, checkpoints: Iterable[int], monthly_contribution: float, initial_balance: float,
+             monthly_mean: float, monthly_sd: float, paths: int = MC_DEFAULT_PATHS, seed: int = 42,
+             distribution: str = "normal", df: float = 5.0, chunk_paths: int = MC_CHUNK_PATHS) -> np.ndarray:
+    """Balances at each checkpoint month for every path, shape (paths, checkpoints).
+
+    Paths are simulated ``chunk_paths`` at a time, each chunk with its own
+    generator derived from ``seed``, so results are reproducible. Returns are
+    drawn a year of months at a time and folded into one balance vector per
+    chunk (``b = b * (1 + r) + c``), so memory stays at one chunk of draws
+    plus the checkpoint matrix whatever the horizon. Drawing dominates the
+    cost, so shocks are float32 antithetic pairs: half the draws, and lower
+    variance in the bands for the same number of paths.
+    """
+    checkpoints = list(checkpoints)
+    column = {month: i for i, month in enumerate(checkpoints)}
+    balances = np.empty((paths, len(checkpoints)))
+
+    for chunk, start in enumerate(range(0, paths, chunk_paths)):
+        size = min(chunk_paths, paths - start)
+        rng = np.random.default_rng([seed, chunk])
+        balance = np.full(size, float(initial_balance))
+        if 0 in column:
+            balances[start:start + size, column[0]] = balance
+
+        for block_start in range(0, months, 12):
+            block = min(12, months - block_start)
+            growth = _antithetic(rng, block, size, distribution, df)
+            growth *= monthly_sd
+            growth += 1 + monthly_mean
+            # A month cannot lose more than everything
+            np.maximum(growth, 0.01, out=growth)
+            for offset in range(block):
+                balance *= growth[offset]
+                balance += monthly_contribution
+                month = block_start + offset + 1
+                if month in column:
+                    balances[start:start + size, column[month]] = balance
+    return balances
+
+def run_simulation(years: int, monthly_contribution: float, initial_balance: float = 0.0,
+                   allocation: Optional[Dict[str, float]] = None, assets: Optional[Dict[str, Dict[str, float]]] = None,
+                   goals: Optional[List[Dict[str, Any]]] = None, paths: int = MC_DEFAULT_PATHS, seed: int = 42,
+                   distribution: str = "normal", df: float = 5.0) -> Dict[str, Any]:
+    """P10/P50/P90 savings bands at yearly checkpoints and the probability of reaching each goal.
+
+    Each goal is tested on its own: the chance that the whole savings pot
+    covers its remaining amount by its target date (or by the end of the
+    horizon when it has none). Paths times months (with Student-t draws
+    counted three times) must fit MC_MAX_PATH_MONTHS, which holds a run to
+    about half a second on one core.
+    """
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"distribution must be one of: {', '.join(DISTRIBUTIONS)}")
+    if distribution == "student_t" and df <= 2:
+        raise ValueError("df must be greater than 2 for a finite variance")
+    if not 1 <= paths <= MC_MAX_PATHS:
+        raise ValueError(f"paths must be between 1 and {MC_MAX_PATHS}")
+    if not 0 <= years <= MC_MAX_YEARS:
+        raise ValueError(f"years must be between 0 and {MC_MAX_YEARS}")
+
+    allocation = allocation or {"equity": 0.6, "debt": 0.4}
+    monthly_mean, monthly_sd = portfolio_moments(allocation, assets)
+
+    # Goals past the horizon extend it (up to MC_MAX_YEARS), so every goal gets a checkpoint
+    goal_months = [months_until(goal.get("target_date")) for goal in goals or []]
+    goal_months = [None if m is None else min(m, MC_MAX_YEARS * 12) for m in goal_months]
+    months = max([years * 12] + [m for m in goal_months if m is not None])
+    goal_months = [months if m is None else m for m in goal_months]
+    cost = paths * months * DRAW_COST[distribution]
+    if cost > MC_MAX_PATH_MONTHS:
+        raise ValueError(f"{paths} paths over {months} months is over the compute budget; "
+                         f"use at most {MC_MAX_PATH_MONTHS // (months * DRAW_COST[distribution])} paths for this horizon")
+    yearly = list(range(0, months + 1, 12))
+    if yearly[-1] != months:
+        yearly.append(months)
+    checkpoints = sorted(set(yearly) | set(goal_months))
+    column = {month: i for i, month in enumerate(checkpoints)}
+
+    balances = simulate(months, checkpoints, monthly_contribution, initial_balance, monthly_mean, monthly_sd,
+                        paths, seed, distribution, df)
+    yearly_columns = [column[month] for month in yearly]
+    bands = np.percentile(balances[:, yearly_columns], PERCENTILES, axis=0).round(2)
+
+    goal_results = []
+    for goal, month in zip(goals or [], goal_months):
+        remaining = max(0.0, (goal.get("target_amount", 0) or 0) - (goal.get("current_amount", 0) or 0))
+        goal_results.append({
+            "goal_name": goal.get("goal_name", "Goal"),
+            "target_date": goal.get("target_date"),
+            "month": month,
+            "remaining_amount": remaining,
+            "probability": float(np.mean(balances[:, column[month]] >= remaining))
+        })
+
+    return {
+        "paths": paths,
+        "seed": seed,
+        "distribution": distribution,
+        "allocation": allocation,
+        "expected_annual_return": round(monthly_mean * 12, 6),
+        "annual_volatility": round(monthly_sd * math.sqrt(12), 6),
+        "bands": {
+            "month": yearly,
+            **{f"p{p}": bands[i].tolist() for i, p in enumerate(PERCENTILES)}
+        },
+        "goals": goal_results
+    }
@@ -0,0 +1,92 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+# Cache size and how long an entry is trusted before its version is rechecked
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", 1024))
+PROFILE_CACHE_REVALIDATE_SECONDS = float(os.getenv("PROFILE_CACHE_REVALIDATE_SECONDS", 1.0))
+
+class ProfileCache:
+    """Bounded LRU cache of validated profiles keyed by user id.
+
+    Each entry remembers the storage version it was loaded at (file mtime or
+    row version). Within ``revalidate_after`` seconds of the last check an entry
+    is served without touching storage; after that the version is rechecked and
+    the profile reloaded only if it changed.
+    """
+
+    def __init__(self, max_entries: int = PROFILE_CACHE_SIZE, revalidate_after: float = PROFILE_CACHE_REVALIDATE_SECONDS):
+        self.max_entries = max_entries
+        self.revalidate_after = revalidate_after
+        self._entries = OrderedDict()  # user_id -> [value, version, checked_at]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_fresh(self, user_id: str) -> Optional[Any]:
+        """Return the cached profile only if it needs no revalidation (never touches storage)"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or time.monotonic() - entry[2] >= self.revalidate_after:
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[0]
+
+    def get(self, user_id: str, version_fn: Callable[[str], Any], loader: Callable[[str], Optional[Any]]) -> Optional[Any]:
+        """Return the cached profile, loading it on a miss or version change"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and now - entry[2] < self.revalidate_after:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+
+        version = version_fn(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and version is not None and entry[1] == version:
+                entry[2] = now
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        value = loader(user_id)
+        if value is None:
+            self.invalidate(user_id)
+            return None
+        self.put(user_id, value, version)
+        return value
+
+    def put(self, user_id: str, value: Any, version: Any) -> None:
+        """Insert or replace a profile, evicting the least recently used entry"""
+        with self._lock:
+            self._entries[user_id] = [value, version, time.monotonic()]
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
@@ -0,0 +1,65 @@
+import numpy as np
+from typing import Any, Dict, Iterable
+
+def _growth(monthly_rate: np.ndarray, months: np.ndarray):
+    """Compound growth factor and annuity factor for ``months`` of end-of-month contributions.
+
+    The balance after n months is ``initial * growth + contribution * annuity``
+    with ``growth = (1 + r)^n`` and ``annuity = ((1 + r)^n - 1) / r`` (just n
+    when r is 0), which is the month-by-month recurrence
+    ``balance = balance * (1 + r) + contribution`` in closed form.
+    """
+    growth = np.power(1 + monthly_rate, months)
+    rate = np.broadcast_to(monthly_rate, growth.shape)
+    annuity = np.divide(growth - 1, rate, out=np.broadcast_to(months, growth.shape).astype(np.float64), where=rate != 0)
+    return growth, annuity
+
+def projection_grid(years: Iterable[int], annual_rates: Iterable[float], monthly_contributions: Iterable[float],
+                    initial_balance: float = 0.0) -> Dict[str, np.ndarray]:
+    """Final balance for every (years, annual rate %, monthly contribution) scenario, as flat columns"""
+    years = np.asarray(list(years), dtype=np.float64)
+    annual_rates = np.asarray(list(annual_rates), dtype=np.float64)
+    contributions = np.asarray(list(monthly_contributions), dtype=np.float64)
+
+    # Broadcast to a (years, rates, contributions) cube, then flatten in that order
+    months = (years * 12)[:, None, None]
+    monthly_rate = (annual_rates / 100 / 12)[None, :, None]
+    contribution = contributions[None, None, :]
+    growth, annuity = _growth(monthly_rate, months)
+    balance = initial_balance * growth + contribution * annuity
+    contributed = initial_balance + contribution * months
+
+    shape = balance.shape
+    return {
+        "years": np.broadcast_to(years[:, None, None], shape).ravel().astype(int),
+        "annual_rate": np.broadcast_to(annual_rates[None, :, None], shape).ravel(),
+        "monthly_contribution": np.broadcast_to(contribution, shape).ravel(),
+        "contributed": np.broadcast_to(contributed, shape).ravel(),
+        "balance": balance.ravel().round(2),
+        "interest_earned": (balance - contributed).ravel().round(2)
+    }
+
+def projection_curves(years: int, annual_rates: Iterable[float], monthly_contributions: Iterable[float],
+                      initial_balance: float = 0.0) -> Dict[str, Any]:
+    """Month-by-month balance for every (annual rate %, monthly contribution) pair over ``years``"""
+    annual_rates = np.asarray(list(annual_rates), dtype=np.float64)
+    contributions = np.asarray(list(monthly_contributions), dtype=np.float64)
+
+    # (rates, contributions, months) in one broadcast
+    months = np.arange(int(years) * 12 + 1, dtype=np.float64)
+    monthly_rate = (annual_rates / 100 / 12)[:, None, None]
+    contribution = contributions[None, :, None]
+    growth, annuity = _growth(monthly_rate, months[None, None, :])
+    balance = (initial_balance * growth + contribution * annuity).round(2)
+    contributed = initial_balance + contributions[:, None] * months[None, :]
+
+    series = []
+    for i, rate in enumerate(annual_rates.tolist()):
+        for j, amount in enumerate(contributions.tolist()):
+            series.append({
+                "annual_rate": rate,
+                "monthly_contribution": amount,
+                "contributed": contributed[j].round(2).tolist(),
+                "balance": balance[i, j].tolist()
+            })
+    return {"month": months.astype(int).tolist(), "series": series}
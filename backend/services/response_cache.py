@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from services.fingerprint import fingerprint
+from services.async_io import run_io
+
+# In-memory size and lifetime of cached LLM responses
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", 2048))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", 6 * 3600))
+# Directory for on-disk persistence; leave empty to keep the cache in memory only
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", "")
+# Most responses kept on disk; the least recently used are pruned past this
+LLM_CACHE_DISK_ENTRIES = int(os.getenv("LLM_CACHE_DISK_ENTRIES", 20000))
+# Comma-separated endpoints that must never be served from cache (e.g. "chat,summary")
+LLM_CACHE_DISABLED_ENDPOINTS = os.getenv("LLM_CACHE_DISABLED_ENDPOINTS", "")
+
+def normalize_prompt(prompt: str) -> str:
+    """Case- and whitespace-insensitive form of a prompt"""
+    return " ".join(prompt.split()).lower()
+
+class ResponseCache:
+    """Content-addressed cache of LLM responses with LRU and TTL eviction.
+
+    Keys hash the endpoint, normalized prompt, model, generation parameters
+    and profile version, so any change to what the model would see is a miss.
+    """
+
+    def __init__(self, max_entries: int = LLM_CACHE_SIZE, ttl: float = LLM_CACHE_TTL_SECONDS,
+                 persist_dir: str = LLM_CACHE_DIR, disabled_endpoints: str = LLM_CACHE_DISABLED_ENDPOINTS,
+                 max_disk_entries: int = LLM_CACHE_DISK_ENTRIES):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persist_dir = persist_dir or None
+        self.max_disk_entries = max_disk_entries
+        self.disabled_endpoints = {name.strip() for name in disabled_endpoints.split(",") if name.strip()}
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.disk_evictions = 0
+        self._disk_lock = threading.Lock()
+        self._disk_entries = 0
+        if self.persist_dir:
+            os.makedirs(self.persist_dir, exist_ok=True)
+            self._disk_entries = len(self._disk_files())
+
+    def enabled(self, endpoint: str) -> bool:
+        return endpoint not in self.disabled_endpoints
+
+    @staticmethod
+    def make_key(endpoint: str, prompt: str, model: str, params: Optional[Dict[str, Any]] = None,
+                 profile_version: Optional[str] = None) -> str:
+        return fingerprint(endpoint, normalize_prompt(prompt), model, params or {}, profile_version)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.persist_dir, key[:2], f"{key}.json")
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def _put_memory(self, key: str, value: str, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _disk_files(self) -> List[str]:
+        return [os.path.join(root, name) for root, _, names in os.walk(self.persist_dir)
+                for name in names if name.endswith(".json")]
+
+    def _remove_disk(self, path: str) -> bool:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        with self._disk_lock:
+            self._disk_entries -= 1
+        return True
+
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except json.JSONDecodeError:
+            entry = None
+        # Expired and unreadable entries are deleted as they are found
+        if not entry or entry.get("expires_at", 0) <= time.time():
+            if self._remove_disk(path) and entry:
+                self.expirations += 1
+            return None
+        # The file's mtime is its last use, which the pruning order goes by
+        os.utime(path)
+        return entry
+
+    def _write_disk(self, key: str, value: str, expires_at: float) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        existed = os.path.exists(path)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"value": value, "expires_at": expires_at}, f)
+        os.replace(tmp_path, path)
+        if not existed:
+            with self._disk_lock:
+                self._disk_entries += 1
+                full = self._disk_entries > self.max_disk_entries
+            if full:
+                self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """Delete expired files, then the least recently used, down to 90% of the disk limit.
+
+        A file untouched for a whole TTL has expired, since it was written no
+        later than it was last used. Pruning below the limit means the directory
+        is scanned once every few thousand writes rather than on each one.
+        """
+        with self._disk_lock:
+            expired_before = time.time() - self.ttl
+            files = []
+            for path in self._disk_files():
+                try:
+                    files.append((os.path.getmtime(path), path))
+                except FileNotFoundError:
+                    continue
+            files.sort()
+            keep = int(self.max_disk_entries * 0.9)
+            removed = 0
+            for last_used, path in files:
+                if len(files) - removed <= keep and last_used >= expired_before:
+                    break
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+            self._disk_entries = len(files) - removed
+            self.disk_evictions += removed
+
+    async def get(self, key: str) -> Optional[str]:
+        """Cached response for ``key``, or None"""
+        value = self._get_memory(key)
+        if value is not None or not self.persist_dir:
+            if value is None:
+                self.misses += 1
+            return value
+
+        entry = await run_io(self._read_disk, key)
+        if entry:
+            self._put_memory(key, entry["value"], entry["expires_at"])
+            self.disk_hits += 1
+            return entry["value"]
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, value: str) -> None:
+        expires_at = time.time() + self.ttl
+        self._put_memory(key, value, expires_at)
+        if self.persist_dir:
+            try:
+                await run_io(self._write_disk, key, value, expires_at)
+            except OSError as e:
+                print(f"Error persisting cached response: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "size": size,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "expirations": self.expirations,
+            "disk_evictions": self.disk_evictions,
+            "disabled_endpoints": sorted(self.disabled_endpoints)
+        }
@@ -0,0 +1,394 @@
+import os
+import json
+import queue
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Dict, Optional, Any
+from services.storage import StorageBackend, GOAL_UPDATE_FIELDS, contribution_entry, goal_date, new_goal, opening_balance
+from services.expense_ledger import expense_month, rollups_from_rows, summarize
+
+# Number of pooled connections; WAL lets readers proceed while one writer commits
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", 4))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_user ON chat_messages (user_id, id);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_created ON chat_messages (user_id, created_at);
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    category TEXT NOT NULL,
+    amount REAL NOT NULL,
+    description TEXT,
+    date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_expenses_user_date ON expenses (user_id, date);
+CREATE TABLE IF NOT EXISTS expense_rollups (
+    user_id TEXT NOT NULL,
+    month TEXT NOT NULL,
+    category TEXT NOT NULL,
+    total REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, month, category)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS expense_totals (
+    user_id TEXT NOT NULL,
+    category TEXT NOT NULL,
+    total REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, category)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS goals (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    goal_name TEXT NOT NULL,
+    target_amount REAL NOT NULL,
+    current_amount REAL NOT NULL DEFAULT 0,
+    target_date TEXT,
+    priority INTEGER NOT NULL DEFAULT 1,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_goals_target_date ON goals (target_date);
+CREATE TABLE IF NOT EXISTS goal_contributions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    goal_id TEXT NOT NULL REFERENCES goals (goal_id) ON DELETE CASCADE,
+    user_id TEXT NOT NULL,
+    amount REAL NOT NULL,
+    running_total REAL NOT NULL,
+    note TEXT,
+    date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_goal_contributions_goal ON goal_contributions (goal_id, id);
+"""
+
+# Rollups for expenses recorded before the rollup tables existed (only when they are empty)
+EXPENSE_ROLLUP_BACKFILL = """
+INSERT INTO expense_rollups (user_id, month, category, total, count)
+SELECT user_id, substr(date, 1, 7), category, SUM(amount), COUNT(*) FROM expenses
+WHERE date GLOB '[0-9][0-9][0-9][0-9]-[01][0-9]*' AND NOT EXISTS (SELECT 1 FROM expense_rollups)
+GROUP BY user_id, substr(date, 1, 7), category;
+INSERT INTO expense_totals (user_id, category, total, count)
+SELECT user_id, category, SUM(total), SUM(count) FROM expense_rollups
+WHERE NOT EXISTS (SELECT 1 FROM expense_totals)
+GROUP BY user_id, category;
+"""
+
+# Columns added to goals after the first release, created on databases that predate them
+GOAL_COLUMNS = {
+    "goal_id": "TEXT",
+    "contribution_count": "INTEGER NOT NULL DEFAULT 0",
+    "updated_at": "TEXT"
+}
+GOAL_INDEXES = """
+UPDATE goals SET goal_id = lower(hex(randomblob(16))) WHERE goal_id IS NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_goals_goal_id ON goals (goal_id);
+CREATE INDEX IF NOT EXISTS idx_goals_user_priority ON goals (user_id, priority, target_date);
+DROP INDEX IF EXISTS idx_goals_user;
+"""
+
+# Statements are kept as constants so sqlite3's per-connection statement cache
+# reuses the prepared form instead of re-parsing them on every call
+SQL_GET_PROFILE = "SELECT data FROM profiles WHERE user_id = ?"
+SQL_UPSERT_PROFILE = """
+INSERT INTO profiles (user_id, data, version, updated_at) VALUES (?, ?, 1, ?)
+ON CONFLICT (user_id) DO UPDATE SET data = excluded.data, version = profiles.version + 1, updated_at = excluded.updated_at
+"""
+SQL_GET_PROFILE_VERSION = "SELECT version FROM profiles WHERE user_id = ?"
+SQL_LIST_PROFILE_IDS = "SELECT user_id FROM profiles"
+SQL_LIST_USER_IDS = """
+SELECT user_id FROM profiles UNION SELECT user_id FROM chat_messages
+UNION SELECT user_id FROM expenses UNION SELECT user_id FROM goals ORDER BY user_id
+"""
+SQL_GET_HISTORY = "SELECT role, content FROM chat_messages WHERE user_id = ? ORDER BY id"
+SQL_GET_RECENT_HISTORY = """
+SELECT role, content FROM (
+    SELECT id, role, content FROM chat_messages WHERE user_id = ? ORDER BY id DESC LIMIT ?
+) ORDER BY id
+"""
+SQL_INSERT_MESSAGE = "INSERT INTO chat_messages (user_id, role, content, created_at) VALUES (?, ?, ?, ?)"
+SQL_INSERT_EXPENSE = "INSERT INTO expenses (user_id, category, amount, description, date) VALUES (?, ?, ?, ?, ?)"
+SQL_LIST_EXPENSES = "SELECT user_id, category, amount, description, date FROM expenses WHERE user_id = ? ORDER BY date"
+SQL_UPSERT_EXPENSE_ROLLUP = """
+INSERT INTO expense_rollups (user_id, month, category, total, count) VALUES (?, ?, ?, ?, 1)
+ON CONFLICT (user_id, month, category) DO UPDATE SET total = total + excluded.total, count = count + 1
+"""
+SQL_UPSERT_EXPENSE_TOTAL = """
+INSERT INTO expense_totals (user_id, category, total, count) VALUES (?, ?, ?, 1)
+ON CONFLICT (user_id, category) DO UPDATE SET total = total + excluded.total, count = count + 1
+"""
+SQL_EXPENSE_ROLLUPS = """
+SELECT month, category, total, count FROM expense_rollups
+WHERE user_id = ? AND month BETWEEN ? AND ? ORDER BY month
+"""
+SQL_EXPENSE_TOTALS = "SELECT category, total, count FROM expense_totals WHERE user_id = ?"
+SQL_INSERT_GOAL = """
+INSERT INTO goals (goal_id, user_id, goal_name, target_amount, current_amount, target_date, priority,
+                   contribution_count, created_at, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+GOAL_COLUMNS_SQL = """goal_id, user_id, goal_name, target_amount, current_amount, target_date, priority,
+contribution_count, created_at, updated_at"""
+SQL_LIST_GOALS = f"""
+SELECT {GOAL_COLUMNS_SQL} FROM goals WHERE user_id = ?
+ORDER BY priority, target_date IS NULL, target_date
+"""
+SQL_GET_GOAL = f"SELECT {GOAL_COLUMNS_SQL} FROM goals WHERE user_id = ? AND goal_id = ?"
+SQL_DELETE_GOAL = "DELETE FROM goals WHERE user_id = ? AND goal_id = ?"
+SQL_ADD_TO_GOAL = """
+UPDATE goals SET current_amount = ?, contribution_count = ?, updated_at = ?
+WHERE user_id = ? AND goal_id = ?
+"""
+SQL_INSERT_CONTRIBUTION = """
+INSERT INTO goal_contributions (goal_id, user_id, amount, running_total, note, date) VALUES (?, ?, ?, ?, ?, ?)
+"""
+SQL_LIST_CONTRIBUTIONS = """
+SELECT goal_id, amount, running_total, ROW_NUMBER() OVER (ORDER BY id) AS sequence, note, date
+FROM goal_contributions WHERE goal_id = ? AND user_id = ? ORDER BY id
+"""
+SQL_GOALS_DUE = f"""
+SELECT {GOAL_COLUMNS_SQL} FROM goals WHERE target_date BETWEEN ? AND ?
+ORDER BY target_date, priority
+"""
+
+class ConnectionPool:
+    """A small fixed-size pool of SQLite connections shared across threads"""
+
+    def __init__(self, db_path: str, size: int = SQLITE_POOL_SIZE):
+        self._connections = queue.Queue(maxsize=size)
+        for _ in range(size):
+            conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30, cached_statements=128)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._connections.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; commits on success and rolls back on error"""
+        conn = self._connections.get()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._connections.put(conn)
+
+    def close(self) -> None:
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+class SqliteStorage(StorageBackend):
+    """Embedded SQLite backend running in WAL mode"""
+
+    def __init__(self, db_path: str, pool_size: int = SQLITE_POOL_SIZE):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Create the schema before the pool so every connection sees it
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(goals)")}
+            for column, definition in GOAL_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE goals ADD COLUMN {column} {definition}")
+            conn.executescript(GOAL_INDEXES)
+            conn.executescript(EXPENSE_ROLLUP_BACKFILL)
+        conn.close()
+
+        self.db_path = db_path
+        self.pool = ConnectionPool(db_path, pool_size)
+
+    def get_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self.pool.connection() as conn:
+            row = conn.execute(SQL_GET_PROFILE, (user_id,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def save_profile(self, profile: Dict[str, Any]) -> None:
+        with self.pool.connection() as conn:
+            conn.execute(SQL_UPSERT_PROFILE, (profile["user_id"], json.dumps(profile), datetime.now().isoformat()))
+
+    def profile_version(self, user_id: str) -> Optional[Any]:
+        with self.pool.connection() as conn:
+            row = conn.execute(SQL_GET_PROFILE_VERSION, (user_id,)).fetchone()
+        return row["version"] if row else None
+
+    def list_profile_ids(self) -> List[str]:
+        with self.pool.connection() as conn:
+            return [row["user_id"] for row in conn.execute(SQL_LIST_PROFILE_IDS)]
+
+    def list_user_ids(self) -> List[str]:
+        with self.pool.connection() as conn:
+            return [row["user_id"] for row in conn.execute(SQL_LIST_USER_IDS)]
+
+    def get_chat_history(self, user_id: str, last_n: Optional[int] = None) -> List[Dict[str, str]]:
+        with self.pool.connection() as conn:
+            if last_n is None:
+                rows = conn.execute(SQL_GET_HISTORY, (user_id,)).fetchall()
+            else:
+                rows = conn.execute(SQL_GET_RECENT_HISTORY, (user_id, last_n)).fetchall()
+        return [{"role": row["role"], "content": row["content"]} for row in rows]
+
+    def append_chat_history(self, user_id: str, turns: List[Dict[str, str]]) -> None:
+        now = datetime.now().isoformat()
+        with self.pool.connection() as conn:
+            conn.executemany(SQL_INSERT_MESSAGE, [(user_id, turn["role"], turn["content"], now) for turn in turns])
+
+    def append_chat_history_batch(self, batch: Dict[str, List[Dict[str, str]]]) -> None:
+        # One transaction, hence one WAL commit, for the whole batch
+        now = datetime.now().isoformat()
+        rows = [(user_id, turn["role"], turn["content"], now) for user_id, turns in batch.items() for turn in turns]
+        with self.pool.connection() as conn:
+            conn.executemany(SQL_INSERT_MESSAGE, rows)
+
+    @staticmethod
+    def _insert_expense(conn: sqlite3.Connection, expense: Dict[str, Any], month: Optional[str]) -> None:
+        conn.execute(SQL_INSERT_EXPENSE, (
+            expense["user_id"], expense["category"], expense["amount"],
+            expense.get("description"), expense["date"]
+        ))
+        if month is not None:
+            conn.execute(SQL_UPSERT_EXPENSE_ROLLUP, (expense["user_id"], month, expense["category"], expense["amount"]))
+            conn.execute(SQL_UPSERT_EXPENSE_TOTAL, (expense["user_id"], expense["category"], expense["amount"]))
+
+    def add_expense(self, expense: Dict[str, Any]) -> Dict[str, Any]:
+        month = expense_month(expense["date"])
+        # The ledger row and both rollups commit in one transaction
+        with self.pool.connection() as conn:
+            self._insert_expense(conn, expense, month)
+        return expense
+
+    def list_expenses(self, user_id: str) -> List[Dict[str, Any]]:
+        with self.pool.connection() as conn:
+            return [dict(row) for row in conn.execute(SQL_LIST_EXPENSES, (user_id,))]
+
+    def expense_summary(self, user_id: str, start_month: Optional[str] = None,
+                        end_month: Optional[str] = None) -> Dict[str, Any]:
+        with self.pool.connection() as conn:
+            rows = conn.execute(SQL_EXPENSE_ROLLUPS, (user_id, start_month or "0000-00", end_month or "9999-99")).fetchall()
+            totals = None
+            if start_month is None and end_month is None:
+                totals = rollups_from_rows(("", *row) for row in conn.execute(SQL_EXPENSE_TOTALS, (user_id,))).get("")
+        return summarize(rollups_from_rows(rows), start_month, end_month, totals)
+
+    def add_goal(self, goal: Dict[str, Any]) -> Dict[str, Any]:
+        goal = new_goal(goal)
+        opening = opening_balance(goal)
+        # A new goal's starting amount is logged like any other contribution
+        goal.update(current_amount=0, contribution_count=0)
+        # The goal and its opening balance commit together
+        with self.pool.connection() as conn:
+            conn.execute(SQL_INSERT_GOAL, (
+                goal["goal_id"], goal["user_id"], goal["goal_name"], goal["target_amount"], goal["current_amount"],
+                goal["target_date"], goal["priority"], goal["contribution_count"], goal["created_at"], goal["updated_at"]
+            ))
+            if opening:
+                self._log_contribution(conn, goal, opening)
+        return goal
+
+    def list_goals(self, user_id: str) -> List[Dict[str, Any]]:
+        with self.pool.connection() as conn:
+            return [dict(row) for row in conn.execute(SQL_LIST_GOALS, (user_id,))]
+
+    def get_goal(self, user_id: str, goal_id: str) -> Optional[Dict[str, Any]]:
+        with self.pool.connection() as conn:
+            row = conn.execute(SQL_GET_GOAL, (user_id, goal_id)).fetchone()
+        return dict(row) if row else None
+
+    def update_goal(self, user_id: str, goal_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        changes = {field: value for field, value in changes.items() if field in GOAL_UPDATE_FIELDS}
+        if "target_date" in changes:
+            changes["target_date"] = goal_date(changes["target_date"])
+        # Column names come from GOAL_UPDATE_FIELDS only
+        assignments = "".join(f"{field} = ?, " for field in changes)
+        with self.pool.connection() as conn:
+            conn.execute(f"UPDATE goals SET {assignments}updated_at = ? WHERE user_id = ? AND goal_id = ?",
+                         (*changes.values(), datetime.now().isoformat(), user_id, goal_id))
+            row = conn.execute(SQL_GET_GOAL, (user_id, goal_id)).fetchone()
+        return dict(row) if row else None
+
+    def delete_goal(self, user_id: str, goal_id: str) -> bool:
+        with self.pool.connection() as conn:
+            return conn.execute(SQL_DELETE_GOAL, (user_id, goal_id)).rowcount > 0
+
+    def add_goal_contribution(self, user_id: str, goal_id: str, contribution: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # One transaction: the log entry and the running total commit together
+        with self.pool.connection() as conn:
+            row = conn.execute(SQL_GET_GOAL, (user_id, goal_id)).fetchone()
+            if row is None:
+                return None
+            goal = dict(row)
+            entry = self._log_contribution(conn, goal, contribution)
+        return {"contribution": entry, "goal": goal}
+
+    @staticmethod
+    def _log_contribution(conn: sqlite3.Connection, goal: Dict[str, Any], contribution: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a contribution and move the goal's total to match, inside the caller's transaction"""
+        entry = contribution_entry(goal, contribution)
+        goal.update(current_amount=entry["running_total"], contribution_count=entry["sequence"],
+                    updated_at=datetime.now().isoformat())
+        conn.execute(SQL_INSERT_CONTRIBUTION, (goal["goal_id"], goal["user_id"], entry["amount"],
+                                               entry["running_total"], entry["note"], entry["date"]))
+        conn.execute(SQL_ADD_TO_GOAL, (goal["current_amount"], goal["contribution_count"], goal["updated_at"],
+                                       goal["user_id"], goal["goal_id"]))
+        return entry
+
+    def list_goal_contributions(self, user_id: str, goal_id: str) -> List[Dict[str, Any]]:
+        with self.pool.connection() as conn:
+            return [dict(row) for row in conn.execute(SQL_LIST_CONTRIBUTIONS, (goal_id, user_id))]
+
+    def list_goals_due(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        with self.pool.connection() as conn:
+            return [dict(row) for row in conn.execute(SQL_GOALS_DUE, (start_date, end_date))]
+
+    def import_from(self, legacy: StorageBackend) -> None:
+        """Copy every user's profile, chat history, expenses, goals and goal contributions out of another backend"""
+        for user_id in legacy.list_user_ids():
+            profile = legacy.get_profile(user_id)
+            if profile:
+                self.save_profile(profile)
+
+            history = legacy.get_chat_history(user_id)
+            if history:
+                self.append_chat_history(user_id, history)
+
+            # One transaction per user; entries with unreadable dates stay in the ledger, outside the rollups
+            expenses = legacy.list_expenses(user_id)
+            with self.pool.connection() as conn:
+                for expense in expenses:
+                    try:
+                        month = expense_month(expense["date"])
+                    except ValueError:
+                        month = None
+                    self._insert_expense(conn, {**expense, "user_id": user_id}, month)
+
+            for goal in legacy.list_goals(user_id):
+                contributions = legacy.list_goal_contributions(user_id, goal["goal_id"])
+                goal = new_goal(goal)
+                with self.pool.connection() as conn:
+                    conn.execute(SQL_INSERT_GOAL, (
+                        goal["goal_id"], user_id, goal["goal_name"], goal["target_amount"], goal["current_amount"],
+                        goal["target_date"], goal["priority"], goal["contribution_count"], goal["created_at"],
+                        goal["updated_at"]
+                    ))
+                    conn.executemany(SQL_INSERT_CONTRIBUTION, [
+                        (goal["goal_id"], user_id, entry["amount"], entry["running_total"], entry.get("note"), entry["date"])
+                        for entry in contributions
+                    ])
+
+    def close(self) -> None:
+        self.pool.close()
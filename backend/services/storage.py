@@ -0,0 +1,425 @@
+import os
+import json
+import uuid
+import bisect
+import threading
+from datetime import datetime
+from typing import List, Dict, Optional, Any, Tuple
+from services.chat_log import ChatLogStore
+from services.expense_ledger import apply_expense, empty_rollup, expense_month, summarize
+
+# Storage backend selection ("json" keeps the legacy file layout)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+DB_DIR = os.getenv("DB_DIR", "db")
+CHAT_LOG_FSYNC = os.getenv("CHAT_LOG_FSYNC", "true").lower() == "true"
+
+# Goal fields a client may change after creation. The saved amount is not one of
+# them: it only moves through logged contributions, so it always matches the log
+GOAL_UPDATE_FIELDS = ("goal_name", "target_amount", "target_date", "priority")
+
+def goal_date(value: Optional[str]) -> Optional[str]:
+    """Normalise a goal's target date to YYYY-MM-DD so dates sort and compare as strings"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value)).date().isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid target_date: {value}")
+
+def new_goal(goal: Dict[str, Any]) -> Dict[str, Any]:
+    """A stored goal record with its id, running total and timestamps filled in"""
+    now = datetime.now().isoformat()
+    return {
+        "goal_id": goal.get("goal_id") or uuid.uuid4().hex,
+        "user_id": goal["user_id"],
+        "goal_name": goal["goal_name"],
+        "target_amount": goal["target_amount"],
+        "current_amount": goal.get("current_amount", 0) or 0,
+        "target_date": goal_date(goal.get("target_date")),
+        "priority": goal.get("priority", 1),
+        "contribution_count": goal.get("contribution_count", 0),
+        "created_at": goal.get("created_at") or now,
+        "updated_at": now
+    }
+
+def contribution_entry(goal: Dict[str, Any], contribution: Dict[str, Any]) -> Dict[str, Any]:
+    """Log entry for a contribution to a goal, with the goal's total and contribution count after it"""
+    running_total = goal["current_amount"] + contribution["amount"]
+    if running_total < 0:
+        raise ValueError("Contribution would take the goal's saved amount below zero")
+    return {
+        "goal_id": goal["goal_id"],
+        "amount": contribution["amount"],
+        "running_total": running_total,
+        "sequence": goal.get("contribution_count", 0) + 1,
+        "note": contribution.get("note"),
+        "date": contribution.get("date") or datetime.now().isoformat()
+    }
+
+def opening_balance(goal: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Contribution that records the amount a new goal starts with, if any"""
+    if not goal.get("current_amount"):
+        return None
+    return {"amount": goal["current_amount"], "note": "Opening balance", "date": goal["created_at"]}
+
+class StorageBackend:
+    """Interface shared by the storage backends used by the chat router"""
+
+    def get_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def save_profile(self, profile: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def profile_version(self, user_id: str) -> Optional[Any]:
+        """Cheap token that changes whenever the stored profile changes"""
+        raise NotImplementedError
+
+    def list_profile_ids(self) -> List[str]:
+        raise NotImplementedError
+
+    def list_user_ids(self) -> List[str]:
+        """Every user with any stored data: a profile, chat history, expenses or goals"""
+        raise NotImplementedError
+
+    def get_chat_history(self, user_id: str, last_n: Optional[int] = None) -> List[Dict[str, str]]:
+        raise NotImplementedError
+
+    def append_chat_history(self, user_id: str, turns: List[Dict[str, str]]) -> None:
+        raise NotImplementedError
+
+    def append_chat_history_batch(self, batch: Dict[str, List[Dict[str, str]]]) -> None:
+        """Persist turns for several users in one write, all or nothing.
+
+        The write-behind buffer retries a failed batch whole, so backends
+        must not leave part of it stored.
+        """
+        for user_id, turns in batch.items():
+            self.append_chat_history(user_id, turns)
+
+    def add_expense(self, expense: Dict[str, Any]) -> Dict[str, Any]:
+        """Append an expense to the ledger and fold it into the monthly and running rollups"""
+        raise NotImplementedError
+
+    def list_expenses(self, user_id: str) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def expense_summary(self, user_id: str, start_month: Optional[str] = None,
+                        end_month: Optional[str] = None) -> Dict[str, Any]:
+        """Spend per month and category between two YYYY-MM months (inclusive), read from the rollups"""
+        raise NotImplementedError
+
+    def add_goal(self, goal: Dict[str, Any]) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def list_goals(self, user_id: str) -> List[Dict[str, Any]]:
+        """A user's goals ordered by priority, then target date"""
+        raise NotImplementedError
+
+    def get_goal(self, user_id: str, goal_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def update_goal(self, user_id: str, goal_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply changes to GOAL_UPDATE_FIELDS; None if the goal does not exist"""
+        raise NotImplementedError
+
+    def delete_goal(self, user_id: str, goal_id: str) -> bool:
+        raise NotImplementedError
+
+    def add_goal_contribution(self, user_id: str, goal_id: str, contribution: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Log a contribution and add it to the goal's running total in the same write.
+
+        Returns ``{"contribution": ..., "goal": ...}``, or None if the goal
+        does not exist; raises ValueError if the total would go below zero.
+        """
+        raise NotImplementedError
+
+    def list_goal_contributions(self, user_id: str, goal_id: str) -> List[Dict[str, Any]]:
+        """Contributions in order, each with the running total after it"""
+        raise NotImplementedError
+
+    def list_goals_due(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """Goals of every user with a target date in [start_date, end_date], soonest first"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+class JsonStorage(StorageBackend):
+    """Legacy file layout: one JSON file per profile plus append-only JSONL logs"""
+
+    def __init__(self, db_dir: str = DB_DIR):
+        self.db_dir = db_dir
+        self.profiles_dir = os.path.join(db_dir, "profiles")
+        self.goals_dir = os.path.join(db_dir, "goals")
+        self.rollups_dir = os.path.join(db_dir, "expense_rollups")
+        os.makedirs(self.profiles_dir, exist_ok=True)
+        os.makedirs(self.goals_dir, exist_ok=True)
+        os.makedirs(self.rollups_dir, exist_ok=True)
+
+        self.chat_log = ChatLogStore(os.path.join(db_dir, "chat_logs"), fsync=CHAT_LOG_FSYNC)
+        self.chat_log.migrate_memory_json(os.path.join(db_dir, "memory.json"))
+        self.expense_log = ChatLogStore(os.path.join(db_dir, "expenses"))
+        self.contribution_log = ChatLogStore(os.path.join(db_dir, "goal_contributions"))
+        self._goals_lock = threading.Lock()
+        self._expenses_lock = threading.Lock()
+
+        # Sorted (target_date, user_id, goal_id) entries for due-date queries across users
+        self._due_index: List[Tuple[str, str, str]] = []
+        for name in os.listdir(self.goals_dir):
+            if name.endswith(".json"):
+                for goal in self._load_goals(name[:-5]):
+                    self._index_goal(goal)
+
+    def _profile_path(self, user_id: str) -> str:
+        return os.path.join(self.profiles_dir, f"{os.path.basename(user_id)}.json")
+
+    def _goals_path(self, user_id: str) -> str:
+        return os.path.join(self.goals_dir, f"{os.path.basename(user_id)}.json")
+
+    def get_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._profile_path(user_id), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save_profile(self, profile: Dict[str, Any]) -> None:
+        with open(self._profile_path(profile["user_id"]), "w") as f:
+            json.dump(profile, f, indent=2)
+
+    def profile_version(self, user_id: str) -> Optional[Any]:
+        try:
+            stat = os.stat(self._profile_path(user_id))
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def list_profile_ids(self) -> List[str]:
+        return [name[:-5] for name in os.listdir(self.profiles_dir) if name.endswith(".json")]
+
+    def list_user_ids(self) -> List[str]:
+        # Logs of ids that are not safe directory names are stored under a hash of the id;
+        # they are attributed through the ids known from profiles, goals and expense entries
+        user_ids = set(self.list_profile_ids())
+        for name in os.listdir(self.goals_dir):
+            if name.endswith(".json"):
+                user_ids.update(goal["user_id"] for goal in self._load_goals(name[:-5]))
+        for name in self.expense_log.dir_owners():
+            entries = self.expense_log.read_dir(name)
+            if entries and entries[0].get("user_id"):
+                user_ids.add(entries[0]["user_id"])
+
+        for log in (self.chat_log, self.contribution_log):
+            for name, user_id in log.dir_owners(user_ids).items():
+                if user_id is None:
+                    print(f"Log directory {os.path.join(log.root_dir, name)} matches no known user id; skipped")
+                else:
+                    user_ids.add(user_id)
+        return sorted(user_ids)
+
+    def get_chat_history(self, user_id: str, last_n: Optional[int] = None) -> List[Dict[str, str]]:
+        return self.chat_log.read(user_id, last_n)
+
+    def append_chat_history(self, user_id: str, turns: List[Dict[str, str]]) -> None:
+        self.chat_log.append(user_id, turns)
+
+    def append_chat_history_batch(self, batch: Dict[str, List[Dict[str, str]]]) -> None:
+        self.chat_log.append_batch(batch)
+
+    def _rollup_path(self, user_id: str) -> str:
+        return os.path.join(self.rollups_dir, f"{os.path.basename(user_id)}.json")
+
+    def _load_rollups(self, user_id: str) -> Dict[str, Any]:
+        """A user's monthly and running rollups, rebuilt from the ledger if they lag behind it.
+
+        The rollup file records how many ledger entries it covers; a crash
+        between the ledger append and the rollup write (or a ledger from
+        before rollups existed) shows up as a mismatch with the ledger count.
+        """
+        try:
+            with open(self._rollup_path(user_id), "r") as f:
+                rollups = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            rollups = None
+        if rollups is not None and rollups["entries"] == self.expense_log.count(user_id):
+            return rollups
+
+        rollups = {"entries": 0, "months": {}, "totals": empty_rollup()}
+        for expense in self.expense_log.read(user_id):
+            try:
+                self._apply_rollup(rollups, expense)
+            except ValueError:
+                # Entries logged before dates were validated count as covered but stay out of the rollups
+                rollups["entries"] += 1
+        self._save_rollups(user_id, rollups)
+        return rollups
+
+    def _save_rollups(self, user_id: str, rollups: Dict[str, Any]) -> None:
+        path = self._rollup_path(user_id)
+        with open(path + ".tmp", "w") as f:
+            json.dump(rollups, f)
+        os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def _apply_rollup(rollups: Dict[str, Any], expense: Dict[str, Any]) -> None:
+        month = rollups["months"].setdefault(expense_month(expense["date"]), empty_rollup())
+        apply_expense(month, expense["category"], expense["amount"])
+        apply_expense(rollups["totals"], expense["category"], expense["amount"])
+        rollups["entries"] += 1
+
+    def add_expense(self, expense: Dict[str, Any]) -> Dict[str, Any]:
+        expense_month(expense["date"])
+        with self._expenses_lock:
+            rollups = self._load_rollups(expense["user_id"])
+            self.expense_log.append(expense["user_id"], [expense])
+            self._apply_rollup(rollups, expense)
+            self._save_rollups(expense["user_id"], rollups)
+        return expense
+
+    def list_expenses(self, user_id: str) -> List[Dict[str, Any]]:
+        return self.expense_log.read(user_id)
+
+    def expense_summary(self, user_id: str, start_month: Optional[str] = None,
+                        end_month: Optional[str] = None) -> Dict[str, Any]:
+        with self._expenses_lock:
+            rollups = self._load_rollups(user_id)
+        return summarize(rollups["months"], start_month, end_month, rollups["totals"])
+
+    def _load_goals(self, user_id: str) -> List[Dict[str, Any]]:
+        try:
+            with open(self._goals_path(user_id), "r") as f:
+                goals = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+        # Goals saved before ids existed get one the first time they are read
+        if any("goal_id" not in goal for goal in goals):
+            goals = [goal if "goal_id" in goal else new_goal(goal) for goal in goals]
+            self._save_goals(user_id, goals)
+
+        # Contributions are logged before the goals file is saved, one at a time, so
+        # a crash in between leaves the goal behind only the user's last log entry
+        last = self.contribution_log.read(user_id, last_n=1)
+        if last and "sequence" in last[0]:
+            entry = last[0]
+            goal = next((goal for goal in goals if goal["goal_id"] == entry["goal_id"]), None)
+            if goal is not None and goal.get("contribution_count", 0) < entry["sequence"]:
+                goal.update(current_amount=entry["running_total"], contribution_count=entry["sequence"])
+                self._save_goals(user_id, goals)
+        return goals
+
+    def _save_goals(self, user_id: str, goals: List[Dict[str, Any]]) -> None:
+        path = self._goals_path(user_id)
+        with open(path + ".tmp", "w") as f:
+            json.dump(goals, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def _index_goal(self, goal: Dict[str, Any]) -> None:
+        if goal.get("target_date"):
+            bisect.insort(self._due_index, (goal["target_date"], goal["user_id"], goal["goal_id"]))
+
+    def _unindex_goal(self, goal: Dict[str, Any]) -> None:
+        entry = (goal.get("target_date"), goal["user_id"], goal["goal_id"])
+        position = bisect.bisect_left(self._due_index, entry) if entry[0] else len(self._due_index)
+        if position < len(self._due_index) and self._due_index[position] == entry:
+            del self._due_index[position]
+
+    def add_goal(self, goal: Dict[str, Any]) -> Dict[str, Any]:
+        goal = new_goal(goal)
+        opening = opening_balance(goal)
+        # A new goal's starting amount is logged like any other contribution
+        goal.update(current_amount=0, contribution_count=0)
+        with self._goals_lock:
+            goals = self._load_goals(goal["user_id"])
+            goals.append(goal)
+            if opening:
+                self._log_contribution(goal, opening)
+            self._save_goals(goal["user_id"], goals)
+            self._index_goal(goal)
+        return goal
+
+    def list_goals(self, user_id: str) -> List[Dict[str, Any]]:
+        with self._goals_lock:
+            goals = self._load_goals(user_id)
+        return sorted(goals, key=lambda goal: (goal.get("priority", 1), goal.get("target_date") or "9999-12-31"))
+
+    def get_goal(self, user_id: str, goal_id: str) -> Optional[Dict[str, Any]]:
+        return next((goal for goal in self.list_goals(user_id) if goal["goal_id"] == goal_id), None)
+
+    def update_goal(self, user_id: str, goal_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        changes = {field: value for field, value in changes.items() if field in GOAL_UPDATE_FIELDS}
+        if "target_date" in changes:
+            changes["target_date"] = goal_date(changes["target_date"])
+        with self._goals_lock:
+            goals = self._load_goals(user_id)
+            goal = next((goal for goal in goals if goal["goal_id"] == goal_id), None)
+            if goal is None:
+                return None
+            self._unindex_goal(goal)
+            goal.update(changes, updated_at=datetime.now().isoformat())
+            self._save_goals(user_id, goals)
+            self._index_goal(goal)
+        return goal
+
+    def delete_goal(self, user_id: str, goal_id: str) -> bool:
+        with self._goals_lock:
+            goals = self._load_goals(user_id)
+            goal = next((goal for goal in goals if goal["goal_id"] == goal_id), None)
+            if goal is None:
+                return False
+            goals.remove(goal)
+            self._save_goals(user_id, goals)
+            self._unindex_goal(goal)
+        return True
+
+    def add_goal_contribution(self, user_id: str, goal_id: str, contribution: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self._goals_lock:
+            goals = self._load_goals(user_id)
+            goal = next((goal for goal in goals if goal["goal_id"] == goal_id), None)
+            if goal is None:
+                return None
+            entry = self._log_contribution(goal, contribution)
+            goal["updated_at"] = datetime.now().isoformat()
+            self._save_goals(user_id, goals)
+        return {"contribution": entry, "goal": goal}
+
+    def _log_contribution(self, goal: Dict[str, Any], contribution: Dict[str, Any]) -> Dict[str, Any]:
+        """Append a contribution to the log, then move the goal's total to match it.
+
+        The caller saves the goals file afterwards; if that save is lost,
+        ``_load_goals`` catches the goal up from the log entry.
+        """
+        entry = contribution_entry(goal, contribution)
+        self.contribution_log.append(goal["user_id"], [entry])
+        goal.update(current_amount=entry["running_total"], contribution_count=entry["sequence"])
+        return entry
+
+    def list_goal_contributions(self, user_id: str, goal_id: str) -> List[Dict[str, Any]]:
+        return [entry for entry in self.contribution_log.read(user_id) if entry.get("goal_id") == goal_id]
+
+    def list_goals_due(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        with self._goals_lock:
+            low = bisect.bisect_left(self._due_index, (start_date,))
+            high = bisect.bisect_right(self._due_index, (end_date, chr(0x10FFFF)))
+            entries = self._due_index[low:high]
+            goals_by_user = {user_id: {goal["goal_id"]: goal for goal in self._load_goals(user_id)}
+                             for user_id in {user_id for _, user_id, _ in entries}}
+        goals = [goals_by_user[user_id][goal_id] for _, user_id, goal_id in entries
+                 if goal_id in goals_by_user[user_id]]
+        return sorted(goals, key=lambda goal: (goal["target_date"], goal.get("priority", 1)))
+
+def create_storage(backend: str = STORAGE_BACKEND, db_dir: str = DB_DIR) -> StorageBackend:
+    """Create the configured storage backend"""
+    if backend == "json":
+        return JsonStorage(db_dir)
+    if backend == "sqlite":
+        from services.sqlite_storage import SqliteStorage
+
+        db_path = os.getenv("SQLITE_PATH", os.path.join(db_dir, "finance.db"))
+        is_new = not os.path.exists(db_path)
+        storage = SqliteStorage(db_path)
+        if is_new:
+            # Carry over existing data from the legacy JSON files
+            storage.import_from(JsonStorage(db_dir))
+        return storage
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
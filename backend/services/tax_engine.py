@@ -0,0 +1,222 @@
+import json
+import time
+import numpy as np
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from services.tax_rules import TaxRuleSet, tax_rules
+from services.tax_utils import calculate_tax, rules_for
+
+class SlabArrays:
+    """A compiled rule set's slab table as NumPy arrays"""
+
+    def __init__(self, rules: TaxRuleSet):
+        self.rules = rules
+        self.lowers = np.asarray(rules.lowers, dtype=np.float64)
+        self.uppers = np.asarray(rules.uppers, dtype=np.float64)
+        self.rates = np.asarray(rules.rates, dtype=np.float64)
+        self.bases = np.asarray(rules.bases, dtype=np.float64)
+
+# Rule sets are immutable, so their arrays are built once
+_slab_arrays: Dict[TaxRuleSet, SlabArrays] = {}
+
+def slab_arrays(regime: str, fy: Optional[str] = None) -> SlabArrays:
+    rules = rules_for(regime, fy)
+    arrays = _slab_arrays.get(rules)
+    if arrays is None:
+        arrays = _slab_arrays[rules] = SlabArrays(rules)
+    return arrays
+
+def tax_array(incomes: np.ndarray, slabs: SlabArrays) -> np.ndarray:
+    """Tax for every income in one pass; matches ``calculate_tax`` element for element"""
+    rules = slabs.rules
+    taxable = np.maximum(0, incomes - rules.standard_deduction)
+
+    # Index of the slab each income falls in (-1 when it is not above the first lower bound)
+    slab = np.searchsorted(slabs.lowers, taxable, side="left") - 1
+    index = np.maximum(slab, 0)
+    tax = slabs.bases[index] + (np.minimum(taxable, slabs.uppers[index]) - slabs.lowers[index]) * slabs.rates[index]
+    tax = np.where(slab >= 0, tax, 0.0)
+
+    # Section 87A rebate, with marginal relief above the limit where it applies
+    within_limit = taxable <= rules.rebate_limit
+    tax = np.where(within_limit, np.maximum(0.0, tax - rules.rebate_max), tax)
+    if rules.marginal_relief:
+        tax = np.where(within_limit, tax, np.minimum(tax, taxable - rules.rebate_limit))
+
+    tax += tax * rules.cess_rate
+    return np.round(tax, 2)
+
+def compare_regimes_batch(incomes: Iterable[float], fy: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """Old and new regime tax for a batch of incomes, as columns"""
+    incomes = np.asarray(incomes, dtype=np.float64)
+    old_tax = tax_array(incomes, slab_arrays("old", fy))
+    new_tax = tax_array(incomes, slab_arrays("new", fy))
+    return {
+        "income": incomes,
+        "old_regime_tax": old_tax,
+        "new_regime_tax": new_tax,
+        "better_regime": np.where(old_tax < new_tax, "old", "new"),
+        "savings": np.abs(old_tax - new_tax)
+    }
+
+def slab_breakdown(income: float, regime: str, fy: Optional[str] = None, deductions: float = 0) -> Dict[str, Any]:
+    """Tax owed in each slab at ``income`` after ``deductions``, then the rebate, cess and rounded total"""
+    rules = rules_for(regime, fy)
+    taxable = max(0, income - deductions - rules.standard_deduction)
+    slabs = []
+    for lower, upper, rate in zip(rules.lowers, rules.uppers, rules.rates):
+        amount = min(taxable, upper) - lower if taxable > lower else 0.0
+        slabs.append({
+            "lower": lower,
+            "upper": None if upper == float('inf') else upper,
+            "rate": rate,
+            "taxable_amount": amount,
+            "tax": amount * rate
+        })
+    slab_tax = rules.slab_tax(taxable)
+    after_rebate = rules.apply_rebate(taxable, slab_tax)
+    return {
+        "regime": rules.regime,
+        "standard_deduction": rules.standard_deduction,
+        "deductions": deductions,
+        "taxable_income": taxable,
+        "slabs": slabs,
+        "slab_tax": slab_tax,
+        "rebate": slab_tax - after_rebate,
+        "cess": after_rebate * rules.cess_rate,
+        "total_tax": calculate_tax(income - deductions, regime, fy)
+    }
+
+def _kinks(rules: TaxRuleSet, deductions: float = 0) -> List[float]:
+    """Gross incomes where a regime's tax function changes slope or jumps"""
+    return [rules.standard_deduction + deductions + kink for kink in rules.kinks()]
+
+def _pre_cess_tax(rules: TaxRuleSet, income: float) -> float:
+    taxable = max(0, income - rules.standard_deduction)
+    return rules.apply_rebate(taxable, rules.slab_tax(taxable))
+
+def break_even_incomes(fy: Optional[str] = None, deductions: float = 0) -> List[Dict[str, Any]]:
+    """Incomes where the cheaper regime switches, solved exactly on the piecewise-linear tax functions.
+
+    Between consecutive kinks of either regime the difference old - new is
+    linear, so each switch is either the root of that line or, where a
+    rebate makes the tax jump, the kink itself. Cess scales both regimes
+    equally and does not move the roots. ``deductions`` (80C, 80D, HRA and
+    the like) only reduce old-regime income, which shifts its kinks right.
+    """
+    old_rules, new_rules = rules_for("old", fy), rules_for("new", fy)
+    kinks = sorted({0.0, *_kinks(old_rules, deductions), *_kinks(new_rules)})
+    difference = lambda income: _pre_cess_tax(old_rules, income - deductions) - _pre_cess_tax(new_rules, income)
+
+    switches = []
+    previous_sign = 0
+    for start, end in zip(kinks, kinks[1:] + [kinks[-1] + 1e7]):
+        # Two interior points pin down the line on this interval, away from any jump at its ends
+        x1, x2 = start + (end - start) / 3, start + 2 * (end - start) / 3
+        d1, d2 = difference(x1), difference(x2)
+        slope = (d2 - d1) / (x2 - x1)
+        d_start, d_end = d1 + slope * (start - x1), d1 + slope * (end - x1)
+
+        for value, at in ((d_start, None), (d_end, "end")):
+            sign = (value > 1e-9) - (value < -1e-9)
+            if sign == 0 or sign == previous_sign:
+                continue
+            if previous_sign != 0:
+                # A root inside the interval, or a jump at its start
+                income = start if at is None or slope == 0 else start - d_start / slope
+                switches.append({
+                    "income": round(income, 2),
+                    "cheaper_below": "new" if previous_sign > 0 else "old",
+                    "cheaper_above": "new" if sign > 0 else "old"
+                })
+            previous_sign = sign
+    return switches
+
+def tax_curve(income: float, min_income: float, max_income: float, points: int,
+              fy: Optional[str] = None, deductions: float = 0) -> Dict[str, Any]:
+    """Tax-vs-income curves for both regimes, the slab breakdown at ``income`` and the break-even incomes"""
+    incomes = np.linspace(min_income, max_income, points)
+    return {
+        "fy": rules_for("new", fy).fy,
+        "income": income,
+        "deductions": deductions,
+        "curve": {
+            "income": incomes.round(2).tolist(),
+            "old_regime_tax": tax_array(np.maximum(0, incomes - deductions), slab_arrays("old", fy)).tolist(),
+            "new_regime_tax": tax_array(incomes, slab_arrays("new", fy)).tolist()
+        },
+        "breakdown": {
+            "old": slab_breakdown(income, "old", fy, deductions),
+            "new": slab_breakdown(income, "new", fy)
+        },
+        "break_even": break_even_incomes(fy, deductions)
+    }
+
+def parse_incomes(body: bytes, ndjson: bool = False) -> np.ndarray:
+    """Incomes from a columnar JSON body (``{"income": [...]}``) or NDJSON rows (``{"income": x}``)"""
+    try:
+        if ndjson:
+            incomes = [json.loads(line)["income"] for line in body.splitlines() if line.strip()]
+        else:
+            incomes = json.loads(body)["income"]
+        incomes = np.asarray(incomes, dtype=np.float64)
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Expected numeric incomes: {str(e)}")
+    if incomes.ndim != 1:
+        raise ValueError("Expected a flat list of incomes")
+    if not np.all(np.isfinite(incomes)):
+        raise ValueError("Incomes must be finite numbers")
+    return incomes
+
+def columns_to_json(columns: Dict[str, np.ndarray]) -> str:
+    return json.dumps({name: values.tolist() for name, values in columns.items()})
+
+def columns_to_ndjson(columns: Dict[str, np.ndarray], chunk_rows: int = 5000) -> Iterator[str]:
+    """One JSON object per row, yielded in chunks of ``chunk_rows`` lines"""
+    names = list(columns)
+    values = [columns[name].tolist() for name in names]
+    for start in range(0, len(values[0]), chunk_rows):
+        rows = zip(*(column[start:start + chunk_rows] for column in values))
+        yield "".join(json.dumps(dict(zip(names, row))) + "\n" for row in rows)
+
+def boundary_incomes(fy: Optional[str] = None) -> np.ndarray:
+    """Gross incomes a paisa either side of, and at, every slab and rebate threshold of both regimes"""
+    points = set()
+    for regime in ("old", "new"):
+        rules = rules_for(regime, fy)
+        for kink in rules.kinks():
+            points.update(round(kink + rules.standard_deduction + offset, 2) for offset in (-0.01, 0, 0.01))
+    return np.array(sorted(point for point in points if point >= 0))
+
+def benchmark(size: int = 100000, seed: int = 7, fy: Optional[str] = None) -> Dict[str, Any]:
+    """Time the batch engine against the scalar path on random incomes.
+
+    The slab and rebate thresholds are checked too, since that is where an
+    off-by-one or rounding difference between the two paths would show.
+    """
+    incomes = np.concatenate([np.random.default_rng(seed).uniform(0, 5000000, size).round(2), boundary_incomes(fy)])
+    income_list = incomes.tolist()
+
+    started_at = time.perf_counter()
+    scalar = [(calculate_tax(income, "old", fy), calculate_tax(income, "new", fy)) for income in income_list]
+    scalar_seconds = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    batch = compare_regimes_batch(incomes, fy)
+    batch_seconds = time.perf_counter() - started_at
+
+    matches = (
+        np.array_equal(batch["old_regime_tax"], np.array([old for old, _ in scalar]))
+        and np.array_equal(batch["new_regime_tax"], np.array([new for _, new in scalar]))
+    )
+    return {
+        "incomes": len(income_list),
+        "scalar_ms": scalar_seconds * 1000,
+        "batch_ms": batch_seconds * 1000,
+        "speedup": scalar_seconds / batch_seconds if batch_seconds else float("inf"),
+        "exact_match": bool(matches)
+    }
+
+if __name__ == "__main__":
+    for fy in tax_rules.years():
+        for size in (1000, 10000, 100000):
+            print(fy, benchmark(size, fy=fy))
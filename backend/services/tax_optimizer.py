@@ -0,0 +1,131 @@
+from typing import Any, Dict, List, Optional
+from services.tax_rules import TaxRuleSet
+from services.tax_utils import calculate_hra_exemption, calculate_tax, rules_for
+
+# Order in which investment capacity is spent. Every rupee in any section cuts
+# taxable income by one rupee, so the order only decides where money is locked
+# up: flexible 80C first, health cover next, NPS (locked until retirement) last.
+DEDUCTION_ORDER = ("80C", "80D", "80CCD(1B)")
+
+def hra_exemption(basic_salary: float, hra_received: float, rent_paid: float, city_tier: int) -> float:
+    """Annual HRA exemption from actual salary components; nothing is exempt without rent or HRA"""
+    if hra_received <= 0 or rent_paid <= 0:
+        return 0.0
+    return calculate_hra_exemption(hra_received, city_tier, rent_paid, basic_salary)["exemption_amount"]
+
+def section_limits(rules: TaxRuleSet, senior_citizen: bool = False, cover_parents: bool = False,
+                   parents_senior: bool = False) -> Dict[str, float]:
+    """Deduction caps per section under a regime, with 80D combining self and parents' cover"""
+    health = rules.deduction_limit("80D_self_senior" if senior_citizen else "80D_self")
+    if cover_parents:
+        health += rules.deduction_limit("80D_parents_senior" if parents_senior else "80D_parents")
+    return {
+        "80C": rules.deduction_limit("80C"),
+        "80D": health,
+        "80CCD(1B)": rules.deduction_limit("80CCD(1B)")
+    }
+
+def _tax(rules: TaxRuleSet, taxable_income: float) -> float:
+    """Tax including cess, unrounded, on a taxable income"""
+    taxable_income = max(0.0, taxable_income)
+    return rules.apply_rebate(taxable_income, rules.slab_tax(taxable_income)) * (1 + rules.cess_rate)
+
+def _benefit_curve(rules: TaxRuleSet, taxable_income: float, points: List[float]) -> List[Dict[str, float]]:
+    """Tax saved per extra rupee of deduction on each linear piece between ``points``"""
+    curve = []
+    for start, end in zip(points, points[1:]):
+        # The tax is right-continuous in the deduction, so the slope is read inside the piece
+        middle = (start + end) / 2
+        slope = (_tax(rules, taxable_income - start) - _tax(rules, taxable_income - middle)) / (middle - start)
+        curve.append({"from": start, "to": end, "benefit_per_rupee": round(slope, 4)})
+    return curve
+
+def optimize_regime(regime: str, gross_income: float, hra: float, investment_capacity: float,
+                    existing_80c: float, limits: Dict[str, float], fy: Optional[str] = None) -> Dict[str, Any]:
+    """Smallest investment that reaches the lowest tax under one regime.
+
+    The tax is piecewise linear and non-increasing in the extra deduction, so
+    the minimum over [0, max deduction] is reached at the cap or at one of the
+    regime's kinks (slab bounds, rebate limit, marginal relief crossover);
+    only those few points are evaluated. Where the tax goes flat (inside the
+    rebate, or a zero slab) the plan stops investing for tax purposes.
+    """
+    rules = rules_for(regime, fy)
+    hra = hra if rules.hra_exemption else 0.0
+
+    # Existing 80C commitments (EPF, premiums, tuition) use the cap without using capacity
+    committed = min(existing_80c, limits["80C"])
+    headroom = {section: limits[section] - (committed if section == "80C" else 0) for section in DEDUCTION_ORDER}
+    base_taxable = max(0.0, gross_income - rules.standard_deduction - hra - committed)
+    max_deduction = min(max(0.0, investment_capacity), sum(headroom.values()))
+
+    points = sorted({0.0, max_deduction} | {
+        base_taxable - kink for kink in rules.kinks() if 0 < base_taxable - kink < max_deduction
+    })
+    taxes = [_tax(rules, base_taxable - point) for point in points]
+    lowest = min(taxes)
+    deduction = next(point for point, tax in zip(points, taxes) if tax <= lowest + 1e-6)
+
+    # Spread the chosen amount over the sections in order, tracking each section's saving
+    investments, section_benefit = {}, {}
+    remaining, invested = deduction, 0.0
+    for section in DEDUCTION_ORDER:
+        amount = min(remaining, headroom[section])
+        investments[section] = amount
+        saved = _tax(rules, base_taxable - invested) - _tax(rules, base_taxable - invested - amount)
+        section_benefit[section] = round(saved / amount, 4) if amount else 0.0
+        invested += amount
+        remaining -= amount
+
+    taxable_income = max(0.0, base_taxable - deduction)
+    tax_without_investment = calculate_tax(gross_income - hra - committed, regime, fy)
+    tax = calculate_tax(gross_income - hra - committed - deduction, regime, fy)
+    return {
+        "regime": rules.regime,
+        "tax": tax,
+        "taxable_income": taxable_income,
+        "deductions": {
+            "standard": rules.standard_deduction,
+            "hra": hra,
+            "80C": committed + investments["80C"],
+            "80D": investments["80D"],
+            "80CCD(1B)": investments["80CCD(1B)"]
+        },
+        "investments": investments,
+        "total_investment": deduction,
+        "unused_capacity": max(0.0, investment_capacity - deduction),
+        "tax_without_investment": tax_without_investment,
+        "tax_saved": round(tax_without_investment - tax, 2),
+        "average_benefit_per_rupee": round((tax_without_investment - tax) / deduction, 4) if deduction else 0.0,
+        "benefit_per_rupee_by_section": section_benefit,
+        # Saving from the last rupee invested, and from one more rupee beyond the plan
+        "marginal_benefit_per_rupee": round(_tax(rules, taxable_income + 1) - _tax(rules, taxable_income), 4) if deduction else 0.0,
+        "next_rupee_benefit": round(_tax(rules, taxable_income) - _tax(rules, taxable_income - 1), 4) if deduction < max_deduction else 0.0,
+        "benefit_curve": _benefit_curve(rules, base_taxable, points)
+    }
+
+def optimize_tax(basic_salary: float, hra_received: float = 0, other_income: float = 0, rent_paid: float = 0,
+                 city_tier: int = 1, investment_capacity: float = 0, existing_80c: float = 0,
+                 senior_citizen: bool = False, cover_parents: bool = False, parents_senior: bool = False,
+                 fy: Optional[str] = None) -> Dict[str, Any]:
+    """Minimum-tax regime and deduction plan from annual salary components, rent and investment capacity"""
+    gross_income = basic_salary + hra_received + other_income
+    hra = hra_exemption(basic_salary, hra_received, rent_paid, city_tier)
+
+    plans = {}
+    for regime in ("old", "new"):
+        limits = section_limits(rules_for(regime, fy), senior_citizen, cover_parents, parents_senior)
+        plans[regime] = optimize_regime(regime, gross_income, hra, investment_capacity, existing_80c, limits, fy)
+
+    # Ties go to the new regime, which needs no locked-in investments
+    best = "old" if plans["old"]["tax"] < plans["new"]["tax"] else "new"
+    other = "new" if best == "old" else "old"
+    return {
+        "fy": rules_for("new", fy).fy,
+        "gross_income": gross_income,
+        "hra_exemption": hra,
+        "recommended_regime": best,
+        "tax": plans[best]["tax"],
+        "savings_vs_other_regime": round(plans[other]["tax"] - plans[best]["tax"], 2),
+        "plans": plans
+    }
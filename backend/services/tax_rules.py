@@ -0,0 +1,129 @@
+import os
+import json
+import glob
+from bisect import bisect_left
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Directory of per-year rule files (fyYYYY-YY.json) and the year used when none is given
+TAX_RULES_DIR = os.getenv("TAX_RULES_DIR", os.path.join(os.path.dirname(__file__), "data", "tax_rules"))
+TAX_DEFAULT_FY = os.getenv("TAX_DEFAULT_FY", "2023-24")
+
+REGIMES = ("old", "new")
+
+class TaxRuleSet(NamedTuple):
+    """Compiled, immutable tax rules for one financial year and regime.
+
+    ``bases[i]`` is the tax owed on every slab below slab ``i``, so the tax
+    on a taxable income is one binary search over ``lowers`` plus one
+    multiply-add, before the rebate and cess.
+    """
+    fy: str
+    regime: str
+    standard_deduction: float
+    cess_rate: float
+    rebate_limit: float
+    rebate_max: float
+    marginal_relief: bool
+    lowers: Tuple[float, ...]
+    uppers: Tuple[float, ...]
+    rates: Tuple[float, ...]
+    bases: Tuple[float, ...]
+    hra_exemption: bool = False
+    deduction_limits: Tuple[Tuple[str, float], ...] = ()
+
+    def slab_tax(self, taxable_income: float) -> float:
+        """Slab tax before rebate and cess"""
+        slab = bisect_left(self.lowers, taxable_income) - 1
+        if slab < 0:
+            return 0.0
+        return self.bases[slab] + (min(taxable_income, self.uppers[slab]) - self.lowers[slab]) * self.rates[slab]
+
+    def apply_rebate(self, taxable_income: float, tax: float) -> float:
+        """Section 87A rebate, with marginal relief just above the limit where it applies"""
+        if taxable_income <= self.rebate_limit:
+            return max(0.0, tax - self.rebate_max)
+        if self.marginal_relief:
+            return min(tax, taxable_income - self.rebate_limit)
+        return tax
+
+    def deduction_limit(self, section: str) -> float:
+        """Cap on a Chapter VI-A deduction (e.g. "80C"); 0 where the regime does not allow it"""
+        return dict(self.deduction_limits).get(section, 0)
+
+    def kinks(self) -> Tuple[float, ...]:
+        """Taxable incomes where the tax after rebate changes slope or jumps"""
+        points = set(self.lowers) | {upper for upper in self.uppers if upper != float('inf')}
+        if self.rebate_limit > 0:
+            points.add(self.rebate_limit)
+        if self.marginal_relief:
+            # Where a slab line meets the relief line (taxable income minus the limit)
+            for lower, upper, rate, base in zip(self.lowers, self.uppers, self.rates, self.bases):
+                if rate < 1:
+                    taxable = (base - lower * rate + self.rebate_limit) / (1 - rate)
+                    if max(lower, self.rebate_limit) < taxable <= upper:
+                        points.add(taxable)
+        return tuple(sorted(points))
+
+def compile_rules(fy: str, regime: str, spec: Dict) -> TaxRuleSet:
+    """Precompute slab bounds, rates and cumulative base tax from a rule file entry"""
+    lowers, uppers, rates, bases = [], [], [], []
+    base = 0.0
+    for lower_limit, upper_limit, rate in spec["slabs"]:
+        upper_limit = float('inf') if upper_limit is None else upper_limit
+        lowers.append(lower_limit)
+        uppers.append(upper_limit)
+        rates.append(rate)
+        bases.append(base)
+        if upper_limit != float('inf'):
+            base += (upper_limit - lower_limit) * rate
+
+    rebate = spec.get("rebate") or {}
+    return TaxRuleSet(
+        fy=fy,
+        regime=regime,
+        standard_deduction=spec["standard_deduction"],
+        cess_rate=spec.get("cess_rate", 0.04),
+        rebate_limit=rebate.get("income_limit", 0),
+        rebate_max=rebate.get("max_rebate", 0),
+        marginal_relief=rebate.get("marginal_relief", False),
+        lowers=tuple(lowers),
+        uppers=tuple(uppers),
+        rates=tuple(rates),
+        bases=tuple(bases),
+        hra_exemption=spec.get("hra_exemption", False),
+        deduction_limits=tuple(sorted(spec.get("deduction_limits", {}).items()))
+    )
+
+class TaxRuleRegistry:
+    """Compiled rule sets keyed by (financial year, regime)"""
+
+    def __init__(self, rules: Dict[Tuple[str, str], TaxRuleSet], default_fy: str = TAX_DEFAULT_FY):
+        self._rules = rules
+        self.default_fy = default_fy
+
+    @classmethod
+    def load(cls, rules_dir: str = TAX_RULES_DIR, default_fy: str = TAX_DEFAULT_FY) -> "TaxRuleRegistry":
+        rules = {}
+        for path in sorted(glob.glob(os.path.join(rules_dir, "fy*.json"))):
+            with open(path, "r") as f:
+                data = json.load(f)
+            for regime, spec in data["regimes"].items():
+                spec = dict(spec, cess_rate=spec.get("cess_rate", data.get("cess_rate", 0.04)))
+                rules[(data["fy"], regime)] = compile_rules(data["fy"], regime, spec)
+        return cls(rules, default_fy)
+
+    def years(self) -> List[str]:
+        return sorted({fy for fy, _ in self._rules})
+
+    def get(self, regime: str, fy: Optional[str] = None) -> TaxRuleSet:
+        """Rules for a regime in ``fy`` (default year if omitted); raises ValueError if unknown"""
+        key = (fy or self.default_fy, regime.lower())
+        if key not in self._rules:
+            raise ValueError(f"No tax rules for FY {key[0]} ({key[1]} regime); available years: {', '.join(self.years())}")
+        return self._rules[key]
+
+# Loaded once at startup
+tax_rules = TaxRuleRegistry.load()
+
+def get_rules(regime: str, fy: Optional[str] = None) -> TaxRuleSet:
+    return tax_rules.get(regime, fy)
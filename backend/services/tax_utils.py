@@ -1,50 +1,31 @@
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Optional
+from services.tax_rules import TaxRuleSet, get_rules
 
-# Tax slabs for old regime (FY 2023-24)
-OLD_REGIME_SLABS = [
-    (0, 250000, 0),           # 0% for income up to 2.5L
-    (250001, 500000, 0.05),   # 5% for income between 2.5L and 5L
-    (500001, 1000000, 0.20),  # 20% for income between 5L and 10L
-    (1000001, float('inf'), 0.30)  # 30% for income above 10L
-]
+def rules_for(regime: str, fy: Optional[str] = None) -> TaxRuleSet:
+    """Compiled rules for a regime; anything other than "new" means the old regime"""
+    return get_rules("new" if regime.lower() == "new" else "old", fy)
 
-# Tax slabs for new regime (FY 2023-24)
-NEW_REGIME_SLABS = [
-    (0, 300000, 0),           # 0% for income up to 3L
-    (300001, 600000, 0.05),   # 5% for income between 3L and 6L
-    (600001, 900000, 0.10),   # 10% for income between 6L and 9L
-    (900001, 1200000, 0.15),  # 15% for income between 9L and 12L
-    (1200001, 1500000, 0.20), # 20% for income between 12L and 15L
-    (1500001, float('inf'), 0.30)  # 30% for income above 15L
-]
-
-# Standard deduction amount
-STANDARD_DEDUCTION = 50000
-
-def calculate_tax(income: float, regime: str = "new") -> float:
-    """Calculate income tax based on income and tax regime"""
-    # Apply standard deduction
-    taxable_income = max(0, income - STANDARD_DEDUCTION)
+def calculate_tax(income: float, regime: str = "new", fy: Optional[str] = None) -> float:
+    """Calculate income tax based on income, tax regime and financial year"""
+    rules = rules_for(regime, fy)
     
-    # Select tax slabs based on regime
-    slabs = NEW_REGIME_SLABS if regime.lower() == "new" else OLD_REGIME_SLABS
+    # Apply standard deduction
+    taxable_income = max(0, income - rules.standard_deduction)
     
-    # Calculate tax
-    tax = 0
-    for lower_limit, upper_limit, rate in slabs:
-        if taxable_income > lower_limit:
-            taxable_in_bracket = min(taxable_income, upper_limit) - lower_limit
-            tax += taxable_in_bracket * rate
+    # Slab tax (one binary search plus one multiply-add), then the 87A rebate;
+    # the batch engine in tax_engine.py evaluates the same formula over arrays
+    tax = rules.apply_rebate(taxable_income, rules.slab_tax(taxable_income))
     
     # Add cess (4% of tax)
-    tax += tax * 0.04
+    tax += tax * rules.cess_rate
     
-    return round(tax, 2)
+    # Round to paise the same way numpy does, so scalar and batch results agree exactly
+    return round(tax * 100) / 100
 
-def compare_tax_regimes(income: float) -> Dict[str, Any]:
-    """Compare tax under old and new regimes"""
-    old_regime_tax = calculate_tax(income, "old")
-    new_regime_tax = calculate_tax(income, "new")
+def compare_tax_regimes(income: float, fy: Optional[str] = None, deductions: float = 0) -> Dict[str, Any]:
+    """Compare tax under old and new regimes; ``deductions`` (80C, 80D, ...) only apply to the old regime"""
+    old_regime_tax = calculate_tax(income - deductions, "old", fy)
+    new_regime_tax = calculate_tax(income, "new", fy)
     
     difference = abs(old_regime_tax - new_regime_tax)
     better_regime = "old" if old_regime_tax < new_regime_tax else "new"
@@ -0,0 +1,154 @@
+import os
+import time
+import asyncio
+from typing import Any, Callable, Dict, List
+from services.async_io import run_io
+
+# Flush whenever this many milliseconds pass or this many records are buffered
+HISTORY_FLUSH_INTERVAL_MS = int(os.getenv("HISTORY_FLUSH_INTERVAL_MS", 50))
+HISTORY_FLUSH_MAX_RECORDS = int(os.getenv("HISTORY_FLUSH_MAX_RECORDS", 256))
+# How long flushes may keep failing before the buffered turns are given up on
+HISTORY_FLUSH_GIVE_UP_SECONDS = float(os.getenv("HISTORY_FLUSH_GIVE_UP_SECONDS", 10))
+
+class WriteBehindBuffer:
+    """Group-commit buffer for chat history appends.
+
+    Appends from many requests are collected in memory and handed to
+    ``flush_fn`` as one ``{user_id: turns}`` batch, so a single write (and a
+    single fsync) covers every turn that arrived in the flush window. Each
+    append returns a future that resolves once its batch is durable.
+
+    ``flush_fn`` must write a batch all or nothing. A failed batch stays
+    buffered and is retried, with its futures still pending; only when
+    flushes have failed for ``give_up_seconds`` (or at shutdown) are the
+    turns dropped and their futures failed, so a failure is never reported
+    for a turn that is later stored.
+    """
+
+    def __init__(self, flush_fn: Callable[[Dict[str, List[Dict[str, Any]]]], None],
+                 interval_ms: int = HISTORY_FLUSH_INTERVAL_MS, max_records: int = HISTORY_FLUSH_MAX_RECORDS,
+                 give_up_seconds: float = HISTORY_FLUSH_GIVE_UP_SECONDS):
+        self.flush_fn = flush_fn
+        self.interval = interval_ms / 1000
+        self.max_records = max_records
+        self.give_up_seconds = give_up_seconds
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._waiters: List[asyncio.Future] = []
+        self._count = 0
+        self._inflight = set()
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self._failing_since = None
+        self._last_error = None
+        self.batches = 0
+        self.records = 0
+        self.largest_batch = 0
+        self.errors = 0
+        self.dropped = 0
+
+    def start(self) -> None:
+        """Start the background flusher on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher and persist everything still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self._pending:
+            self._drop_pending("at shutdown")
+
+    def append(self, user_id: str, turns: List[Dict[str, Any]]) -> asyncio.Future:
+        """Buffer turns for a user; the returned future resolves when they are on disk"""
+        self.start()
+        self._pending.setdefault(user_id, []).extend(turns)
+        self._count += len(turns)
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        if self._count >= self.max_records:
+            self._wakeup.set()
+        return future
+
+    async def read(self, user_id: str, read_fn: Callable[[str], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Read persisted turns plus any still buffered for the user"""
+        if user_id not in self._pending and user_id not in self._inflight:
+            return await run_io(read_fn, user_id)
+
+        # Hold off flushes so no turn is seen twice or missed mid-write
+        async with self._flush_lock:
+            history = await run_io(read_fn, user_id)
+            return history + list(self._pending.get(user_id, []))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write the current batch and resolve its durability futures"""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+
+            batch, waiters, count = self._pending, self._waiters, self._count
+            self._pending, self._waiters, self._count = {}, [], 0
+            self._inflight = set(batch)
+
+            try:
+                await run_io(self.flush_fn, batch)
+            except Exception as e:
+                # Nothing of the batch was written: put it back in front of newer turns and retry
+                self.errors += 1
+                self._last_error = e
+                print(f"Error flushing chat history: {str(e)}")
+                for user_id, turns in self._pending.items():
+                    batch.setdefault(user_id, []).extend(turns)
+                self._pending, self._waiters, self._count = batch, waiters + self._waiters, count + self._count
+                self._failing_since = self._failing_since or time.monotonic()
+                if time.monotonic() - self._failing_since >= self.give_up_seconds:
+                    self._drop_pending(f"after {self.give_up_seconds:g}s of failures")
+                return
+            finally:
+                self._inflight = set()
+
+            self._failing_since = None
+            self.batches += 1
+            self.records += count
+            self.largest_batch = max(self.largest_batch, count)
+            for future in waiters:
+                if not future.done():
+                    future.set_result(None)
+
+    def _drop_pending(self, reason: str) -> None:
+        """Give up on every buffered turn and fail the futures waiting on them"""
+        print(f"Error flushing chat history {reason}: {self._count} turns for "
+              f"{len(self._pending)} users were not saved")
+        error = self._last_error or RuntimeError("Chat history was not saved")
+        for future in self._waiters:
+            if not future.done():
+                future.set_exception(error)
+        self.dropped += self._count
+        self._pending, self._waiters, self._count = {}, [], 0
+        self._failing_since = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "buffered_records": self._count,
+            "batches": self.batches,
+            "records": self.records,
+            "avg_batch": self.records / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "errors": self.errors,
+            "dropped": self.dropped
+        }
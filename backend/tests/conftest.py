@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The backend is imported as top-level packages (services, routes), as when run from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,76 @@
+import time
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from services.gemini_handler import GeminiHandler
+from services.llm_scheduler import LLMScheduler
+from services.response_cache import ResponseCache
+
+class SlowStream:
+    """Stand-in chat session that streams ``total`` chunks, one every few milliseconds"""
+
+    def __init__(self, total=50, fail_after=None):
+        self.total = total
+        self.fail_after = fail_after
+        self.sent = 0
+        self.closed = threading.Event()
+
+    def send_message(self, message, stream=False):
+        try:
+            for i in range(self.total):
+                if self.fail_after is not None and i == self.fail_after:
+                    raise RuntimeError("upstream failed")
+                time.sleep(0.01)
+                self.sent += 1
+                yield SimpleNamespace(text=f"chunk {i} ")
+        finally:
+            self.closed.set()
+
+@pytest.fixture
+def handler(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    scheduler = LLMScheduler("gemini", max_in_flight=1, rate_per_minute=0, burst=1)
+    handler = GeminiHandler(ResponseCache(max_entries=0), scheduler=scheduler)
+    yield handler
+    handler.executor.shutdown()
+
+def _use_session(handler, monkeypatch, session):
+    pooled = SimpleNamespace(session=session, record_exchange=lambda *args: None)
+    monkeypatch.setattr(handler, "_checkout_session", lambda *args: pooled)
+
+def test_closing_the_stream_early_stops_the_upstream_call(handler, monkeypatch):
+    session = SlowStream()
+    _use_session(handler, monkeypatch, session)
+    unhandled = []
+
+    async def main():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unhandled.append(context))
+        stream = handler.stream_response("hello", [], None, user_id="alice")
+        assert await stream.__anext__() == "chunk 0 "
+        # The client disconnects after the first chunk
+        await stream.aclose()
+        await asyncio.sleep(0.1)
+
+    asyncio.run(main())
+    assert session.closed.is_set()
+    assert session.sent < session.total
+    assert handler.executor.scheduler.in_flight == 0
+    assert unhandled == []
+
+def test_upstream_error_after_disconnect_is_retrieved(handler, monkeypatch, capsys):
+    _use_session(handler, monkeypatch, SlowStream(fail_after=2))
+    unhandled = []
+
+    async def main():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unhandled.append(context))
+        stream = handler.stream_response("hello", [], None, user_id="alice")
+        await stream.__anext__()
+        await asyncio.sleep(0.05)
+        await stream.aclose()
+
+    asyncio.run(main())
+    assert unhandled == []
+    assert "upstream failed" in capsys.readouterr().out
@@ -0,0 +1,41 @@
+import pytest
+
+from services.storage import JsonStorage, StorageBackend
+
+@pytest.fixture(params=["json", "sqlite"])
+def storage(request, tmp_path):
+    if request.param == "json":
+        backend = JsonStorage(str(tmp_path))
+    else:
+        from services.sqlite_storage import SqliteStorage
+        backend = SqliteStorage(str(tmp_path / "finance.db"))
+    yield backend
+    backend.close()
+
+def _assert_matches_log(storage: StorageBackend, goal_id: str) -> None:
+    goal = storage.get_goal("alice", goal_id)
+    log = storage.list_goal_contributions("alice", goal_id)
+    assert goal["current_amount"] == sum(entry["amount"] for entry in log) == log[-1]["running_total"]
+    assert goal["contribution_count"] == len(log) == log[-1]["sequence"]
+
+def test_saved_amount_only_moves_through_the_log(storage):
+    goal = storage.add_goal({"user_id": "alice", "goal_name": "car", "target_amount": 5000, "current_amount": 1200})
+    storage.add_goal_contribution("alice", goal["goal_id"], {"amount": 300})
+    storage.update_goal("alice", goal["goal_id"], {"current_amount": 99999, "priority": 2})
+
+    assert storage.get_goal("alice", goal["goal_id"])["priority"] == 2
+    _assert_matches_log(storage, goal["goal_id"])
+
+def test_json_goal_catches_up_with_a_contribution_logged_before_a_crash(tmp_path):
+    storage = JsonStorage(str(tmp_path))
+    goal = storage.add_goal({"user_id": "alice", "goal_name": "car", "target_amount": 5000})
+    storage.add_goal_contribution("alice", goal["goal_id"], {"amount": 300})
+    # Simulate a crash after the log append but before the goals file was saved
+    save_goals = storage._save_goals
+    storage._save_goals = lambda user_id, goals: None
+    storage.add_goal_contribution("alice", goal["goal_id"], {"amount": 200})
+    storage._save_goals = save_goals
+
+    reopened = JsonStorage(str(tmp_path))
+    _assert_matches_log(reopened, goal["goal_id"])
+    assert reopened.get_goal("alice", goal["goal_id"])["current_amount"] == 500
@@ -0,0 +1,131 @@
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from services import granite_handler
+from services.granite_handler import GraniteHandler
+from services.response_cache import ResponseCache
+
+class StubServer:
+    """Local inference endpoint that plays back scripted responses and records each request's connection"""
+
+    def __init__(self):
+        self.script = []
+        self.connections = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 so the client may keep the connection alive between requests
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stub.connections.append(self.client_address)
+                status, headers, body, delay = stub.script.pop(0) if stub.script else (200, {}, [{"generated_text": "ok"}], 0)
+                time.sleep(delay)
+                data = json.dumps(body).encode("utf-8")
+                try:
+                    self.send_response(status)
+                    for name, value in {"Content-Type": "application/json", **headers}.items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up on a slow response
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/model"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def respond(self, status, body=None, headers=None, delay=0.0):
+        self.script.append((status, headers or {}, body if body is not None else {"error": "stub"}, delay))
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    server.thread.start()
+    yield server
+    server.server.shutdown()
+    server.server.server_close()
+
+@pytest.fixture
+def handler(stub, monkeypatch):
+    monkeypatch.setenv("HF_API_KEY", "test-key")
+    # No client-side rate limit, and no real waiting between attempts
+    monkeypatch.setenv("GRANITE_RATE_PER_MINUTE", "0")
+    monkeypatch.setattr(granite_handler, "GRANITE_MAX_RETRIES", 2)
+    monkeypatch.setattr(granite_handler, "GRANITE_BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(granite_handler, "GRANITE_READ_TIMEOUT", 0.5)
+    client = GraniteHandler(response_cache=ResponseCache(max_entries=0))
+    client.api_url = stub.url
+    return client
+
+def _run(handler, *payloads):
+    """POST each payload in turn on one event loop, then close the client"""
+    async def main():
+        try:
+            return [await handler._post(payload) for payload in payloads]
+        finally:
+            await handler.shutdown()
+    return asyncio.run(main())
+
+@pytest.mark.parametrize("status", [502, 503, 504, 429])
+def test_retries_transient_status_then_succeeds(stub, handler, status):
+    stub.respond(status, headers={"Retry-After": "0"})
+    stub.respond(200, [{"generated_text": "summary"}])
+
+    assert _run(handler, {"inputs": "x"}) == [[{"generated_text": "summary"}]]
+    assert len(stub.connections) == 2
+    assert handler.retries == 1
+
+def test_gives_up_after_max_retries(stub, handler):
+    for _ in range(3):
+        stub.respond(503, headers={"Retry-After": "0"})
+
+    with pytest.raises(httpx.HTTPStatusError) as error:
+        _run(handler, {"inputs": "x"})
+    assert error.value.response.status_code == 503
+    assert len(stub.connections) == granite_handler.GRANITE_MAX_RETRIES + 1
+
+def test_does_not_retry_client_errors_or_500(stub, handler):
+    stub.respond(500)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        _run(handler, {"inputs": "x"})
+    assert len(stub.connections) == 1
+    assert handler.retries == 0
+
+def test_read_timeout_is_retried(stub, handler):
+    stub.respond(200, [{"generated_text": "late"}], delay=1.0)
+    stub.respond(200, [{"generated_text": "on time"}])
+
+    started_at = time.monotonic()
+    assert _run(handler, {"inputs": "x"}) == [[{"generated_text": "on time"}]]
+    # The slow attempt was abandoned at the read timeout, not waited out
+    assert time.monotonic() - started_at < 1.0
+    assert handler.retries == 1
+
+def test_read_timeout_raises_once_retries_are_spent(stub, handler):
+    for _ in range(3):
+        stub.respond(200, [{"generated_text": "late"}], delay=1.0)
+
+    with pytest.raises(httpx.ReadTimeout):
+        _run(handler, {"inputs": "x"})
+    assert len(stub.connections) == 3
+
+def test_sequential_calls_reuse_one_connection(stub, handler):
+    results = _run(handler, *({"inputs": str(i)} for i in range(5)))
+
+    assert results == [[{"generated_text": "ok"}]] * 5
+    # Every request arrived from the same client socket
+    assert len(set(stub.connections)) == 1
@@ -0,0 +1,46 @@
+import asyncio
+import threading
+
+from services.llm_executor import LLMExecutor
+from services.llm_scheduler import LLMScheduler, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, PRIORITY_SUMMARY
+
+def test_interactive_call_overtakes_queued_summary_and_background_calls():
+    scheduler = LLMScheduler("gemini", max_in_flight=1, rate_per_minute=0, burst=1)
+    executor = LLMExecutor("gemini", workers=1, scheduler=scheduler)
+    started = []
+    release_first = threading.Event()
+
+    def call(name):
+        started.append(name)
+        if name == "first":
+            release_first.wait(timeout=5)
+        return name
+
+    async def main():
+        first = asyncio.create_task(executor.run(call, "first", priority=PRIORITY_BACKGROUND, user_id="batch"))
+        await asyncio.sleep(0.05)
+        # Queued while the only slot is busy, lowest class first
+        queued = [
+            asyncio.create_task(executor.run(call, "background", priority=PRIORITY_BACKGROUND, user_id="batch")),
+            asyncio.create_task(executor.run(call, "summary", priority=PRIORITY_SUMMARY, user_id="bob")),
+            asyncio.create_task(executor.run(call, "interactive", priority=PRIORITY_INTERACTIVE, user_id="alice"))
+        ]
+        await asyncio.sleep(0.05)
+        assert scheduler.stats()["queue_depth"] == {"interactive": 1, "summary": 1, "background": 1}
+        release_first.set()
+        await asyncio.gather(first, *queued)
+
+    try:
+        asyncio.run(main())
+    finally:
+        executor.shutdown()
+    assert started == ["first", "interactive", "summary", "background"]
+    assert scheduler.stats()["in_flight"] == 0
+
+def test_handlers_queue_on_the_scheduler_they_are_given(monkeypatch):
+    from services.granite_handler import GraniteHandler
+
+    monkeypatch.setenv("HF_API_KEY", "test-key")
+    scheduler = LLMScheduler("granite", max_in_flight=2, rate_per_minute=0, burst=1)
+    assert GraniteHandler(scheduler=scheduler).scheduler is scheduler
+    assert LLMExecutor("gemini", scheduler=scheduler).scheduler is scheduler
@@ -0,0 +1,35 @@
+import os
+import time
+import asyncio
+
+from services.response_cache import ResponseCache
+
+def _disk_keys(directory):
+    return sorted(name[:-len(".json")] for _, _, names in os.walk(directory) for name in names)
+
+def test_expired_disk_entry_is_deleted_when_read(tmp_path):
+    cache = ResponseCache(max_entries=0, ttl=0.05, persist_dir=str(tmp_path))
+
+    async def main():
+        await cache.put("aa01", "stale")
+        time.sleep(0.1)
+        return await cache.get("aa01")
+
+    assert asyncio.run(main()) is None
+    assert _disk_keys(tmp_path) == []
+    assert cache.stats()["expirations"] == 1
+
+def test_disk_is_pruned_least_recently_used_first(tmp_path):
+    cache = ResponseCache(max_entries=0, persist_dir=str(tmp_path), max_disk_entries=10)
+
+    async def main():
+        for i in range(10):
+            await cache.put(f"{i:02d}key", str(i))
+            time.sleep(0.01)
+        # Reading the oldest entry makes it the most recently used
+        assert await cache.get("00key") == "0"
+        await cache.put("10key", "10")
+
+    asyncio.run(main())
+    assert _disk_keys(tmp_path) == ["00key", "03key", "04key", "05key", "06key", "07key", "08key", "09key", "10key"]
+    assert cache.stats()["disk_evictions"] == 2
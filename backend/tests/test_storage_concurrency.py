@@ -0,0 +1,78 @@
+import threading
+from collections import Counter
+
+import pytest
+
+from services.storage import JsonStorage
+from services.sqlite_storage import SqliteStorage
+
+THREADS = 16
+APPENDS_PER_THREAD = 40
+USERS = ("alice", "bob", "carol@example.com")  # the last one is stored under a hashed directory
+
+@pytest.fixture(params=["json", "sqlite"])
+def storage(request, tmp_path):
+    if request.param == "json":
+        backend = JsonStorage(str(tmp_path / "db"))
+    else:
+        backend = SqliteStorage(str(tmp_path / "finance.db"))
+    yield backend
+    backend.close()
+
+def _run_threads(target):
+    start = threading.Barrier(THREADS)
+    errors = []
+
+    def worker(number):
+        start.wait()
+        try:
+            target(number)
+        except Exception as e:  # surfaced by the assertion below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+def test_parallel_appends_keep_every_turn_exactly_once(storage):
+    def append(number):
+        for i in range(APPENDS_PER_THREAD):
+            user_id = USERS[(number + i) % len(USERS)]
+            storage.append_chat_history(user_id, [
+                {"role": "user", "content": f"q {number}-{i}"},
+                {"role": "assistant", "content": f"a {number}-{i}"}
+            ])
+
+    _run_threads(append)
+
+    for user_id in USERS:
+        history = storage.get_chat_history(user_id)
+        expected = Counter()
+        for number in range(THREADS):
+            for i in range(APPENDS_PER_THREAD):
+                if USERS[(number + i) % len(USERS)] == user_id:
+                    expected[f"q {number}-{i}"] += 1
+                    expected[f"a {number}-{i}"] += 1
+        assert Counter(turn["content"] for turn in history) == expected
+
+        # Each append's two turns stay adjacent and in order
+        for question, answer in zip(history[::2], history[1::2]):
+            assert question["role"] == "user" and answer["role"] == "assistant"
+            assert question["content"][2:] == answer["content"][2:]
+
+def test_parallel_batch_appends_keep_every_turn_exactly_once(storage):
+    def append(number):
+        for i in range(APPENDS_PER_THREAD):
+            storage.append_chat_history_batch({
+                user_id: [{"role": "user", "content": f"{user_id} {number}-{i}"}] for user_id in USERS
+            })
+
+    _run_threads(append)
+
+    for user_id in USERS:
+        contents = [turn["content"] for turn in storage.get_chat_history(user_id)]
+        assert len(contents) == THREADS * APPENDS_PER_THREAD
+        assert set(contents) == {f"{user_id} {number}-{i}" for number in range(THREADS) for i in range(APPENDS_PER_THREAD)}
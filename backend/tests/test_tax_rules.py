@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from services.tax_engine import benchmark, boundary_incomes, compare_regimes_batch, tax_curve
+from services.tax_rules import get_rules
+from services.tax_utils import calculate_tax, compare_tax_regimes
+
+@pytest.mark.parametrize("fy, regime, income, slab_tax, total", [
+    # 12L gross, 11.5L taxable under the new regime: 15,000 + 30,000 + 37,500
+    ("2023-24", "new", 1200000, 82500, 85800),
+    ("2023-24", "old", 1200000, 157500, 163800),
+    ("2024-25", "new", 1200000, 68750, 71500),
+    # Exactly at the top of a slab: 5% of 2.5L, then the rebate does not apply
+    ("2023-24", "old", 550000, 12500, 0),
+    ("2023-24", "old", 1050000, 112500, 117000)
+])
+def test_known_values(fy, regime, income, slab_tax, total):
+    rules = get_rules(regime, fy)
+    assert rules.slab_tax(income - rules.standard_deduction) == slab_tax
+    assert calculate_tax(income, regime, fy) == total
+
+@pytest.mark.parametrize("fy", ["2023-24", "2024-25"])
+def test_slabs_are_contiguous(fy):
+    for regime in ("old", "new"):
+        rules = get_rules(regime, fy)
+        assert rules.lowers[1:] == rules.uppers[:-1]
+
+@pytest.mark.parametrize("fy", ["2023-24", "2024-25"])
+def test_batch_matches_scalar_at_every_threshold(fy):
+    incomes = boundary_incomes(fy)
+    batch = compare_regimes_batch(incomes, fy)
+    for regime in ("old", "new"):
+        assert np.array_equal(batch[f"{regime}_regime_tax"], [calculate_tax(income, regime, fy) for income in incomes])
+    assert benchmark(500, fy=fy)["exact_match"]
+
+def test_deductions_reach_the_comparison_and_the_breakdown():
+    # 2.5L of old-regime deductions at 12L: 9.5L gross, 9L taxable, so the old regime wins below 10L
+    comparison = compare_tax_regimes(1200000, "2023-24", 250000)
+    curve = tax_curve(1200000, 0, 3000000, 50, "2023-24", 250000)
+    assert comparison["old_regime_tax"] == curve["breakdown"]["old"]["total_tax"] == 96200
+    assert comparison["new_regime_tax"] == curve["breakdown"]["new"]["total_tax"] == 85800
+    assert curve["break_even"] == [{"income": 1000000.0, "cheaper_below": "old", "cheaper_above": "new"}]
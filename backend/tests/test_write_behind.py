@@ -0,0 +1,93 @@
+import asyncio
+from collections import Counter
+
+import pytest
+
+from services.storage import JsonStorage
+from services.write_behind import WriteBehindBuffer
+
+def test_failed_flush_is_retried_and_waiters_stay_pending():
+    written = []
+    attempts = []
+
+    def flush_fn(batch):
+        attempts.append(batch)
+        if len(attempts) == 1:
+            raise OSError("disk full")
+        written.append(batch)
+
+    async def main():
+        writer = WriteBehindBuffer(flush_fn, interval_ms=10)
+        first = writer.append("alice", [{"role": "user"}])
+        await asyncio.sleep(0.05)
+        second = writer.append("alice", [{"role": "assistant"}])
+        # The first turn is still on its way to disk, not reported as lost
+        await asyncio.wait_for(asyncio.gather(first, second), timeout=1)
+        await writer.stop()
+        return writer.stats()
+
+    stats = asyncio.run(main())
+    assert [turn for batch in written for turn in batch["alice"]] == [{"role": "user"}, {"role": "assistant"}]
+    assert stats["errors"] == 1
+    assert stats["dropped"] == 0
+
+def test_batch_failing_partway_stores_each_turn_once(tmp_path, monkeypatch):
+    storage = JsonStorage(str(tmp_path))
+    chat_log = storage.chat_log
+    write_index = chat_log._write_index
+    failures = []
+
+    def flaky_write_index(user_dir, index):
+        # Bob's segment is written but his index update fails, after Alice's append went through
+        if user_dir.endswith("bob") and not failures:
+            failures.append(user_dir)
+            raise OSError("disk full")
+        write_index(user_dir, index)
+
+    monkeypatch.setattr(chat_log, "_write_index", flaky_write_index)
+
+    async def main():
+        writer = WriteBehindBuffer(storage.append_chat_history_batch, interval_ms=10)
+        acks = [writer.append(user_id, [{"role": "user", "content": f"{user_id} {i}"}])
+                for i in range(3) for user_id in ("alice", "bob")]
+        await asyncio.wait_for(asyncio.gather(*acks), timeout=2)
+        await writer.stop()
+
+    asyncio.run(main())
+    assert failures
+    for user_id in ("alice", "bob"):
+        contents = Counter(turn["content"] for turn in storage.get_chat_history(user_id))
+        assert contents == Counter(f"{user_id} {i}" for i in range(3))
+    reopened = JsonStorage(str(tmp_path))
+    assert len(reopened.get_chat_history("bob")) == 3
+
+def test_turns_are_given_up_on_after_repeated_failures(capsys):
+    def flush_fn(batch):
+        raise OSError("disk full")
+
+    async def main():
+        writer = WriteBehindBuffer(flush_fn, interval_ms=10, give_up_seconds=0.05)
+        flushed = writer.append("alice", [{"role": "user"}])
+        with pytest.raises(OSError):
+            await asyncio.wait_for(flushed, timeout=1)
+        await writer.stop()
+        return writer.stats()
+
+    stats = asyncio.run(main())
+    assert stats["dropped"] == 1
+    assert stats["buffered_records"] == 0
+    assert "1 turns for 1 users were not saved" in capsys.readouterr().out
+
+def test_failed_flush_at_shutdown_is_reported(capsys):
+    def flush_fn(batch):
+        raise OSError("disk full")
+
+    async def main():
+        writer = WriteBehindBuffer(flush_fn, interval_ms=60000)
+        flushed = writer.append("alice", [{"role": "user"}])
+        await writer.stop()
+        return flushed
+
+    flushed = asyncio.run(main())
+    assert isinstance(flushed.exception(), OSError)
+    assert "at shutdown: 1 turns for 1 users were not saved" in capsys.readouterr().out
@@ -1,15 +1,20 @@
 import streamlit as st
 import requests
 import os
+import sys
 import json
 from datetime import datetime
 from dotenv import load_dotenv
 from components.chat_ui import render_chat_interface
-from components.tax_graph import render_tax_comparison
+from components.tax_graph import render_tax_comparison, render_tax_breakdown
 from components.summary_tools import render_summary_tools
 from components.voice_translator import VoiceTranslator
 from components.summary_section import render_summary_section
 
+# shared/ lives at the repository root, next to frontend/
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.utils import get_date_difference_text
+
 # Load environment variables
 load_dotenv()
 
@@ -176,9 +181,20 @@ with tab2:
     st.markdown('<div class="glass-container">', unsafe_allow_html=True)
     st.header("Tax Calculator")
     
+    # Financial years the backend has rules for; fall back to its default year if it cannot be reached
+    try:
+        tax_years = requests.get(f"{API_URL}/tax/years").json()
+    except Exception:
+        tax_years = {"years": [], "default": None}
+    
     with st.form("tax_calculator_form"):
         tax_income = st.number_input("Annual Income (₹)", min_value=0.0, value=st.session_state.profile["income"]*12 if st.session_state.profile else 0.0)
         tax_city_tier = st.selectbox("City Tier for HRA", [1, 2, 3], index=0 if not st.session_state.profile else st.session_state.profile["city_tier"]-1)
+        tax_fy = None
+        if tax_years["years"]:
+            tax_fy = st.selectbox("Financial Year", tax_years["years"],
+                                  index=tax_years["years"].index(tax_years["default"]) if tax_years["default"] in tax_years["years"] else len(tax_years["years"]) - 1)
+        tax_deductions = st.number_input("Old Regime Deductions (80C, 80D, ...) (₹)", min_value=0.0)
         tax_regime = st.radio("Tax Regime", ["New", "Old", "Compare"], index=0)
         
         calculate_button = st.form_submit_button("Calculate Tax")
@@ -191,13 +207,19 @@ with tab2:
                         "user_id": st.session_state.user_id,
                         "income": tax_income,
                         "city_tier": tax_city_tier,
-                        "regime": tax_regime.lower()
+                        "regime": tax_regime.lower(),
+                        "fy": tax_fy,
+                        "deductions": tax_deductions
                     }
                 )
                 
                 if response.status_code == 200:
                     tax_info = response.json()
                     
+                    # Curves, slab breakdown and break-even incomes all come from one backend call
+                    curve_response = requests.post(f"{API_URL}/tax/curve",
+                                                   json={"income": tax_income, "fy": tax_fy, "deductions": tax_deductions})
+                    
                     if tax_regime.lower() == "compare":
                         # Display tax comparison
                         st.markdown("### Tax Regime Comparison")
@@ -216,8 +238,10 @@ with tab2:
                             render_tax_comparison(tax_info['regime_comparison']['visualization_data'])
                         
                         with viz_tab2:
-                            # Placeholder for tax breakdown visualization
-                            st.info("Detailed tax breakdown visualization will be shown here.")
+                            if curve_response.status_code == 200:
+                                render_tax_breakdown(curve_response.json())
+                            else:
+                                st.error(f"Failed to load tax breakdown: {curve_response.text}")
                             
                         # Add PDF download for tax summary
                         tax_summary = f"""# Tax Calculation Summary
@@ -225,6 +249,8 @@ with tab2:
 ## User Information
 Annual Income: ₹{tax_income:,.2f}
 City Tier: {tax_city_tier}
+Financial Year: {tax_info['fy']}
+Old Regime Deductions: ₹{tax_deductions:,.2f}
 
 ## Tax Regime Comparison
 Old Regime Tax: ₹{tax_info['regime_comparison']['old_regime_tax']:,.2f}
@@ -249,8 +275,14 @@ Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
                         )
                     else:
                         # Display tax calculation
-                        st.markdown(f"### {tax_regime} Regime Tax Calculation")
+                        st.markdown(f"### {tax_regime} Regime Tax Calculation (FY {tax_info['fy']})")
                         st.markdown(f"**Total Tax:** ₹{tax_info['tax_amount']:,.2f}")
+                        
+                        st.markdown("### Tax Breakdown")
+                        if curve_response.status_code == 200:
+                            render_tax_breakdown(curve_response.json(), tax_regime.lower())
+                        else:
+                            st.error(f"Failed to load tax breakdown: {curve_response.text}")
                     
                     # Display HRA exemption
                     st.markdown("### HRA Exemption")
@@ -260,7 +292,66 @@ Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
                     st.error(f"Failed to calculate tax: {response.text}")
             except Exception as e:
                 st.error(f"Error: {str(e)}")
-    
+
+    # Deduction optimizer
+    st.subheader("Optimize Deductions")
+    with st.form("tax_optimizer_form"):
+        col1, col2 = st.columns(2)
+        with col1:
+            opt_basic = st.number_input("Annual Basic Salary (₹)", min_value=0.0, value=tax_income * 0.5)
+            opt_hra = st.number_input("Annual HRA Received (₹)", min_value=0.0, value=tax_income * 0.2)
+            opt_other = st.number_input("Other Taxable Income (₹)", min_value=0.0, value=tax_income * 0.3)
+            opt_rent = st.number_input("Annual Rent Paid (₹)", min_value=0.0)
+        with col2:
+            opt_capacity = st.number_input("Amount Available for Tax-Saving Investments (₹)", min_value=0.0)
+            opt_existing = st.number_input("Existing 80C (EPF, premiums, tuition) (₹)", min_value=0.0)
+            opt_senior = st.checkbox("I am a senior citizen")
+            opt_parents = st.checkbox("I pay my parents' health insurance")
+            opt_parents_senior = st.checkbox("My parents are senior citizens")
+
+        optimize_button = st.form_submit_button("Find Best Plan")
+
+        if optimize_button:
+            try:
+                response = requests.post(
+                    f"{API_URL}/tax/optimize",
+                    json={
+                        "basic_salary": opt_basic,
+                        "hra_received": opt_hra,
+                        "other_income": opt_other,
+                        "rent_paid": opt_rent,
+                        "city_tier": tax_city_tier,
+                        "investment_capacity": opt_capacity,
+                        "existing_80c": opt_existing,
+                        "senior_citizen": opt_senior,
+                        "cover_parents": opt_parents,
+                        "parents_senior": opt_parents_senior
+                    }
+                )
+
+                if response.status_code == 200:
+                    plan = response.json()
+                    best = plan["plans"][plan["recommended_regime"]]
+                    st.markdown(f"### Recommended: {plan['recommended_regime'].title()} Regime")
+                    st.markdown(f"**Total Tax:** ₹{plan['tax']:,.2f} (₹{plan['savings_vs_other_regime']:,.2f} less than the other regime)")
+                    st.markdown(f"**HRA Exemption:** ₹{plan['hra_exemption']:,.2f}")
+                    if best["total_investment"] > 0:
+                        st.markdown("**Invest:**")
+                        for section, amount in best["investments"].items():
+                            if amount > 0:
+                                st.markdown(f"- Section {section}: ₹{amount:,.2f}")
+                        st.markdown(f"**Tax Saved:** ₹{best['tax_saved']:,.2f} "
+                                    f"(₹{best['average_benefit_per_rupee']:.2f} per rupee invested; "
+                                    f"₹{best['marginal_benefit_per_rupee']:.2f} on the last rupee)")
+                        if best["unused_capacity"] > 0:
+                            st.markdown(f"Investing the remaining ₹{best['unused_capacity']:,.2f} would not lower your tax further.")
+                    else:
+                        st.markdown("No tax-saving investment lowers your tax under this regime.")
+                else:
+                    st.error(f"Failed to optimize tax: {response.text}")
+            except Exception as e:
+                st.error(f"Error: {str(e)}")
+
     st.markdown('</div>', unsafe_allow_html=True)
 
 # Tab 3: Financial Goals
@@ -301,12 +392,7 @@ with tab3:
                     "goals": []
                 }
             
-            if "goals" not in st.session_state.profile:
-                st.session_state.profile["goals"] = []
-            
-            st.session_state.profile["goals"].append(goal)
-            
-            # Send goal to backend
+            # Save the goal on the backend; the stored copy (with its id) is loaded below
             try:
                 response = requests.post(f"{API_URL}/goal", json=goal)
                 if response.status_code == 200:
@@ -316,6 +402,15 @@ with tab3:
             except Exception as e:
                 st.error(f"Error: {str(e)}")
     
+    # Goals are persisted server-side; keep the profile's copy in sync with the stored ones
+    if st.session_state.profile:
+        try:
+            response = requests.get(f"{API_URL}/goal/{st.session_state.user_id}")
+            if response.status_code == 200:
+                st.session_state.profile["goals"] = response.json()
+        except Exception as e:
+            st.error(f"Error loading goals: {str(e)}")
+    
     # Display existing goals
     if st.session_state.profile and "goals" in st.session_state.profile and st.session_state.profile["goals"]:
         st.subheader("Your Financial Goals")
@@ -326,39 +421,120 @@ with tab3:
             col1, col2 = st.columns([3, 1])
             with col1:
                 st.markdown(f"**{goal['goal_name']}** (Priority: {goal['priority']})")
-                st.progress(progress / 100)
+                st.progress(min(progress, 100) / 100)
                 st.markdown(f"₹{goal['current_amount']:,.2f} of ₹{goal['target_amount']:,.2f} ({progress:.1f}%)")
                 if goal.get("target_date"):
-                    st.markdown(f"Target Date: {goal['target_date']}")
+                    st.markdown(f"Target Date: {goal['target_date']} ({get_date_difference_text(goal['target_date'])})")
             
             with col2:
                 if st.button("Update", key=f"update_goal_{i}"):
-                    st.session_state.goal_to_update = i
+                    st.session_state.goal_to_update = goal["goal_id"]
                 
                 if st.button("Delete", key=f"delete_goal_{i}"):
-                    st.session_state.profile["goals"].pop(i)
-                    st.rerun()
+                    try:
+                        response = requests.delete(f"{API_URL}/goal/{st.session_state.user_id}/{goal['goal_id']}")
+                        if response.status_code == 200:
+                            st.rerun()
+                        else:
+                            st.error(f"Failed to delete goal: {response.text}")
+                    except Exception as e:
+                        st.error(f"Error: {str(e)}")
+            
+            # Contributions update the saved amount on the backend and keep a history
+            with st.expander(f"Contributions ({goal.get('contribution_count', 0)})"):
+                with st.form(f"contribution_form_{i}"):
+                    amount = st.number_input("Amount (₹)", value=0.0, step=500.0, help="Negative for a withdrawal")
+                    note = st.text_input("Note (Optional)")
+                    
+                    if st.form_submit_button("Add Contribution") and amount != 0:
+                        try:
+                            response = requests.post(
+                                f"{API_URL}/goal/{st.session_state.user_id}/{goal['goal_id']}/contributions",
+                                json={"amount": amount, "note": note or None}
+                            )
+                            if response.status_code == 200:
+                                st.rerun()
+                            else:
+                                st.error(f"Failed to add contribution: {response.text}")
+                        except Exception as e:
+                            st.error(f"Error: {str(e)}")
+                
+                if goal.get("contribution_count"):
+                    try:
+                        response = requests.get(f"{API_URL}/goal/{st.session_state.user_id}/{goal['goal_id']}/contributions")
+                        if response.status_code == 200:
+                            for entry in reversed(response.json()):
+                                line = f"{entry['date'][:10]}: ₹{entry['amount']:,.2f} → ₹{entry['running_total']:,.2f}"
+                                if entry.get("note"):
+                                    line += f" ({entry['note']})"
+                                st.markdown(line)
+                    except Exception as e:
+                        st.error(f"Error: {str(e)}")
         
         # Update goal form (shown when an update button is clicked)
-        if "goal_to_update" in st.session_state:
-            i = st.session_state.goal_to_update
-            goal = st.session_state.profile["goals"][i]
-            
+        goal = next((goal for goal in st.session_state.profile["goals"]
+                     if goal["goal_id"] == st.session_state.get("goal_to_update")), None)
+        if goal:
             st.markdown("### Update Goal")
-            with st.form(f"update_goal_form_{i}"):
-                updated_current_amount = st.number_input("Current Amount (₹)", min_value=0.0, value=goal["current_amount"])
+            with st.form(f"update_goal_form_{goal['goal_id']}"):
+                updated_target_amount = st.number_input("Target Amount (₹)", min_value=0.0, value=float(goal["target_amount"]))
+                updated_current_amount = st.number_input("Current Amount (₹)", min_value=0.0, value=float(goal["current_amount"]),
+                                                          help="A change is recorded as an adjustment in the contribution history")
                 updated_priority = st.slider("Priority", 1, 5, goal["priority"])
                 
                 update_button = st.form_submit_button("Save Changes")
                 
                 if update_button:
-                    # Update goal in session state
-                    st.session_state.profile["goals"][i]["current_amount"] = updated_current_amount
-                    st.session_state.profile["goals"][i]["priority"] = updated_priority
+                    try:
+                        response = requests.put(
+                            f"{API_URL}/goal/{st.session_state.user_id}/{goal['goal_id']}",
+                            json={"target_amount": updated_target_amount, "current_amount": updated_current_amount,
+                                  "priority": updated_priority}
+                        )
+                        if response.status_code == 200:
+                            # Clear update state
+                            del st.session_state.goal_to_update
+                            st.rerun()
+                        else:
+                            st.error(f"Failed to update goal: {response.text}")
+                    except Exception as e:
+                        st.error(f"Error: {str(e)}")
+        
+        # Savings plan across all goals, computed by the backend solver
+        if st.button("Plan My Goals"):
+            try:
+                response = requests.post(
+                    f"{API_URL}/goal/plan",
+                    json={"user_id": st.session_state.user_id, "goals": st.session_state.profile["goals"],
+                          "monthly_surplus": st.session_state.profile["income"] - sum(st.session_state.profile.get("expenses", {}).values())}
+                )
+                
+                if response.status_code == 200:
+                    plan = response.json()
+                    st.markdown("### Goal Savings Plan")
+                    if plan["feasible"]:
+                        st.success(f"Your monthly surplus of ₹{plan['monthly_surplus']:,.2f} covers all your goals on time.")
+                    else:
+                        st.warning(f"Your monthly surplus of ₹{plan['monthly_surplus']:,.2f} does not cover every goal on time.")
+                    
+                    status_labels = {"achieved": "✅ Achieved", "on_track": "🟢 On track", "late": "🟠 Late", "not_funded": "🔴 Not funded"}
+                    for goal in plan["goals"]:
+                        line = f"**{goal['goal_name']}** — {status_labels.get(goal['status'], goal['status'])}"
+                        if goal["funded_period"]:
+                            line += f", fully funded by {goal['funded_period']}"
+                        if goal["required_monthly"] is not None:
+                            line += f" (needs ₹{goal['required_monthly']:,.2f}/month on its own)"
+                        if goal["shortfall_at_deadline"]:
+                            line += f", ₹{goal['shortfall_at_deadline']:,.2f} short at the target date"
+                        st.markdown(line)
                     
-                    # Clear update state
-                    del st.session_state.goal_to_update
-                    st.rerun()
+                    if plan["schedule"]["period"]:
+                        st.markdown("#### Monthly Allocation")
+                        st.area_chart({goal["goal_name"]: goal["allocations"] for goal in plan["goals"]})
+                else:
+                    st.error(f"Failed to plan goals: {response.text}")
+            except Exception as e:
+                st.error(f"Error: {str(e)}")
     else:
         st.info("You haven't set any financial goals yet. Add your first goal above!")
     
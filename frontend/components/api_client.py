@@ -0,0 +1,27 @@
+import time
+import random
+import requests
+
+# Retries for requests the backend sheds with 429, and the longest wait honoured
+MAX_RETRIES = 3
+MAX_RETRY_WAIT = 30
+
+def retry_delay(response, attempt):
+    """Seconds to wait before retrying: the server's Retry-After plus jitter, else exponential backoff"""
+    retry_after = response.headers.get("Retry-After", "")
+    if retry_after.isdigit():
+        base = float(retry_after)
+    else:
+        base = 2 ** attempt
+    # Jitter spreads out clients that were all shed at the same moment
+    return min(MAX_RETRY_WAIT, base + random.uniform(0, base / 2))
+
+def post(url, max_retries=MAX_RETRIES, **kwargs):
+    """requests.post that backs off and retries while the backend answers 429"""
+    for attempt in range(max_retries + 1):
+        response = requests.post(url, **kwargs)
+        if response.status_code != 429 or attempt == max_retries:
+            return response
+        delay = retry_delay(response, attempt)
+        response.close()
+        time.sleep(delay)
@@ -1,9 +1,36 @@
 import streamlit as st
-import requests
 import json
 from datetime import datetime
 from components.summary_tools import render_summary_tools, generate_pdf
 from components.voice_translator import VoiceTranslator
+from components import api_client
+
+def stream_chat_response(api_url, payload, placeholder):
+    """Send a message to the streaming chat endpoint, rendering the reply as it arrives"""
+    text = ""
+    event = None
+    
+    with api_client.post(f"{api_url}/chat/stream", json=payload, stream=True, timeout=(5, 120)) as response:
+        if response.status_code != 200:
+            raise RuntimeError(f"{response.status_code} - {response.text}")
+        
+        # Server-sent events: optional "event:" line, a "data:" line, then a blank line
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                event = None
+            elif line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                data = json.loads(line[len("data:"):].strip())
+                if event == "done":
+                    placeholder.markdown(data["response"])
+                    return data
+                if event == "error":
+                    raise RuntimeError(data["detail"])
+                text += data["delta"]
+                placeholder.markdown(text + "▌")
+    
+    raise RuntimeError("The response stream ended unexpectedly.")
 
 def render_chat_interface(api_url):
     """Render the chat interface component"""
@@ -14,7 +41,7 @@ def render_chat_interface(api_url):
         with st.spinner("Generating personalized advice based on your profile..."):
             try:
                 # Send an initial message to get advice based on profile
-                response = requests.post(
+                response = api_client.post(
                     f"{api_url}/chat",
                     json={
                         "user_id": st.session_state.user_id,
@@ -157,8 +184,8 @@ Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
         with st.chat_message("user"):
             st.markdown(user_input)
         
-        # Send message to backend
-        with st.spinner("Thinking..."):
+        # Send message to backend and render the reply as it streams in
+        with st.chat_message("assistant"):
             try:
                 # Prepare chat history for the API request
                 chat_history = []
@@ -169,94 +196,87 @@ Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
                             "content": msg["content"]
                         })
                 
-                response = requests.post(
-                    f"{api_url}/chat",
-                    json={
+                placeholder = st.empty()
+                chat_response = stream_chat_response(
+                    api_url,
+                    {
                         "user_id": st.session_state.user_id,
                         "message": user_input,
                         "voice_input": voice_input,
                         "chat_history": chat_history
-                    }
+                    },
+                    placeholder
                 )
                 
-                if response.status_code == 200:
-                    chat_response = response.json()
-                    
-                    # Add assistant message to chat history
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": chat_response["response"],
-                        "summary_available": chat_response["summary_available"],
-                        "audio_available": chat_response["audio_available"],
-                        "tax_info": chat_response.get("tax_info")
-                    })
-                    
-                    # Display assistant message
-                    with st.chat_message("assistant"):
-                        st.markdown(chat_response["response"])
-                        
-                        # Create columns for tools
-                        tool_cols = st.columns([1, 1, 1])
-                        
-                        # Add PDF download button for all assistant messages
-                        with tool_cols[0]:
-                            # Generate PDF from message content
-                            pdf_content = f"""# Financial Assistant Response
+                # Add assistant message to chat history
+                st.session_state.messages.append({
+                    "role": "assistant",
+                    "content": chat_response["response"],
+                    "summary_available": chat_response["summary_available"],
+                    "audio_available": chat_response["audio_available"],
+                    "tax_info": chat_response.get("tax_info")
+                })
+                
+                # Create columns for tools
+                tool_cols = st.columns([1, 1, 1])
+                
+                # Add PDF download button for all assistant messages
+                with tool_cols[0]:
+                    # Generate PDF from message content
+                    pdf_content = f"""# Financial Assistant Response
 
 {chat_response["response"]}
 
 Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 """
-                            pdf_bytes = generate_pdf(pdf_content)
-                            
-                            # Add download button for PDF
-                            st.download_button(
-                                "📄 Download as PDF",
-                                data=pdf_bytes,
-                                file_name=f"chat_response_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                                mime="application/pdf",
-                                help="Download this message as PDF"
-                            )
-                        
-                        # If summary is available, show summary tools
-                        if chat_response["summary_available"]:
-                            render_summary_tools(chat_response["response"], st.session_state.voice_translator)
-                        
-                        # If audio is available, generate and show audio player
-                        if chat_response["audio_available"]:
-                            with tool_cols[1]:
-                                with st.spinner("Generating audio..."): 
-                                    try:
-                                        # Generate audio from text response - limit to first 300 characters to avoid issues
-                                        text_for_audio = chat_response["response"][:300] if len(chat_response["response"]) > 300 else chat_response["response"]
-                                        audio_bytes = st.session_state.voice_translator.get_audio_bytes(text_for_audio)
-                                        
-                                        # Ensure we never have None bytes
-                                        if audio_bytes is None:
-                                            audio_bytes = b""
-                                        
-                                        if audio_bytes and len(audio_bytes) > 0:
-                                            # Show audio player
-                                            st.audio(audio_bytes, format="audio/mp3")
-                                            
-                                            # Add download button for audio
-                                            st.download_button(
-                                                "🔊 Download Audio",
-                                                data=audio_bytes,
-                                                file_name=f"response_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp3",
-                                                mime="audio/mp3"
-                                            )
-                                        else:
-                                            st.warning("Audio generation failed. Please try again.")
-                                    except Exception as e:
-                                        st.warning("Audio generation failed. Please try again.")
-                        
-                        
-                        # If tax info is available, show a notification
-                        if chat_response.get("tax_info"):
-                            st.info("Tax information is available. Check the Tax Calculator tab for more details.")
-                else:
-                    st.error(f"Error: {response.status_code} - {response.text}")
+                    pdf_bytes = generate_pdf(pdf_content)
+                    
+                    # Add download button for PDF
+                    st.download_button(
+                        "📄 Download as PDF",
+                        data=pdf_bytes,
+                        file_name=f"chat_response_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+                        mime="application/pdf",
+                        help="Download this message as PDF"
+                    )
+                
+                # If summary is available, show summary tools
+                if chat_response["summary_available"]:
+                    render_summary_tools(chat_response["response"], st.session_state.voice_translator)
+                
+                # If audio is available, generate and show audio player
+                if chat_response["audio_available"]:
+                    with tool_cols[1]:
+                        with st.spinner("Generating audio..."): 
+                            try:
+                                # Generate audio from text response - limit to first 300 characters to avoid issues
+                                text_for_audio = chat_response["response"][:300] if len(chat_response["response"]) > 300 else chat_response["response"]
+                                audio_bytes = st.session_state.voice_translator.get_audio_bytes(text_for_audio)
+                                
+                                # Ensure we never have None bytes
+                                if audio_bytes is None:
+                                    audio_bytes = b""
+                                
+                                if audio_bytes and len(audio_bytes) > 0:
+                                    # Show audio player
+                                    st.audio(audio_bytes, format="audio/mp3")
+                                    
+                                    # Add download button for audio
+                                    st.download_button(
+                                        "🔊 Download Audio",
+                                        data=audio_bytes,
+                                        file_name=f"response_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp3",
+                                        mime="audio/mp3"
+                                    )
+                                else:
+                                    st.warning("Audio generation failed. Please try again.")
+                            except Exception as e:
+                                st.warning("Audio generation failed. Please try again.")
+                
+                
+                # If tax info is available, show a notification
+                if chat_response.get("tax_info"):
+                    st.info("Tax information is available. Check the Tax Calculator tab for more details.")
             except Exception as e:
                 st.error(f"Error communicating with backend: {str(e)}")
     
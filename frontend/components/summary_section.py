@@ -1,11 +1,33 @@
 import streamlit as st
+import requests
 import matplotlib.pyplot as plt
 import numpy as np
 import io
 import base64
 from datetime import datetime
-import requests
 from components.summary_tools import render_summary_tools, generate_pdf
+from components import api_client
+
+# Asset mixes offered for the Monte Carlo simulation (weights per asset class)
+INVESTMENT_MIXES = {
+    "Conservative": {"equity": 0.2, "debt": 0.7, "cash": 0.1},
+    "Balanced": {"equity": 0.6, "debt": 0.4},
+    "Aggressive": {"equity": 0.85, "debt": 0.1, "gold": 0.05}
+}
+
+def expense_periods():
+    """Ranges offered for recorded spending, as query parameters of /expense/{user_id}/summary.
+
+    Built on each render so "This quarter" follows the calendar in a long-running app.
+    """
+    today = datetime.now()
+    return {
+        "This month": {"months": 1},
+        "Last 3 months": {"months": 3},
+        "This quarter": {"period": f"{today.year}-Q{(today.month - 1) // 3 + 1}"},
+        "Last 12 months": {"months": 12},
+        "All time": {}
+    }
 
 def render_summary_section(api_url):
     """Render the summary section with AI-generated summaries and visualizations"""
@@ -25,38 +47,87 @@ def render_summary_section(api_url):
     with summary_tab1:
         st.subheader("Expense Breakdown")
         
+        # Record an expense in the ledger
+        with st.form("record_expense_form"):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                category = st.selectbox("Category", ["Housing", "Food", "Transportation", "Utilities", "Entertainment",
+                                                     "Healthcare", "Shopping", "Other"])
+            with col2:
+                amount = st.number_input("Amount (₹)", min_value=0.0, step=100.0)
+            with col3:
+                spent_on = st.date_input("Date")
+            description = st.text_input("Description (Optional)")
+            
+            if st.form_submit_button("Record Expense") and amount > 0:
+                try:
+                    response = requests.post(f"{api_url}/expense", json={
+                        "user_id": st.session_state.user_id,
+                        "category": category,
+                        "amount": amount,
+                        "description": description or None,
+                        "date": spent_on.isoformat()
+                    })
+                    if response.status_code == 200:
+                        st.success("Expense recorded.")
+                    else:
+                        st.error(f"Failed to record expense: {response.text}")
+                except Exception as e:
+                    st.error(f"Error: {str(e)}")
+        
+        # Recorded spending over the chosen range, served from the ledger's monthly rollups
+        periods = expense_periods()
+        period = st.selectbox("Period", list(periods), index=1)
+        spend_history = None
+        try:
+            response = requests.get(f"{api_url}/expense/{st.session_state.user_id}/summary", params=periods[period])
+            if response.status_code == 200:
+                spend_history = response.json()
+        except Exception as e:
+            st.error(f"Error loading expenses: {str(e)}")
+        
         # Generate expense visualization
-        if st.session_state.profile and "expenses" in st.session_state.profile:
+        if spend_history and spend_history["count"] > 0:
+            st.caption(f"Average monthly spending from {spend_history['start_month']} to {spend_history['end_month']}, "
+                       f"from {spend_history['count']} recorded expenses")
+            expenses_data = spend_history["monthly_average"]
+            if len(spend_history["months"]) > 1:
+                st.bar_chart({month["month"]: month["total"] for month in spend_history["months"]})
+        elif st.session_state.profile and "expenses" in st.session_state.profile:
+            st.caption("No expenses recorded for this period; showing the estimates from your profile.")
             expenses_data = st.session_state.profile["expenses"]
-            if expenses_data and sum(expenses_data.values()) > 0:
-                # Create expense visualization
-                fig, summary_text = create_expense_visualization(expenses_data, st.session_state.profile["income"])
-                
-                # Display the visualization
-                st.pyplot(fig)
-                
-                # Display the summary text
-                st.markdown("### Expense Analysis")
-                st.markdown(summary_text)
-                
-                # Add download options
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    # Download visualization
-                    buf = io.BytesIO()
-                    fig.savefig(buf, format='png', dpi=300, bbox_inches='tight')
-                    buf.seek(0)
-                    st.download_button(
-                        label="📊 Download Chart",
-                        data=buf,
-                        file_name=f"expense_chart_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png",
-                        mime="image/png"
-                    )
-                
-                with col2:
-                    # Download summary as PDF
-                    pdf_content = f"""# Expense Analysis Summary
+        else:
+            expenses_data = None
+        
+        if expenses_data and sum(expenses_data.values()) > 0:
+            # Create expense visualization
+            fig, summary_text = create_expense_visualization(expenses_data, st.session_state.profile["income"])
+            
+            # Display the visualization
+            st.pyplot(fig)
+            
+            # Display the summary text
+            st.markdown("### Expense Analysis")
+            st.markdown(summary_text)
+            
+            # Add download options
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                # Download visualization
+                buf = io.BytesIO()
+                fig.savefig(buf, format='png', dpi=300, bbox_inches='tight')
+                buf.seek(0)
+                st.download_button(
+                    label="📊 Download Chart",
+                    data=buf,
+                    file_name=f"expense_chart_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png",
+                    mime="image/png"
+                )
+            
+            with col2:
+                # Download summary as PDF
+                pdf_content = f"""# Expense Analysis Summary
 
 ## User Information
 Name: {st.session_state.profile['name']}
@@ -67,16 +138,16 @@ Monthly Income: ₹{st.session_state.profile['income']:,.2f}
 
 Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 """
-                    
-                    pdf_bytes = generate_pdf(pdf_content)
-                    st.download_button(
-                        label="📄 Download Summary",
-                        data=pdf_bytes,
-                        file_name=f"expense_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                        mime="application/pdf"
-                    )
-            else:
-                st.info("No expense data available. Please update your profile with expense information.")
+                
+                pdf_bytes = generate_pdf(pdf_content)
+                st.download_button(
+                    label="📄 Download Summary",
+                    data=pdf_bytes,
+                    file_name=f"expense_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+                    mime="application/pdf"
+                )
+        else:
+            st.info("No expense data available. Record an expense above or update your profile with expense information.")
     
     # Tab 2: Savings Projection
     with summary_tab2:
@@ -96,34 +167,51 @@ Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
             projection_years = st.slider("Projection Period (Years)", 1, 30, 5)
             interest_rate = st.slider("Annual Interest Rate (%)", 1.0, 15.0, 7.0, 0.1)
             
-            # Generate savings projection
-            fig, projection_data, summary_text = create_savings_projection(monthly_savings, projection_years, interest_rate)
+            # Growth curves come from the backend projection engine; this tab only plots them
+            try:
+                response = api_client.post(
+                    f"{api_url}/projection",
+                    json={
+                        "years": [projection_years],
+                        "annual_rates": [interest_rate],
+                        "monthly_contributions": [monthly_savings]
+                    }
+                )
+                response.raise_for_status()
+                projection = response.json()
+            except Exception as e:
+                st.error(f"Error loading savings projection: {str(e)}")
+                projection = None
             
-            # Display the visualization
-            st.pyplot(fig)
+            if projection:
+                # Generate savings projection
+                fig, projection_data, summary_text = create_savings_projection(projection, projection_years, interest_rate)
             
-            # Display the summary text
-            st.markdown("### Savings Projection Analysis")
-            st.markdown(summary_text)
+                # Display the visualization
+                st.pyplot(fig)
             
-            # Add download options
-            col1, col2 = st.columns(2)
+                # Display the summary text
+                st.markdown("### Savings Projection Analysis")
+                st.markdown(summary_text)
             
-            with col1:
-                # Download visualization
-                buf = io.BytesIO()
-                fig.savefig(buf, format='png', dpi=300, bbox_inches='tight')
-                buf.seek(0)
-                st.download_button(
-                    label="📊 Download Chart",
-                    data=buf,
-                    file_name=f"savings_projection_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png",
-                    mime="image/png"
-                )
+                # Add download options
+                col1, col2 = st.columns(2)
             
-            with col2:
-                # Download summary as PDF
-                pdf_content = f"""# Savings Projection Summary
+                with col1:
+                    # Download visualization
+                    buf = io.BytesIO()
+                    fig.savefig(buf, format='png', dpi=300, bbox_inches='tight')
+                    buf.seek(0)
+                    st.download_button(
+                        label="📊 Download Chart",
+                        data=buf,
+                        file_name=f"savings_projection_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png",
+                        mime="image/png"
+                    )
+            
+                with col2:
+                    # Download summary as PDF
+                    pdf_content = f"""# Savings Projection Summary
 
 ## User Information
 Name: {st.session_state.profile['name']}
@@ -140,13 +228,41 @@ Annual Interest Rate: {interest_rate}%
 Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 """
                 
-                pdf_bytes = generate_pdf(pdf_content)
-                st.download_button(
-                    label="📄 Download Summary",
-                    data=pdf_bytes,
-                    file_name=f"savings_projection_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                    mime="application/pdf"
-                )
+                    pdf_bytes = generate_pdf(pdf_content)
+                    st.download_button(
+                        label="📄 Download Summary",
+                        data=pdf_bytes,
+                        file_name=f"savings_projection_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+                        mime="application/pdf"
+                    )
+            
+            # Range of outcomes under market volatility, around the fixed-rate projection
+            st.markdown("### Market Uncertainty")
+            mix_name = st.selectbox("Investment Mix", list(INVESTMENT_MIXES), index=1)
+            if st.button("Run Simulation"):
+                with st.spinner("Simulating market scenarios..."):
+                    try:
+                        response = api_client.post(
+                            f"{api_url}/projection/monte-carlo",
+                            json={
+                                "user_id": st.session_state.user_id,
+                                "years": projection_years,
+                                "monthly_contribution": monthly_savings,
+                                "allocation": INVESTMENT_MIXES[mix_name],
+                                "goals": st.session_state.profile.get("goals", [])
+                            }
+                        )
+                        response.raise_for_status()
+                        simulation = response.json()
+                        
+                        st.pyplot(create_monte_carlo_chart(simulation))
+                        st.markdown(f"Expected return {simulation['expected_annual_return'] * 100:.1f}% a year, "
+                                    f"volatility {simulation['annual_volatility'] * 100:.1f}%, over {simulation['paths']:,} scenarios.")
+                        for goal in simulation["goals"]:
+                            st.markdown(f"- **{goal['goal_name']}**: {goal['probability'] * 100:.0f}% chance of having "
+                                        f"₹{goal['remaining_amount']:,.2f} by month {goal['month']}")
+                    except Exception as e:
+                        st.error(f"Error running simulation: {str(e)}")
     
     # Tab 3: Budget Recommendations
     with summary_tab3:
@@ -158,7 +274,7 @@ Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
                 with st.spinner("Generating budget recommendations..."):
                     try:
                         # Request budget summary from backend
-                        response = requests.post(
+                        response = api_client.post(
                             f"{api_url}/summary",
                             json={"user_id": st.session_state.user_id}
                         )
@@ -303,20 +419,14 @@ def create_expense_visualization(expenses, income):
     
     return fig, summary_text
 
-def create_savings_projection(monthly_savings, years, interest_rate):
-    """Create a visualization of savings projection"""
-    # Calculate projection data
+def create_savings_projection(projection, years, interest_rate):
+    """Create a visualization of a savings projection returned by the /projection API"""
+    # Monthly balances for the single (rate, contribution) scenario requested
+    series = projection["curves"]["series"][0]
+    monthly_savings = series["monthly_contribution"]
     months = years * 12
-    monthly_rate = interest_rate / 100 / 12
-    
-    # Initialize arrays
-    savings_without_interest = np.zeros(months + 1)
-    savings_with_interest = np.zeros(months + 1)
-    
-    # Calculate savings over time
-    for i in range(1, months + 1):
-        savings_without_interest[i] = monthly_savings * i
-        savings_with_interest[i] = savings_with_interest[i-1] * (1 + monthly_rate) + monthly_savings
+    savings_without_interest = np.array(series["contributed"])
+    savings_with_interest = np.array(series["balance"])
     
     # Create figure
     fig, ax = plt.subplots(figsize=(10, 6))
@@ -400,6 +510,41 @@ def create_savings_projection(monthly_savings, years, interest_rate):
     
     return fig, projection_data, summary_text
 
+def create_monte_carlo_chart(simulation):
+    """Create a percentile band chart from a Monte Carlo simulation result"""
+    bands = simulation["bands"]
+    years = np.array(bands["month"]) / 12
+    
+    fig, ax = plt.subplots(figsize=(10, 6))
+    fig.patch.set_facecolor('#1E1E1E')
+    ax.set_facecolor('#1E1E1E')
+    
+    # P10-P90 band with the median on top
+    ax.fill_between(years, bands["p10"], bands["p90"], color='#6B73FF', alpha=0.3, label='10th-90th Percentile')
+    ax.plot(years, bands["p50"], color='#4CAF50', linewidth=2, label='Median')
+    ax.plot(years, bands["p10"], color='#6B73FF', linestyle='--', linewidth=1)
+    ax.plot(years, bands["p90"], color='#6B73FF', linestyle='--', linewidth=1)
+    
+    # Set labels and title
+    ax.set_xlabel('Years', color='white')
+    ax.set_ylabel('Savings Amount (₹)', color='white')
+    ax.set_title('Range of Savings Outcomes', color='white', fontsize=14)
+    
+    # Customize grid and spines
+    ax.grid(linestyle='--', alpha=0.3)
+    for spine in ax.spines.values():
+        spine.set_color('#555555')
+    ax.tick_params(axis='both', colors='white')
+    ax.legend(facecolor='#1E1E1E', edgecolor='#555555', labelcolor='white')
+    
+    # Format y-axis labels with commas for thousands
+    import matplotlib.ticker as ticker
+    ax.yaxis.set_major_formatter(ticker.StrMethodFormatter('{x:,.0f}'))
+    
+    plt.tight_layout()
+    
+    return fig
+
 def create_ideal_budget_chart(income):
     """Create an ideal budget allocation chart based on the 50/30/20 rule"""
     # Calculate ideal budget allocation
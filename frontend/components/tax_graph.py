@@ -71,4 +71,84 @@ def render_tax_comparison(visualization_data):
         file_name="tax_comparison.png",
         mime="image/png",
         disabled=True  # Disabled for now as we're not implementing the actual download
-    )
\ No newline at end of file
+    )
+
+def render_tax_breakdown(curve_data, regime=None):
+    """Render tax-vs-income curves, break-even incomes and the per-slab breakdown (of one regime when ``regime`` is given)"""
+    curve = curve_data.get("curve", {})
+    income = curve_data.get("income", 0)
+    breakdown = curve_data.get("breakdown", {})
+    break_even = curve_data.get("break_even", [])
+    
+    fig, (curve_ax, slab_ax) = plt.subplots(1, 2, figsize=(14, 6), gridspec_kw={'width_ratios': [3, 2]})
+    
+    # Tax curves for both regimes
+    curve_ax.plot(curve.get("income", []), curve.get("old_regime_tax", []), color='#6B73FF', linewidth=2, label='Old Regime')
+    curve_ax.plot(curve.get("income", []), curve.get("new_regime_tax", []), color='#000DFF', linewidth=2, label='New Regime')
+    
+    # Mark the user's income and any income where the cheaper regime switches
+    curve_ax.axvline(income, color='#4CAF50', linestyle='--', linewidth=1.5, label=f'Your Income (₹{income:,.0f})')
+    for point in break_even:
+        curve_ax.axvline(point["income"], color='#FFC107', linestyle=':', linewidth=1.5)
+        curve_ax.annotate(f"Break-even ₹{point['income']:,.0f}",
+                          xy=(point["income"], curve_ax.get_ylim()[1] * 0.9),
+                          xytext=(5, 0), textcoords="offset points",
+                          fontsize=9, color='#FFC107', rotation=90, va='top')
+    
+    curve_ax.set_xlabel('Annual Income (₹)', fontsize=12, color='white')
+    curve_ax.set_ylabel('Tax Amount (₹)', fontsize=12, color='white')
+    curve_ax.set_title(f"Tax vs Income (FY {curve_data.get('fy', '')})", fontsize=14, fontweight='bold', color='white')
+    curve_ax.legend(facecolor='#1E1E1E', edgecolor='#555555', labelcolor='white')
+    
+    # Tax owed in each slab at the user's income, side by side per regime
+    regimes = [("old", "Old Regime", '#6B73FF'), ("new", "New Regime", '#000DFF')]
+    if regime in ("old", "new"):
+        regimes = [entry for entry in regimes if entry[0] == regime]
+    slab_count = max(len(breakdown.get(name, {}).get("slabs", [])) for name, _, _ in regimes) if breakdown else 0
+    x = np.arange(slab_count)
+    width = 0.8 / len(regimes)
+    offsets = [width * (i - (len(regimes) - 1) / 2) for i in range(len(regimes))]
+    for offset, (name, label, color) in zip(offsets, regimes):
+        slabs = breakdown.get(name, {}).get("slabs", [])
+        values = [slab["tax"] for slab in slabs] + [0] * (slab_count - len(slabs))
+        slab_ax.bar(x + offset, values, width, color=color, label=label)
+    slab_ax.set_xticks(x)
+    slab_ax.set_xticklabels([f"Slab {i + 1}" for i in range(slab_count)], fontsize=10, color='white')
+    slab_ax.set_ylabel('Tax in Slab (₹)', fontsize=12, color='white')
+    slab_ax.set_title('Tax by Slab at Your Income', fontsize=14, fontweight='bold', color='white')
+    slab_ax.legend(facecolor='#1E1E1E', edgecolor='#555555', labelcolor='white')
+    
+    # Match the dark theme of the comparison chart
+    fig.patch.set_facecolor('#1E1E1E')
+    for ax in (curve_ax, slab_ax):
+        ax.set_facecolor('#1E1E1E')
+        ax.grid(axis='y', linestyle='--', alpha=0.3)
+        for spine in ax.spines.values():
+            spine.set_color('#555555')
+        ax.tick_params(axis='both', colors='white')
+    
+    plt.tight_layout()
+    st.pyplot(fig)
+    
+    # Break-even summary
+    if break_even:
+        for point in break_even:
+            st.markdown(f"**Break-even at ₹{point['income']:,.2f}:** the {point['cheaper_below'].title()} Regime is cheaper below "
+                        f"and the {point['cheaper_above'].title()} Regime above this income.")
+    else:
+        cheaper = "New" if curve.get("new_regime_tax", [0])[-1] <= curve.get("old_regime_tax", [0])[-1] else "Old"
+        st.markdown(f"**No break-even income:** the {cheaper} Regime costs the same or less at every income.")
+    
+    # Slab table per regime, then rebate and cess
+    for name, label, _ in regimes:
+        details = breakdown.get(name)
+        if not details:
+            continue
+        deducted = f", after ₹{details['deductions']:,.2f} of deductions" if details.get("deductions") else ""
+        st.markdown(f"#### {label} (taxable income ₹{details['taxable_income']:,.2f}{deducted})")
+        rows = []
+        for slab in details["slabs"]:
+            upper = f"₹{slab['upper']:,.0f}" if slab["upper"] is not None else "and above"
+            rows.append(f"| ₹{slab['lower']:,.0f} – {upper} | {slab['rate'] * 100:.0f}% | ₹{slab['taxable_amount']:,.2f} | ₹{slab['tax']:,.2f} |")
+        st.markdown("| Slab | Rate | Income in Slab | Tax |\n|---|---|---|---|\n" + "\n".join(rows))
+        st.markdown(f"Rebate: ₹{details['rebate']:,.2f} · Cess: ₹{details['cess']:,.2f} · **Total Tax: ₹{details['total_tax']:,.2f}**")
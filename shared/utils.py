@@ -84,8 +84,9 @@ def save_json_file(file_path: str, data: Any) -> bool:
 def get_date_difference_text(date_str: str) -> str:
     """Get a human-readable text for the difference between a date and today"""
     try:
-        target_date = datetime.fromisoformat(date_str)
-        today = datetime.now()
+        # Whole calendar days, so a goal dated today reads "Today" rather than "Past due"
+        target_date = datetime.fromisoformat(date_str).date()
+        today = datetime.now().date()
         
         diff = target_date - today
         